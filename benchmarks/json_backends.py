@@ -0,0 +1,172 @@
+""" Compare the speed of the JSON backends on a large ModelSEED model payload.
+
+    Run with "python benchmarks/json_backends.py" after installing mackinac. The
+    payload is a synthetic model with the same structure and approximate size as
+    the output of the ProbModelSEED get_model method for a model with 10,000 reactions.
+    The benchmark also compares the time and peak memory of decoding selected fields
+    of a synthetic genome with the functions in the lazy module to decoding the whole
+    genome.
+"""
+
+from __future__ import print_function
+import random
+import timeit
+import tracemalloc
+
+from mackinac import serializer
+from mackinac.lazy import LazyObject, select_fields
+
+
+def make_model(num_reactions=10000, num_compounds=8000, seed=42):
+    """ Make a synthetic ModelSEED model in the format returned by get_model().
+
+    Parameters
+    ----------
+    num_reactions : int, optional
+        Number of reactions in model
+    num_compounds : int, optional
+        Number of compounds in model
+    seed : int, optional
+        Seed for random number generator
+
+    Returns
+    -------
+    dict
+        Dictionary of model data
+    """
+
+    rng = random.Random(seed)
+    compounds = list()
+    for index in range(num_compounds):
+        compounds.append({
+            'id': 'cpd{0:05d}_c0'.format(index),
+            'name': 'Compound {0} [c0]'.format(index),
+            'formula': 'C{0}H{1}O{2}'.format(rng.randint(1, 30), rng.randint(1, 60), rng.randint(0, 20)),
+            'charge': rng.randint(-3, 3),
+            'modelcompartment_ref': '~/modelcompartments/id/c0',
+            'compound_ref': '~/template/compounds/id/cpd{0:05d}'.format(index)
+        })
+    reactions = list()
+    for index in range(num_reactions):
+        reagents = list()
+        for reagent in range(rng.randint(2, 8)):
+            reagents.append({
+                'coefficient': rng.choice([-2.0, -1.0, 1.0, 2.0]),
+                'modelcompound_ref': '~/modelcompounds/id/cpd{0:05d}_c0'.format(rng.randrange(num_compounds))
+            })
+        reactions.append({
+            'id': 'rxn{0:05d}_c0'.format(index),
+            'name': 'Reaction {0} [c0]'.format(index),
+            'direction': rng.choice(['>', '<', '=']),
+            'probability': rng.random(),
+            'modelcompartment_ref': '~/modelcompartments/id/c0',
+            'reaction_ref': '~/template/reactions/id/rxn{0:05d}_c'.format(index),
+            'modelReactionReagents': reagents,
+            'modelReactionProteins': [{
+                'complex_ref': '~/template/complexes/id/cpx{0:05d}'.format(index),
+                'modelReactionProteinSubunits': [{
+                    'role': 'Role {0}'.format(index),
+                    'feature_refs': ['~/genome/features/id/fig|226186.12.peg.{0}'.format(rng.randint(1, 5000))]
+                }]
+            }]
+        })
+    return {
+        'id': '226186.12',
+        'name': 'Bacteroides thetaiotaomicron VPI-5482',
+        'modelcompartments': [{'id': 'c0', 'label': 'Cytosol_0'}, {'id': 'e0', 'label': 'Extracellular_0'}],
+        'modelcompounds': compounds,
+        'modelreactions': reactions
+    }
+
+
+def make_genome(num_features=5000, seed=42):
+    """ Make a synthetic genome in the format stored in the workspace.
+
+    Parameters
+    ----------
+    num_features : int, optional
+        Number of features in genome
+    seed : int, optional
+        Seed for random number generator
+
+    Returns
+    -------
+    dict
+        Dictionary of genome data
+    """
+
+    rng = random.Random(seed)
+    features = list()
+    for index in range(num_features):
+        length = rng.randint(200, 500)
+        features.append({
+            'id': 'fig|226186.12.peg.{0}'.format(index + 1),
+            'type': 'CDS',
+            'location': [['NC_004663', rng.randint(1, 6000000), rng.choice('+-'), length * 3]],
+            'function': 'Hypothetical protein {0}'.format(index),
+            'protein_translation': ''.join(rng.choice('ACDEFGHIKLMNPQRSTVWY') for i in range(length)),
+            'dna_sequence': ''.join(rng.choice('ACGT') for i in range(length * 3)),
+            'aliases': ['BT_{0:04d}'.format(index), 'NP_{0}.1'.format(810000 + index)],
+            'ontology_terms': {'SSO': {'SSO:{0:09d}'.format(index): {'id': 'SSO:{0:09d}'.format(index)}}},
+            'quality': {'hit_count': rng.random(), 'weighted_hit_count': rng.random()}
+        })
+    return {
+        'id': '226186.12',
+        'scientific_name': 'Bacteroides thetaiotaomicron VPI-5482',
+        'domain': 'Bacteria',
+        'features': features,
+        'num_contigs': 2,
+        'gc_content': 0.43,
+        'contigs': [{'id': 'NC_004663', 'length': 6260361}, {'id': 'NC_004703', 'length': 33038}]
+    }
+
+
+def lazy_main(repeat=5):
+    text = serializer.dumps(make_genome())
+    tests = [
+        ('loads', lambda: serializer.loads(text)),
+        ('LazyObject id', lambda: LazyObject(text)['id']),
+        ('LazyObject contigs', lambda: LazyObject(text)['contigs']),
+        ('select features.id', lambda: select_fields(text, ['features.id'])),
+        ('select features.id,function', lambda: select_fields(text, ['features.id', 'features.function'])),
+        ('select contigs', lambda: select_fields(text, ['contigs']))
+    ]
+    print('{0:30} {1:>12} {2:>12}'.format('genome', 'time (ms)', 'peak (MB)'))
+    for name, func in tests:
+        elapsed = min(timeit.repeat(func, number=1, repeat=repeat))
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('{0:30} {1:12.1f} {2:12.1f}'.format(name, elapsed * 1000., peak / 1e6))
+    print('Payload size: {0:.1f} MB'.format(len(text) / 1e6))
+
+
+def main(repeat=5):
+    model = make_model()
+    original = serializer.get_json_backend()
+    payload = None
+    times = dict()
+    print('{0:10} {1:>12} {2:>12} {3:>16} {4:>16}'.format('backend', 'dumps (ms)', 'loads (ms)',
+                                                          'dumps vs json', 'loads vs json'))
+    for name in reversed(serializer.backend_names):  # Time the json module first as the baseline
+        try:
+            serializer.set_json_backend(name)
+        except ImportError:
+            print('{0:10} {1:>12}'.format(name, 'not installed'))
+            continue
+        payload = serializer.dumps(model)
+        dumps_time = min(timeit.repeat(lambda: serializer.dumps(model), number=1, repeat=repeat))
+        loads_time = min(timeit.repeat(lambda: serializer.loads(payload), number=1, repeat=repeat))
+        times[name] = (dumps_time, loads_time)
+        print('{0:10} {1:12.1f} {2:12.1f} {3:15.1f}x {4:15.1f}x'.format(
+            name, dumps_time * 1000., loads_time * 1000., times['json'][0] / dumps_time,
+            times['json'][1] / loads_time))
+    print('Payload size: {0:.1f} MB'.format(len(payload) / 1e6))
+    serializer.set_json_backend(original)
+    print()
+    lazy_main(repeat=repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,199 @@
 from __future__ import absolute_import
 import requests
-from requests.exceptions import Timeout
+from requests.adapters import HTTPAdapter
+from requests.exceptions import Timeout, ConnectionError as RequestsConnectionError
 from warnings import warn
+from time import sleep, time
+import random
 import configparser
-import json
 from os import environ, path
 from getpass import getpass
 import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import six
 
+from .serializer import dumps, loads
+from .cache import MetadataCache
+from . import metrics
+
+# When available, ijson can decode JSON incrementally from a response stream so the body is never
+# all in memory. Only the C backend is used because the other backends are many times slower than
+# decoding the whole body in one step.
+try:
+    import ijson
+    if ijson.backend != 'yajl2_c':
+        ijson = None
+except ImportError:
+    ijson = None
+
+# Default settings for the pool of persistent connections shared by all clients.
+default_pool_config = {
+    # Number of per-host connection pools to keep
+    'pool_connections': 10,
+    # Maximum number of connections to keep open to a single host
+    'pool_maxsize': 10,
+    # When True, wait for a free connection instead of opening an extra one
+    'pool_block': False,
+    # When True, keep connections open between requests
+    'keep_alive': True
+}
+
+# Session shared by all clients for making requests to web services.
+_session = None
+_session_lock = threading.Lock()
+
+
+def _create_session(pool_connections, pool_maxsize, pool_block, keep_alive):
+    """ Create a session with a pool of persistent connections.
+
+    Parameters
+    ----------
+    pool_connections : int
+        Number of per-host connection pools to keep
+    pool_maxsize : int
+        Maximum number of connections to keep open to a single host
+    pool_block : bool
+        When True, wait for a free connection instead of opening an extra one
+    keep_alive : bool
+        When True, keep connections open between requests
+
+    Returns
+    -------
+    requests.Session
+        New session object
+    """
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+def get_session():
+    """ Get the session shared by all clients for making requests to web services.
+
+        The session keeps a pool of persistent connections to each host so requests
+        reuse an open connection instead of doing a new TLS handshake every time.
+        Connection pools are thread-safe and can be used from multiple threads.
+
+    Returns
+    -------
+    requests.Session
+        Shared session object
+    """
+
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session(**default_pool_config)
+    return _session
+
+
+def configure_session(pool_connections=None, pool_maxsize=None, pool_block=None, keep_alive=None):
+    """ Configure the pool of persistent connections shared by all clients.
+
+        The current shared session is closed and replaced with a new session
+        using the specified settings.
+
+    Parameters
+    ----------
+    pool_connections : int, optional
+        Number of per-host connection pools to keep
+    pool_maxsize : int, optional
+        Maximum number of connections to keep open to a single host
+    pool_block : bool, optional
+        When True, wait for a free connection instead of opening an extra one
+    keep_alive : bool, optional
+        When True, keep connections open between requests
+    """
+
+    global _session
+    if pool_connections is not None:
+        default_pool_config['pool_connections'] = pool_connections
+    if pool_maxsize is not None:
+        default_pool_config['pool_maxsize'] = pool_maxsize
+    if pool_block is not None:
+        default_pool_config['pool_block'] = pool_block
+    if keep_alive is not None:
+        default_pool_config['keep_alive'] = keep_alive
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = _create_session(**default_pool_config)
+    return
+
+
+def load_json_response(response, prefix=None, incremental=False):
+    """ Decode JSON data directly from the body of a streamed response.
+
+        The body is decoded from the byte stream without first converting it to a
+        string. By default the raw bytes are read and decoded in one step with the
+        JSON backend from the serializer module. When incremental is True and the
+        ijson package with its C backend is installed, the body is parsed
+        incrementally so only the decoded data is kept in memory. Incremental
+        parsing lowers peak memory for a large body but takes about twice as long.
+
+    Parameters
+    ----------
+    response : requests.Response
+        Response from request made with stream=True
+    prefix : str, optional
+        Path to item in ijson prefix format (for example 'result.item') to return
+        only the first matching item instead of the entire document
+    incremental : bool, optional
+        When True, parse the body incrementally when ijson is available
+
+    Returns
+    -------
+    data
+        Decoded data
+    """
+
+    response.raw.decode_content = True
+    try:
+        if incremental and ijson is not None:
+            try:
+                return next(ijson.items(response.raw, prefix or '', use_float=True))
+            except StopIteration:
+                raise ValueError('Response does not contain "{0}"'.format(prefix))
+        data = loads(response.raw.read())
+    finally:
+        # Parsing can stop before the end of the body when a prefix is specified.
+        release_response(response)
+
+    if prefix is not None:
+        for key in prefix.split('.'):
+            data = data[0] if key == 'item' else data[key]
+    return data
+
+
+def release_response(response):
+    """ Read the rest of a streamed response and return the connection to the pool.
+
+        Closing a streamed response before the body is read to the end closes the
+        connection instead of keeping it open for the next request.
+
+    Parameters
+    ----------
+    response : requests.Response
+        Response from request made with stream=True
+    """
+
+    raw = response.raw
+    if hasattr(raw, 'drain_conn'):
+        raw.drain_conn()
+    else:
+        while raw.read(65536, decode_content=False):
+            pass
+    if hasattr(raw, 'release_conn'):
+        raw.release_conn()
+    return
+
 
 def get_token(username, password=None, token_type='patric', timeout=30):
     """ Get an authentication token for SEED web services.
@@ -44,7 +229,7 @@ def get_token(username, password=None, token_type='patric', timeout=30):
         url = 'https://user.patricbrc.org/authenticate'
         request_data = {'username': username, 'password': password}
         try:
-            response = requests.post(url, data=request_data, timeout=timeout)
+            response = get_session().post(url, data=request_data, timeout=timeout)
         except Timeout as e:
             warn('The PATRIC authentication service did not return a response within {0} seconds. '
                  'Try again with a larger timeout value. (Details: {1})'.format(timeout, e))
@@ -61,14 +246,14 @@ def get_token(username, password=None, token_type='patric', timeout=30):
         headers['Authorization'] = 'Basic {0}'\
             .format(base64.urlsafe_b64encode(six.b(username + ':' + password)).decode("ascii"))
         try:
-            response = requests.get(url, headers=headers, timeout=timeout)
+            response = get_session().get(url, headers=headers, timeout=timeout)
         except Timeout as e:
             warn('The RAST authentication service did not return a response within {0} seconds. '
                  'Try again with a larger timeout value. (Details: {1})'.format(timeout, e))
             return None
         if response.status_code != requests.codes.OK:
             response.raise_for_status()
-        data = json.loads(response.text)
+        data = loads(response.content)
         token = data['access_token']
         user_id = data['client_id']
 
@@ -85,9 +270,167 @@ def get_token(username, password=None, token_type='patric', timeout=30):
     config.set('authentication', 'user_id', user_id)
     config.write(open(config_file, 'w'))
 
+    # Replace the cached token so clients start using the new token.
+    default_token_provider.set_token(token, user_id)
+
     return user_id
 
 
+def parse_token_expiry(token):
+    """ Get the expiration time from an authentication token.
+
+    Parameters
+    ----------
+    token : str
+        Authentication token for SEED web services
+
+    Returns
+    -------
+    int or None
+        Time when token expires in seconds since the epoch or None when token does not have an expiration time
+    """
+
+    for field in token.split('|'):
+        if field.startswith('expiry='):
+            try:
+                return int(field[7:])
+            except ValueError:
+                return None
+    return None
+
+
+class TokenProvider(object):
+    """ Provider of authentication tokens that caches the token in memory.
+
+        The token is read from the .patric_config file the first time it is needed
+        and then kept in memory. When the token is within refresh_margin seconds of
+        its expiration time, the provider calls the refresh function if one was
+        specified and reads the config file again in case the token was renewed.
+        This is done at most once every reload_interval seconds.
+    """
+
+    def __init__(self, config_file=None, refresh_margin=3600, refresh=None, reload_interval=60):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        config_file : str, optional
+            Path to config file with authentication section (default is .patric_config in home directory)
+        refresh_margin : int, optional
+            Number of seconds before the token expires to start trying to refresh it
+        refresh : function, optional
+            Function with no arguments that gets a new token, for example by calling get_token()
+        reload_interval : int, optional
+            Minimum number of seconds between attempts to renew a token that is close to expiring
+        """
+
+        self.config_file = config_file
+        self.refresh_margin = refresh_margin
+        self.refresh = refresh
+        self.reload_interval = reload_interval
+        self.token = None
+        self.user_id = None
+        self.expiry = None
+        self._checked_at = None
+        self._lock = threading.RLock()  # Reentrant because refresh function can call set_token()
+
+        return
+
+    def get(self):
+        """ Get the current authentication token.
+
+        Returns
+        -------
+        tuple
+            Authentication token and user ID
+
+        Raises
+        ------
+        AuthenticationError
+            When a token is not available or the token is expired
+        """
+
+        token, user_id = self.token, self.user_id
+        if token is not None and not self._needs_refresh():
+            return token, user_id
+
+        with self._lock:
+            loaded = False
+            if self.token is None:
+                self._load()
+                loaded = True
+            if self.token is not None and self._needs_refresh() and \
+                    (self._checked_at is None or time() - self._checked_at >= self.reload_interval):
+                self._checked_at = time()
+                if self.refresh is not None:
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        warn('Failed to refresh authentication token: {0}'.format(e))
+                    self._load()
+                elif not loaded:
+                    self._load()  # Another process may have renewed the token
+            if self.token is None:
+                raise AuthenticationError('Call get_token() to obtain an authentication token')
+            if self.expiry is not None and self.expiry <= time():
+                raise AuthenticationError('Authentication token expired, call get_token() to obtain a new token')
+            return self.token, self.user_id
+
+    def set_token(self, token, user_id):
+        """ Set the cached authentication token.
+
+        Parameters
+        ----------
+        token : str
+            Authentication token for SEED web services
+        user_id : str
+            User ID for token
+        """
+
+        with self._lock:
+            self.token = token
+            self.user_id = user_id
+            self.expiry = parse_token_expiry(token)
+        return
+
+    def invalidate(self):
+        """ Clear the cached token so it is read from the config file the next time it is needed. """
+
+        with self._lock:
+            self.token = None
+            self.user_id = None
+            self.expiry = None
+            self._checked_at = None
+        return
+
+    def _needs_refresh(self):
+        """ Check if the cached token is close to its expiration time. """
+
+        return self.expiry is not None and self.expiry - self.refresh_margin <= time()
+
+    def _load(self):
+        """ Read the authentication token from the config file. """
+
+        config_file = self.config_file
+        if config_file is None:
+            config_file = path.join(environ['HOME'], '.patric_config')
+        config = configparser.ConfigParser()
+        config.read(config_file)
+        try:
+            token = config.get('authentication', 'token')
+            user_id = config.get('authentication', 'user_id')
+        except (configparser.NoSectionError, configparser.NoOptionError):
+            return
+        self.token = token
+        self.user_id = user_id
+        self.expiry = parse_token_expiry(token)
+        return
+
+
+# Token provider shared by all clients that were not given a token.
+default_token_provider = TokenProvider()
+
+
 class ServerError(Exception):
     """ Exception raised when server returns an error. """
 
@@ -178,6 +521,16 @@ class AuthenticationError(Exception):
     """ Exception raised when there is a problem with authentication token. """
 
 
+class CircuitOpenError(Exception):
+    """ Exception raised when a service is failing and calls are not being sent to it. """
+    pass
+
+
+class ShockError(Exception):
+    """ Exception raised when data transferred to or from a Shock node is incomplete or corrupted. """
+    pass
+
+
 def handle_server_error(e, references=None):
     """ Handle an error returned by a PATRIC service server.
 
@@ -237,10 +590,454 @@ def handle_server_error(e, references=None):
     raise e
 
 
+# Names of server methods that only read data and are safe to send again after a failure.
+idempotent_methods = frozenset([
+    # Workspace methods
+    'get', 'ls', 'list_permissions', 'get_download_url',
+    # ProbModelSEED methods
+    'get_model', 'list_models', 'list_fba_studies', 'list_gapfill_solutions', 'CheckJobs',
+    'list_model_edits', 'export_model'
+])
+
+
+class RetryPolicy(object):
+    """ Policy for retrying a call to a server method after a transient failure. """
+
+    def __init__(self, max_attempts=3, backoff_factor=1.0, max_backoff=60.0, jitter=True,
+                 retry_status_codes=(502, 503, 504), methods=idempotent_methods):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        max_attempts : int, optional
+            Maximum number of times to send a request (1 to never retry)
+        backoff_factor : float, optional
+            Number of seconds to wait before first retry, doubled for each retry after that
+        max_backoff : float, optional
+            Maximum number of seconds to wait before a retry
+        jitter : bool, optional
+            When True, wait a random time up to the backoff time to spread out retries
+        retry_status_codes : tuple of int, optional
+            HTTP status codes that indicate a transient failure
+        methods : set of str, optional
+            Names of server methods that are safe to retry, when None retry all methods
+        """
+
+        if max_attempts < 1:
+            raise ValueError('max_attempts must be at least 1')
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_status_codes = frozenset(retry_status_codes)
+        self.methods = methods
+
+        return
+
+    def can_retry(self, method, attempt):
+        """ Check if a failed call to a server method can be sent again.
+
+        Parameters
+        ----------
+        method : str
+            Name of server method
+        attempt : int
+            Number of times the request has been sent
+
+        Returns
+        -------
+        bool
+            True when the call can be sent again
+        """
+
+        if attempt >= self.max_attempts:
+            return False
+        return self.methods is None or method in self.methods
+
+    def backoff(self, attempt, retry_after=None):
+        """ Get the number of seconds to wait before sending a request again.
+
+        Parameters
+        ----------
+        attempt : int
+            Number of times the request has been sent
+        retry_after : str, optional
+            Value of Retry-After header in response from server
+
+        Returns
+        -------
+        float
+            Number of seconds to wait
+        """
+
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if retry_after is not None:
+            try:
+                delay = max(delay, min(self.max_backoff, float(retry_after)))
+            except ValueError:
+                pass
+        return delay
+
+
+class CircuitBreaker(object):
+    """ Circuit breaker that fails fast when a service is down.
+
+        After failure_threshold consecutive transient failures, the circuit opens
+        and calls fail immediately with CircuitOpenError. After reset_timeout
+        seconds, one trial call is allowed through. If the trial call succeeds the
+        circuit closes, otherwise it opens again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        failure_threshold : int, optional
+            Number of consecutive failures that opens the circuit
+        reset_timeout : float, optional
+            Number of seconds to wait before allowing a trial call when circuit is open
+        """
+
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+        return
+
+    @property
+    def state(self):
+        """ str: Current state of circuit ('closed', 'open', or 'half-open') """
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time() - self.opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def before_call(self, name):
+        """ Check if a call can be sent to the service.
+
+        Parameters
+        ----------
+        name : str
+            Name of service
+
+        Raises
+        ------
+        CircuitOpenError
+            When the circuit is open
+        """
+
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.reset_timeout - (time() - self.opened_at)
+            if remaining <= 0 and not self._trial_in_progress:
+                self._trial_in_progress = True
+                return
+            raise CircuitOpenError('Service {0} is failing, calls are stopped for {1:.0f} more seconds after {2} '
+                                   'consecutive failures'.format(name, max(remaining, 0), self.failures))
+
+    def record_success(self):
+        """ Record a successful call which closes the circuit. """
+
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_progress = False
+        return
+
+    def record_failure(self):
+        """ Record a failed call which opens the circuit when there are too many failures. """
+
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_progress or self.failures >= self.failure_threshold:
+                self.opened_at = time()
+            self._trial_in_progress = False
+        return
+
+    def reset(self):
+        """ Close the circuit and clear the count of failures. """
+
+        self.record_success()
+        return
+
+
+class RateLimiter(object):
+    """ Token bucket rate limiter with a limit on the number of requests in flight.
+
+        Use the limiter as a context manager around a request to hold one of the
+        max_in_flight slots and call throttle() before sending each request to
+        wait for a token from the bucket.
+    """
+
+    def __init__(self, rate=None, burst=None, max_in_flight=None):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        rate : float, optional
+            Maximum average number of requests per second, when None do not limit rate
+        burst : int, optional
+            Maximum number of requests that can be sent at once (default is rate rounded up)
+        max_in_flight : int, optional
+            Maximum number of requests in flight at the same time, when None do not limit requests
+        """
+
+        self.rate = rate
+        self.burst = burst if burst is not None else (max(1, int(rate + 0.999)) if rate else None)
+        self.max_in_flight = max_in_flight
+        self._tokens = self.burst
+        self._last = time()
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+
+        return
+
+    def throttle(self):
+        """ Wait until a request can be sent without exceeding the rate limit. """
+
+        if self.rate is None:
+            return
+        while True:
+            with self._lock:
+                now = time()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            sleep(delay)
+
+    def __enter__(self):
+        if self._semaphore is not None:
+            self._semaphore.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if self._semaphore is not None:
+            self._semaphore.release()
+        return False
+
+
+# Rate limiters shared by all clients keyed by service name.
+_rate_limiters = dict()
+_rate_limiters_lock = threading.Lock()
+_unlimited = RateLimiter()
+
+
+def set_rate_limit(service, rate=None, burst=None, max_in_flight=None):
+    """ Limit the rate and number of requests in flight to a service for all clients in the process.
+
+        Service names are 'Workspace', 'ProbModelSEED', 'Shock', and 'PATRIC'.
+
+    Parameters
+    ----------
+    service : str
+        Name of service
+    rate : float, optional
+        Maximum average number of requests per second, when None do not limit rate
+    burst : int, optional
+        Maximum number of requests that can be sent at once (default is rate rounded up)
+    max_in_flight : int, optional
+        Maximum number of requests in flight at the same time, when None do not limit requests
+    """
+
+    with _rate_limiters_lock:
+        if rate is None and max_in_flight is None:
+            _rate_limiters.pop(service, None)
+        else:
+            _rate_limiters[service] = RateLimiter(rate, burst, max_in_flight)
+    return
+
+
+def get_rate_limiter(service):
+    """ Get the rate limiter for a service.
+
+    Parameters
+    ----------
+    service : str
+        Name of service
+
+    Returns
+    -------
+    RateLimiter
+        Rate limiter for service or a limiter that does not limit requests
+    """
+
+    return _rate_limiters.get(service, _unlimited)
+
+
+class _Flight(object):
+    """ Function call in progress that other callers can wait on. """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """ Coalesce concurrent identical function calls into one call.
+
+        While a call with a key is in progress, other calls with the same key wait
+        for it to end and get the same result or exception. The result is shared by
+        all of the callers so the function should return a value that cannot be
+        modified, for example the bytes of a response body that each caller decodes.
+    """
+
+    def __init__(self):
+        self._flights = dict()
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args, **kwargs):
+        """ Call a function unless a call with the same key is already in progress.
+
+        Parameters
+        ----------
+        key : hashable
+            Key that identifies identical calls
+        func : function
+            Function to call
+        args : list
+            Positional arguments for function
+        kwargs : dict
+            Keyword arguments for function
+
+        Returns
+        -------
+        data
+            Return value of function
+        """
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+
+        if leader:
+            try:
+                flight.result = func(*args, **kwargs)
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    if self._flights.get(key) is flight:
+                        del self._flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def forget(self, match):
+        """ Stop later calls from joining the calls in progress that match.
+
+            A call that is forgotten runs to the end for the callers that are already
+            waiting on it and the next call with the same key starts a new call.
+
+        Parameters
+        ----------
+        match : function
+            Function that returns True when the call with the specified key is forgotten
+        """
+
+        with self._lock:
+            for key in [key for key in self._flights if match(key)]:
+                del self._flights[key]
+        return
+
+
+# Coalescer shared by all clients for calls to read-only methods.
+single_flight = SingleFlight()
+
+
+class _CallFailure(object):
+    """ Container for an exception raised by one call in a group of calls. """
+
+    def __init__(self, error):
+        self.error = error
+
+
+class ClientContext(object):
+    """ Clients for the Workspace and ModelSEED web services used by one user.
+
+        By default, the public functions use clients shared by the whole process.
+        Pass a context to the functions to use separate clients, for example to
+        work with the services as multiple users in one process. Clients are
+        thread-safe so one context can be used from multiple threads.
+    """
+
+    def __init__(self, token=None, token_provider=None, workspace_url=None, modelseed_url=None, session=None):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        token : str, optional
+            Authentication token for SEED web services, when None get the token from the token provider
+        token_provider : TokenProvider, optional
+            Provider of authentication token when token is None, when None use the default provider
+        workspace_url : str, optional
+            URL of Workspace service endpoint (default is URL of workspace.ws_client)
+        modelseed_url : str, optional
+            URL of ModelSEED service endpoint (default is URL of modelseed.ms_client)
+        session : requests.Session, optional
+            Session for making requests, when None use the session shared by all clients
+        """
+
+        from . import workspace, modelseed
+        if workspace_url is None:
+            workspace_url = workspace.ws_client.url
+        if modelseed_url is None:
+            modelseed_url = modelseed.ms_client.url
+        self.workspace = SeedClient(workspace_url, 'Workspace', token=token, session=session,
+                                    token_provider=token_provider)
+        self.modelseed = SeedClient(modelseed_url, 'ProbModelSEED', token=token, session=session,
+                                    token_provider=token_provider)
+        self.metadata_cache = MetadataCache()
+
+        return
+
+
+def _map_server_error(e, references=None):
+    """ Convert an error returned by a server to the exception that handle_server_error() raises.
+
+    Parameters
+    ----------
+    e : Exception
+        Exception returned by server
+    references : list
+        List of workspace references in input parameters of server method
+
+    Returns
+    -------
+    _CallFailure
+        Container with the converted exception
+    """
+
+    try:
+        handle_server_error(e, references)
+    except Exception as error:
+        return _CallFailure(error)
+
+
 class SeedClient(object):
     """ Client for SEED web services """
 
-    def __init__(self, url, name, token=None):
+    def __init__(self, url, name, token=None, session=None, retry_policy=None, circuit_breaker=None,
+                 token_provider=None, coalesce=True):
         """ Initialize object.
 
         Parameters
@@ -251,21 +1048,47 @@ class SeedClient(object):
             Name of service
         token : str, optional
             Authentication token for SEED web services, when None get the
-            token from the .patric_config file when calling a method
+            token from the token provider when calling a method
+        session : requests.Session, optional
+            Session for making requests, when None use the session shared by all clients
+        retry_policy : RetryPolicy, optional
+            Policy for retrying calls after a transient failure, when None use default policy
+        circuit_breaker : CircuitBreaker, optional
+            Circuit breaker for the service, when None use a new circuit breaker with default settings
+        token_provider : TokenProvider, optional
+            Provider of authentication token when token is None, when None use the default provider
+            which reads the token from the .patric_config file
+        coalesce : bool, optional
+            When True, concurrent identical calls to read-only methods share one request and response
         """
 
         self.url = url
         self.name = name
+        self._session = session
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.circuit_breaker = circuit_breaker if circuit_breaker is not None else CircuitBreaker()
+        self.coalesce = coalesce
+        self.token_provider = None
         self.username = None
         if token is not None:
             self.username = token.split('|')[0].replace('un=', '')
+        else:
+            self.token_provider = token_provider if token_provider is not None else default_token_provider
 
         # Create the headers for the request to the server.
         self.headers = dict()
         self.headers['AUTHORIZATION'] = token
+        self._lock = threading.Lock()
 
         return
 
+    @property
+    def session(self):
+        """ requests.Session: Session used for making requests to the service """
+        if self._session is not None:
+            return self._session
+        return get_session()
+
     def call(self, method, params, timeout=1800):
         """ Call a server method and wait for the response.
 
@@ -287,11 +1110,42 @@ class SeedClient(object):
         ------
         ServerError
             When server returns an error response
+        CircuitOpenError
+            When the service is failing and the call was not sent
         """
 
-        # If needed, look for the authentication token in the Patric config file.
-        if self.headers['AUTHORIZATION'] is None:
-            self.set_authentication_token()
+        # If needed, get the current authentication token from the token provider. The
+        # headers are a snapshot so another thread can update the token at any time.
+        headers = self.set_authentication_token()
+
+        # Concurrent identical calls to a read-only method share one request and response
+        # body. Each caller decodes its own copy of the output so a caller can modify it.
+        if self.coalesce and method in idempotent_methods:
+            key = (self.url, method, dumps(params), headers['AUTHORIZATION'])
+            body = single_flight.do(key, self._call, method, params, timeout, headers)
+        else:
+            body = self._call(method, params, timeout, headers)
+        return loads(body)['result'][0]
+
+    def _call(self, method, params, timeout, headers):
+        """ Call a server method and wait for the response.
+
+        Parameters
+        ----------
+        method: str
+            Name of server method
+        params : dict
+            Dictionary of input parameters for method
+        timeout : integer
+            Number of seconds to wait for response
+        headers : dict
+            Headers for request
+
+        Returns
+        -------
+        bytes
+            Body of response with output of method in JSON format
+        """
 
         # Create the body of the request for the specified method.
         request_data = dict()
@@ -300,12 +1154,61 @@ class SeedClient(object):
         request_data['version'] = '1.1'
         request_data['id'] = '1'
 
-        # Send the request to the server and get back a response.
-        response = requests.post(self.url, data=json.dumps(request_data), headers=self.headers, timeout=timeout)
+        # Send the request to the server and get back a response. Wait for a free slot
+        # first when the number of requests in flight to the service is limited. Each
+        # attempt is measured separately and the wait before a retry is not measured.
+        body = dumps(request_data)
+        with get_rate_limiter(self.name):
+            attempt = 0
+            while True:
+                attempt += 1
+                with metrics.registry.measure(self.name, method) as measurement:
+                    measurement.request_bytes = len(body)
+                    measurement.retry = attempt > 1
+                    try:
+                        response = self._post(method, body, timeout, headers)
+                    except (RequestsConnectionError, Timeout) as e:
+                        if not self.retry_policy.can_retry(method, attempt):
+                            raise
+                        measurement.error = e
+                        delay = self.retry_policy.backoff(attempt)
+                    else:
+                        try:
+                            if response.status_code in self.retry_policy.retry_status_codes and \
+                                    self.retry_policy.can_retry(method, attempt):
+                                measurement.error = requests.HTTPError('{0} error for url {1}'
+                                                                       .format(response.status_code, self.url))
+                                delay = self.retry_policy.backoff(attempt, response.headers.get('retry-after'))
+                            else:
+                                return self._read_response(response)
+                        finally:
+                            release_response(response)
+                            measurement.response_bytes = response.raw.tell()
+                            response.close()
+                sleep(delay)
+
+    def _read_response(self, response):
+        """ Get the body of a response with the output from a server method.
+
+        Parameters
+        ----------
+        response : requests.Response
+            Streamed response from server
+
+        Returns
+        -------
+        bytes
+            Body of response with output of method in JSON format
+
+        Raises
+        ------
+        ServerError
+            When server returns an error response
+        """
 
         if response.status_code == requests.codes.server_error:
-            if 'content-type' in response.headers and response.headers['content-type'] == 'application/json':
-                err = json.loads(response.text)
+            if response.headers.get('content-type') == 'application/json':
+                err = loads(response.content)
                 if 'error' in err:
                     raise ServerError(**err['error'])
                 else:
@@ -315,22 +1218,125 @@ class SeedClient(object):
 
         if response.status_code != requests.codes.OK:
             response.raise_for_status()
-        return json.loads(response.text)['result'][0]  # Get the output from the method in the response
+
+        return response.content
+
+    def _post(self, method, body, timeout, headers):
+        """ Send one request to the server and record the outcome in the circuit breaker.
+
+        Parameters
+        ----------
+        method: str
+            Name of server method
+        body : bytes
+            Body of request
+        timeout : integer
+            Number of seconds to wait for response
+        headers : dict
+            Headers for request
+
+        Returns
+        -------
+        requests.Response
+            Streamed response from server
+        """
+
+        self.circuit_breaker.before_call(self.name)
+        get_rate_limiter(self.name).throttle()
+        response = None
+        try:
+            response = self.session.post(self.url, data=body, headers=headers, timeout=timeout, stream=True)
+        finally:
+            # Record the outcome of every request, including unexpected exceptions,
+            # so a trial call never leaves the circuit breaker stuck open.
+            if response is None or response.status_code in self.retry_policy.retry_status_codes:
+                self.circuit_breaker.record_failure()
+            else:
+                self.circuit_breaker.record_success()
+        return response
+
+    def call_many(self, method, params_list, timeout=1800, max_workers=8, references=None,
+                  return_exceptions=False):
+        """ Call a server method for each set of parameters and wait for all of the responses.
+
+            The calls are dispatched concurrently over the pool of persistent connections.
+            An error returned by the server for one call is converted to a specific
+            exception with handle_server_error() and does not stop the other calls.
+
+        Parameters
+        ----------
+        method : str
+            Name of server method
+        params_list : list of dict
+            List of dictionaries of input parameters for method
+        timeout : integer
+            Number of seconds to wait for each response
+        max_workers : integer
+            Maximum number of calls to run at the same time
+        references : list of list of str, optional
+            List of workspace references in input parameters for each call
+        return_exceptions : bool, optional
+            When True, put the exception for a failed call in the output list instead of raising it
+
+        Returns
+        -------
+        list
+            Output of method for each set of parameters in the same order as input
+
+        Raises
+        ------
+        Exception
+            Exception for the first failed call when return_exceptions is False
+        """
+
+        if len(params_list) == 0:
+            return list()
+        if references is not None and len(references) != len(params_list):
+            raise ValueError('Number of references lists must match number of parameters')
+
+        # Get the authentication token once before dispatching the calls.
+        self.set_authentication_token()
+
+        def run_call(index):
+            try:
+                return self.call(method, params_list[index], timeout=timeout)
+            except Exception as e:
+                return _map_server_error(e, references[index] if references is not None else None)
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(params_list))) as executor:
+            output = list(executor.map(run_call, range(len(params_list))))
+
+        if not return_exceptions:
+            for result in output:
+                if isinstance(result, _CallFailure):
+                    raise result.error
+        return [result.error if isinstance(result, _CallFailure) else result for result in output]
 
     def set_authentication_token(self):
-        """ Set the authentication token from the config file.
+        """ Set the authentication token from the token provider.
+
+            The headers are replaced instead of changed so a request in progress
+            in another thread keeps the headers it started with.
+
+        Returns
+        -------
+        dict
+            Headers for a request with the current authentication token
 
         Raises
         ------
         AuthenticationError
-            When there is a problem with the authentication section in the config file
+            When a token is not available or the token is expired
         """
 
-        config = configparser.ConfigParser()
-        config.read(path.join(environ['HOME'], '.patric_config'))
-        try:
-            self.headers['AUTHORIZATION'] = config.get('authentication', 'token')
-            self.username = config.get('authentication', 'user_id')
-        except (configparser.NoSectionError, configparser.NoOptionError):
-            self.headers['AUTHORIZATION'] = None
-            raise AuthenticationError('Call get_token() to obtain an authentication token')
+        if self.token_provider is None:
+            return self.headers
+        with self._lock:
+            try:
+                token, self.username = self.token_provider.get()
+            except AuthenticationError:
+                self.headers = {'AUTHORIZATION': None}
+                raise
+            if token != self.headers['AUTHORIZATION']:
+                self.headers = {'AUTHORIZATION': token}
+            return self.headers
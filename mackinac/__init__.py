@@ -3,7 +3,17 @@ from .modelseed import delete_modelseed_model, gapfill_modelseed_model, get_mode
     list_modelseed_models, create_cobra_model_from_modelseed_model, \
     create_universal_model, optimize_modelseed_model, reconstruct_modelseed_model
 from .workspace import get_workspace_object_data, get_workspace_object_meta, list_workspace_objects, \
-    put_workspace_object, delete_workspace_object
-from .genome import get_genome_summary, get_genome_features
+    put_workspace_object, delete_workspace_object, download_workspace_object, upload_workspace_object, \
+    get_workspace_objects_meta, get_workspace_objects_data, put_workspace_objects, delete_workspace_objects, \
+    walk_workspace_folder, copy_workspace_objects, move_workspace_objects, set_object_cache, ObjectMetadata, \
+    MetadataList
+from .genome import get_genome_summary, get_genome_features, iter_genome_features
 from .likelihood import calculate_modelseed_likelihoods, calculate_likelihoods, download_data_files
-from .SeedClient import get_token
+from .mirror import sync_workspace_folder
+from .index import MetadataIndex
+from .SeedClient import get_token, configure_session, set_rate_limit
+from . import metrics
+
+import sys
+if sys.version_info >= (3, 5):  # The aio module uses async and await
+    from . import aio
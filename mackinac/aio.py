@@ -0,0 +1,372 @@
+""" Asynchronous versions of the workspace and ModelSEED functions.
+
+    The functions in this module are coroutines that can be run concurrently from a
+    single asyncio event loop. Requests to a web service run on a pool of worker
+    threads that share the persistent connections of the synchronous clients. While
+    waiting for a ModelSEED job to end, a coroutine does not hold a worker thread so
+    one event loop can drive hundreds of reconstructions and job polls.
+"""
+
+from __future__ import absolute_import
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from . import workspace, modelseed
+from .SeedClient import ServerError, ObjectNotFoundError, handle_server_error
+
+
+class AsyncSeedClient(object):
+    """ Asynchronous client for SEED web services """
+
+    def __init__(self, client, max_workers=32):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        client : SeedClient
+            Client used to make requests to the service
+        max_workers : integer, optional
+            Maximum number of requests to run at the same time
+        """
+
+        self.client = client
+        self.max_workers = max_workers
+        self._executor = None
+
+        return
+
+    @property
+    def executor(self):
+        """ concurrent.futures.ThreadPoolExecutor: Pool of worker threads for running requests """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def call(self, method, params, timeout=1800):
+        """ Call a server method and wait for the response without blocking the event loop.
+
+        Parameters
+        ----------
+        method: str
+            Name of server method
+        params : dict
+            Dictionary of input parameters for method
+        timeout : integer
+            Number of seconds to wait for response
+
+        Returns
+        -------
+        data
+            Output of method in JSON format
+
+        Raises
+        ------
+        ServerError
+            When server returns an error response
+        """
+
+        return await self.run(self.client.call, method, params, timeout=timeout)
+
+    async def run(self, func, *args, **kwargs):
+        """ Run a blocking function on a worker thread and wait for it to end.
+
+        Parameters
+        ----------
+        func : function
+            Function to run
+        args : list
+            Positional arguments for function
+        kwargs : dict
+            Keyword arguments for function
+
+        Returns
+        -------
+        data
+            Return value of function
+        """
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def close(self):
+        """ Shut down the pool of worker threads. """
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        return
+
+
+# Client for running functions on Workspace web service.
+ws_client = AsyncSeedClient(workspace.ws_client)
+
+# Client for running functions on ModelSEED web service.
+ms_client = AsyncSeedClient(modelseed.ms_client)
+
+# Number of seconds to wait between checks on the status of a ModelSEED job
+job_poll_interval = 3
+
+
+async def _call_modelseed(method, params, context):
+    """ Call a ModelSEED server method with the client from a context or the shared client. """
+
+    return await ms_client.run(modelseed._modelseed_client(context).call, method, params)
+
+
+async def get_workspace_object_meta(reference, context=None):
+    """ Get the metadata for an object.
+
+    Parameters
+    ----------
+    reference : str
+        Workspace reference to object
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    tuple
+        Object metadata
+    """
+
+    return await ws_client.run(workspace.get_workspace_object_meta, reference, context=context)
+
+
+async def get_workspace_object_data(reference, json_data=True, context=None):
+    """ Get the data for an object.
+
+    Parameters
+    ----------
+    reference : str
+        Workspace reference to object
+    json_data : bool, optional
+        When True, convert data from returned JSON format
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    data
+        Object data (can be dict, list, or string)
+    """
+
+    return await ws_client.run(workspace.get_workspace_object_data, reference, json_data=json_data, context=context)
+
+
+async def list_workspace_objects(folder, sort_key='folder', recursive=True, context=None):
+    """ List the objects in the specified workspace folder.
+
+    Parameters
+    ----------
+    folder : str
+        Workspace reference to folder
+    sort_key : {'folder', 'name', 'date', 'type'}, optional
+        Name of field to use as sort key for output
+    recursive : bool, optional
+        When True, include all subobjects in folder
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    list or None
+        List of object data for objects in folder or None if folder was not found
+    """
+
+    return await ws_client.run(workspace.list_workspace_objects, folder, sort_key=sort_key, recursive=recursive,
+                               context=context)
+
+
+async def put_workspace_object(reference, object_type, data=None, metadata=None, shock=None, overwrite=False,
+                               context=None):
+    """ Put an object and its metadata in the workspace.
+
+    Parameters
+    ----------
+    reference : str
+        Workspace reference to object
+    object_type : str
+        Type of object
+    data : anything, optional
+        Data to store in object (can be dict, list, or string depending on object type)
+    metadata : dict, optional
+        User metadata for object
+    shock : bool, optional
+        When True, store data for object in Shock, when False send data inline, when
+        None choose based on the size of the data
+    overwrite : bool, optional
+        When True, overwrite the contents of an existing object
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    tuple
+        Object metadata
+    """
+
+    return await ws_client.run(workspace.put_workspace_object, reference, object_type, data=data,
+                               metadata=metadata, shock=shock, overwrite=overwrite, context=context)
+
+
+async def delete_workspace_object(reference, force=False, context=None):
+    """ Delete an object.
+
+    Parameters
+    ----------
+    reference : str
+        Workspace reference to object
+    force : bool, optional
+        When True, delete folders and all subobjects
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    tuple
+        Object metadata of deleted object
+    """
+
+    return await ws_client.run(workspace.delete_workspace_object, reference, force=force, context=context)
+
+
+async def get_modelseed_model_stats(model_id, context=None):
+    """ Get the model statistics for a ModelSEED model.
+
+    Parameters
+    ----------
+    model_id : str
+        ID of model
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    dict
+        Dictionary of current model statistics
+    """
+
+    return await ms_client.run(modelseed.get_modelseed_model_stats, model_id, context=context)
+
+
+async def gapfill_modelseed_model(model_id, media_reference=None, likelihood=False, comprehensive=False,
+                                  solver=None, context=None):
+    """ Run gap fill on a ModelSEED model.
+
+    Parameters
+    ----------
+    model_id : str
+        ID of model
+    media_reference : str, optional
+        Workspace reference to media to gap fill on (default is complete media)
+    likelihood : bool, optional
+        True to use likelihood-based gap fill
+    comprehensive : bool, optional
+        True to run a comprehensive gap fill
+    solver : str, optional
+        Name of LP solver (None to use default solver as configured in web service)
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    dict
+        Dictionary of current model statistics
+    """
+
+    reference = await ms_client.run(modelseed._make_modelseed_reference, model_id, context=context)
+    params = modelseed._make_gapfill_params(reference, media_reference, likelihood, comprehensive, solver)
+
+    try:
+        job_id = await _call_modelseed('GapfillModel', params, context)
+        await wait_for_job(job_id, context=context)
+    except ServerError as e:
+        references = [reference]
+        if media_reference is not None:
+            references.append(media_reference)
+        handle_server_error(e, references)
+
+    return await ms_client.run(modelseed._finish_model_job, model_id, context)
+
+
+async def reconstruct_modelseed_model(genome_id, source='patric', template_reference=None, likelihood=False,
+                                      model_id=None, context=None):
+    """ Reconstruct a draft ModelSEED model for an organism.
+
+    Parameters
+    ----------
+    genome_id : str
+        Genome ID or workspace reference to genome
+    source : {'patric', 'rast', 'workspace'}, optional
+        Source of genome
+    template_reference : str, optional
+        Workspace reference to template model
+    likelihood : bool, optional
+        True to generate reaction likelihoods
+    model_id : str, optional
+        ID of output model (default is genome ID)
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    dict
+        Dictionary of current model statistics
+    """
+
+    # Set input parameters for method.
+    model_id, params = modelseed._make_reconstruction_params(genome_id, source, template_reference,
+                                                             likelihood, model_id)
+
+    # Workaround for ModelSEED workspace bug. The user's modelseed folder must exist before saving
+    # the model. See reconstruct_modelseed_model() in modelseed module for details.
+    client = modelseed._modelseed_client(context)
+    if client.username is None:
+        await ms_client.run(client.set_authentication_token)
+    folder_reference = '/{0}/{1}'.format(client.username, modelseed.model_folder)
+    try:
+        await get_workspace_object_meta(folder_reference, context=context)
+    except ObjectNotFoundError:
+        await put_workspace_object(folder_reference, 'folder', context=context)
+
+    # Run the server method.
+    try:
+        job_id = await _call_modelseed('ModelReconstruction', params, context)
+    except ServerError as e:
+        references = None
+        if template_reference is not None:
+            references = [template_reference]
+        handle_server_error(e, references)
+
+    await wait_for_job(job_id, context=context)
+    return await ms_client.run(modelseed._finish_reconstruction, genome_id, model_id, context)
+
+
+async def wait_for_job(jobid, context=None):
+    """ Wait for a job submitted to the ModelSEED app service to end.
+
+    Parameters
+    ----------
+    jobid : str
+        ID of submitted job
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    dict
+        Task structure with status of job
+
+    Raises
+    ------
+    JobError
+        When a job with the specified ID was not found
+    """
+
+    task = None
+    while task is None:
+        task = modelseed._check_job(await _call_modelseed('CheckJobs', {}, context), jobid)
+        if task is None:
+            await asyncio.sleep(job_poll_interval)
+    return task
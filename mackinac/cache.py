@@ -0,0 +1,331 @@
+""" Caches of workspace object data on local disk and object metadata in memory.
+
+    Every version of a workspace object has a unique combination of the object's
+    UUID and creation time (fields 4 and 3 of the object metadata). An object that
+    is overwritten gets a new creation time so the cached data for an old version
+    is never returned. The data is stored compressed and the least recently used
+    entries are removed when the total size of the cache is over a limit.
+
+    Object metadata is cached for a short time so checking if an object exists
+    does not need a request to the workspace service every time.
+"""
+
+from __future__ import absolute_import
+from collections import OrderedDict
+from os import listdir, makedirs, remove, rename, utime
+from os.path import exists, getsize, getmtime, join
+from time import time
+from uuid import uuid4
+import io
+import re
+import threading
+import zlib
+
+# Characters that are not allowed in the name of a cache file
+_unsafe_re = re.compile(r'[^A-Za-z0-9_-]')
+
+
+class ObjectCache(object):
+    """ Cache of workspace object data stored in a directory.
+
+        The size and time of last use of every entry is kept in memory so adding
+        an entry does not need to look at every file in the directory.
+    """
+
+    def __init__(self, directory, max_size=1073741824, compress_level=1):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        directory : str
+            Path to directory for storing cached data
+        max_size : int, optional
+            Maximum number of bytes of compressed data in the cache
+        compress_level : int, optional
+            Level of zlib compression from 1 (fastest) to 9 (smallest)
+        """
+
+        self.directory = directory
+        self.max_size = max_size
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        if not exists(directory):
+            makedirs(directory)
+
+        # Index of entries keyed by file name in order of last use with the size of
+        # each entry and the file name of the current version of each object.
+        self._entries = OrderedDict()
+        self._versions = dict()
+        self._size = 0
+        for name, size, mtime in sorted(self._scan(), key=lambda entry: entry[2]):
+            self._add(name, size)
+
+        return
+
+    def _file_name(self, uuid, creation_time):
+        return '{0}.{1}.z'.format(_unsafe_re.sub('', uuid), _unsafe_re.sub('', creation_time))
+
+    def get(self, uuid, creation_time):
+        """ Get the data for a version of an object.
+
+        Parameters
+        ----------
+        uuid : str
+            UUID of object
+        creation_time : str
+            Time when object was created
+
+        Returns
+        -------
+        bytes or None
+            Object data or None when the version of the object is not in the cache
+        """
+
+        file_name = self._file_name(uuid, creation_time)
+        path = join(self.directory, file_name)
+        try:
+            with io.open(path, 'rb') as handle:
+                data = zlib.decompress(handle.read())
+            utime(path, None)  # Modification time is the time of last use
+        except (IOError, OSError, zlib.error):
+            return None
+        with self._lock:
+            if file_name in self._entries:
+                self._entries[file_name] = self._entries.pop(file_name)
+        return data
+
+    def put(self, uuid, creation_time, data):
+        """ Put the data for a version of an object in the cache.
+
+            Older versions of the object are removed from the cache.
+
+        Parameters
+        ----------
+        uuid : str
+            UUID of object
+        creation_time : str
+            Time when object was created
+        data : bytes
+            Object data
+        """
+
+        file_name = self._file_name(uuid, creation_time)
+        compressed = zlib.compress(data, self.compress_level)
+        if len(compressed) > self.max_size:
+            return
+
+        # Write to a temporary file first so a partial file is never read.
+        temp_path = join(self.directory, '.{0}.tmp'.format(uuid4().hex))
+        with io.open(temp_path, 'wb') as handle:
+            handle.write(compressed)
+        with self._lock:
+            old_name = self._versions.get(file_name.split('.')[0], None)
+            if old_name is not None:
+                self._remove(old_name)
+            path = join(self.directory, file_name)
+            if exists(path):
+                remove(path)
+            rename(temp_path, path)
+            self._add(file_name, len(compressed))
+            if self._size > self.max_size:
+                self._evict()
+        return
+
+    def clear(self):
+        """ Remove all entries from the cache. """
+
+        with self._lock:
+            for name, size, mtime in self._scan():
+                self._remove(name)
+            self._entries = OrderedDict()
+            self._versions = dict()
+            self._size = 0
+        return
+
+    @property
+    def size(self):
+        """ int: Number of bytes of compressed data in the cache """
+        return self._size
+
+    def _scan(self):
+        """ Get the name, size, and time of last use of every entry in the cache directory. """
+
+        entries = list()
+        for name in listdir(self.directory):
+            if not name.endswith('.z'):
+                continue
+            path = join(self.directory, name)
+            try:
+                entries.append((name, getsize(path), getmtime(path)))
+            except OSError:
+                pass
+        return entries
+
+    def _add(self, name, size):
+        """ Add an entry to the index as the most recently used entry. """
+
+        self._entries[name] = size
+        self._versions[name.split('.')[0]] = name
+        self._size += size
+        return
+
+    def _evict(self):
+        """ Remove the least recently used entries until the cache is under the maximum size. """
+
+        while self._size > self.max_size and len(self._entries) > 0:
+            self._remove(next(iter(self._entries)))
+        return
+
+    def _remove(self, name):
+        """ Remove an entry from the index and the directory. """
+
+        size = self._entries.pop(name, None)
+        if size is not None:
+            self._size -= size
+            prefix = name.split('.')[0]
+            if self._versions.get(prefix, None) == name:
+                del self._versions[prefix]
+        try:
+            remove(join(self.directory, name))
+        except OSError:
+            pass
+        return
+
+
+class MetadataCache(object):
+    """ Cache of workspace object metadata in memory where entries expire after a time to live.
+
+        Every invalidation advances a generation counter and records it for the
+        invalidated reference. A caller gets the current generation before it asks
+        the workspace service for metadata and passes it to put(). The metadata is
+        not stored when the object or a folder that contains it was invalidated
+        after that generation, so a lookup that was in progress during a change
+        cannot cache the old metadata.
+    """
+
+    def __init__(self, ttl=60.0, max_entries=10000):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        ttl : float, optional
+            Number of seconds an entry is valid after it is added
+        max_entries : int, optional
+            Maximum number of entries, oldest entries are removed when the cache is full
+        """
+
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._invalidated = OrderedDict()  # Generation when each reference was last invalidated
+        self._oldest_generation = 0  # Generations before this were forgotten
+        self._lock = threading.Lock()
+
+        return
+
+    def generation(self):
+        """ Get the current generation of the cache.
+
+        Returns
+        -------
+        int
+            Current generation to pass to put()
+        """
+
+        with self._lock:
+            return self._generation
+
+    def get(self, reference):
+        """ Get the metadata for an object.
+
+        Parameters
+        ----------
+        reference : str
+            Workspace reference to object
+
+        Returns
+        -------
+        tuple or None
+            Object metadata or None when the object is not in the cache or the entry expired
+        """
+
+        key = reference.rstrip('/')
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                return None
+            if time() - entry[0] > self.ttl:
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def put(self, reference, metadata, generation=None):
+        """ Put the metadata for an object in the cache.
+
+        Parameters
+        ----------
+        reference : str
+            Workspace reference to object
+        metadata : tuple
+            Object metadata
+        generation : int, optional
+            Generation from before the metadata was retrieved, when None always store the metadata
+
+        Returns
+        -------
+        bool
+            True when the metadata was stored
+        """
+
+        key = reference.rstrip('/')
+        with self._lock:
+            if generation is not None and self._changed_since(key, generation):
+                return False
+            self._entries.pop(key, None)
+            self._entries[key] = (time(), metadata)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def invalidate(self, reference):
+        """ Remove the metadata for an object and all of the objects it contains.
+
+        Parameters
+        ----------
+        reference : str
+            Workspace reference to object
+        """
+
+        key = reference.rstrip('/')
+        prefix = key + '/'
+        with self._lock:
+            for name in [name for name in self._entries if name == key or name.startswith(prefix)]:
+                del self._entries[name]
+            self._generation += 1
+            self._invalidated.pop(key, None)
+            self._invalidated[key] = self._generation
+            while len(self._invalidated) > self.max_entries:
+                self._oldest_generation = self._invalidated.popitem(last=False)[1]
+        return
+
+    def _changed_since(self, key, generation):
+        """ Check if an object or a folder that contains it was invalidated after a generation. """
+
+        if generation < self._oldest_generation:
+            return True
+        while len(key) > 0:
+            if self._invalidated.get(key, 0) > generation:
+                return True
+            key = key.rpartition('/')[0]
+        return False
+
+    def clear(self):
+        """ Remove all entries from the cache. """
+
+        with self._lock:
+            self._entries = OrderedDict()
+            self._generation += 1
+            self._invalidated = OrderedDict()
+            self._oldest_generation = self._generation
+        return
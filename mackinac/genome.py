@@ -1,10 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
 from os.path import join
 import requests
 
+from .serializer import loads
+from .SeedClient import get_session, get_rate_limiter
+from . import metrics
+
 # PATRIC service endpoint
 patric_url = 'https://www.patricbrc.org/api/'
 
 
+def _patric_get(data_type, url, **kwargs):
+    """ Send a GET request to the PATRIC data API and record metrics for the request.
+
+    Parameters
+    ----------
+    data_type : str
+        Type of data requested (used as method name in metrics)
+    url : str
+        URL for request
+    kwargs : dict
+        Keyword arguments for requests.Session.get()
+
+    Returns
+    -------
+    requests.Response
+        Response from server
+    """
+
+    limiter = get_rate_limiter('PATRIC')
+    with limiter:
+        limiter.throttle()
+        with metrics.registry.measure('PATRIC', data_type) as measurement:
+            response = get_session().get(url, verify=True, **kwargs)
+            measurement.response_bytes = response.raw.tell()
+            if response.status_code != requests.codes.OK:
+                measurement.error = requests.HTTPError('{0} error for url {1}'.format(response.status_code, url))
+    return response
+
+
 def get_genome_summary(genome_id):
     """ Get the summary data for a genome in PATRIC.
 
@@ -21,68 +55,144 @@ def get_genome_summary(genome_id):
 
     headers = {'accept': 'application/json'}
     genome_url = join(patric_url, 'genome', genome_id)
-    response = requests.get(genome_url, headers=headers, verify=True)
+    response = _patric_get('genome', genome_url, headers=headers)
     if response.status_code != requests.codes.OK:
         if response.status_code == 404:
             raise ValueError('Genome ID {0} not found in PATRIC'.format(genome_id))
         response.raise_for_status()
-    return response.json()
+    return loads(response.content)
 
 
-def get_genome_features(genome_id, annotation='PATRIC'):
-    """ Get the list of features from the genome annotation.
+def _get_feature_page(feature_url, query, headers):
+    """ Run a SOLR query to get one page of features.
+
+    Parameters
+    ----------
+    feature_url : str
+        URL for genome_feature data type
+    query : dict
+        SOLR query parameters
+    headers : dict
+        Headers for request
+
+    Returns
+    -------
+    dict
+        Decoded SOLR response
+    """
+
+    response = _patric_get('genome_feature', feature_url, params=query, headers=headers)
+    if response.status_code != requests.codes.OK:
+        response.raise_for_status()
+    return loads(response.content)
+
+
+def _iter_feature_pages(genome_id, feature_url, query, headers):
+    """ Yield the features from each page of a SOLR cursor query and retrieve the next page in the background.
 
     Parameters
     ----------
     genome_id: str
         Genome ID of genome available in PATRIC
-    annotation : {'patric', 'refseq'}, optional
+    feature_url : str
+        URL for genome_feature data type
+    query : dict
+        SOLR query parameters with cursorMark set to the first page
+    headers : dict
+        Headers for request
+
+    Yields
+    ------
+    dict
+        Feature (keys vary based on available data)
+    """
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(_get_feature_page, feature_url, dict(query), headers)
+        while future is not None:
+            feature_data = future.result()
+            if query['cursorMark'] == '*' and feature_data['response']['numFound'] == 0:
+                # The filter queries select features from the annotation so confirm the genome
+                # has features before reporting an error. Otherwise there are no features to yield.
+                existence = {'q': query['q'], 'rows': '0'}
+                if _get_feature_page(feature_url, existence, headers)['response']['numFound'] == 0:
+                    raise ValueError('No features found for genome {0}'.format(genome_id))
+                return
+
+            # The cursor does not change after the last page. Otherwise start getting the next
+            # page while the caller uses the features in this page.
+            if feature_data['nextCursorMark'] == query['cursorMark']:
+                future = None
+            else:
+                query['cursorMark'] = feature_data['nextCursorMark']
+                future = executor.submit(_get_feature_page, feature_url, dict(query), headers)
+
+            for data in feature_data['response']['docs']:
+                yield data
+
+
+def iter_genome_features(genome_id, annotation='PATRIC', fields=None, page_size=10000):
+    """ Iterate over the features from the genome annotation one page at a time.
+
+        Pages are retrieved with SOLR cursor paging so later pages are returned as
+        fast as the first page. The next page is retrieved in the background while
+        the features in the current page are used so at most two pages are in
+        memory at a time.
+
+    Parameters
+    ----------
+    genome_id: str
+        Genome ID of genome available in PATRIC
+    annotation : {'PATRIC', 'RefSeq'}, optional
         Type of annotation
+    fields : list of str, optional
+        List of fields to return for each feature, when None return all fields
+    page_size : int, optional
+        Number of features to retrieve in each request
 
     Returns
     -------
-    list
-        List of features (each entry is a dict with keys that vary based on available data)
+    generator
+        Generator that yields each feature as a dict (keys vary based on available data)
     """
 
     if annotation != 'PATRIC' and annotation != 'RefSeq':
         raise ValueError('Annotation must be either "PATRIC" or "RefSeq"')
 
-    # Construct a SOLR query to get the features.
+    # Construct a SOLR query to get the features. The filter queries select the features from
+    # the annotation and skip the source features. Cursor paging requires a sort on the unique key.
     headers = {
         'content-type': 'application/solrquery+x-www-form-urlencoded',
         'accept': 'application/solr+json'
     }
-    feature_url = join(patric_url, 'genome_feature/')  # + '/'
+    feature_url = join(patric_url, 'genome_feature/')
     query = dict()
     query['q'] = 'genome_id:' + genome_id
-    query['rows'] = '10000'
-    query['start'] = 0
-
-    # Get all of the features for the genome.
-    features = list()
-    done = False
-    count = 0
-    while not done:
-        # Run the SOLR query to get the next set of features.
-        response = requests.get(feature_url, params=query, headers=headers, verify=True)
-        if response.status_code != requests.codes.OK:
-            response.raise_for_status()
-        feature_data = response.json()
-        if feature_data['response']['numFound'] == 0:
-            raise ValueError('No features found for genome {0}'.format(genome_id))
-
-        # For each feature from the specified annotation, add it to the list of features in the genome.
-        for index in range(len(feature_data['response']['docs'])):
-            data = feature_data['response']['docs'][index]
-            if data['feature_type'] != 'source' and data['annotation'] == annotation:
-                features.append(data)
-
-        # Did we get all of the features yet?
-        count += len(feature_data['response']['docs'])
-        if count >= feature_data['response']['numFound']:
-            done = True
-        else:
-            query['start'] += len(feature_data['response']['docs'])
-
-    return features
+    query['fq'] = ['annotation:' + annotation, '-feature_type:source']
+    if fields is not None:
+        query['fl'] = ','.join(fields)
+    query['rows'] = str(page_size)
+    query['sort'] = 'feature_id asc'
+    query['cursorMark'] = '*'
+    return _iter_feature_pages(genome_id, feature_url, query, headers)
+
+
+def get_genome_features(genome_id, annotation='PATRIC', fields=None):
+    """ Get the list of features from the genome annotation.
+
+    Parameters
+    ----------
+    genome_id: str
+        Genome ID of genome available in PATRIC
+    annotation : {'patric', 'refseq'}, optional
+        Type of annotation
+    fields : list of str, optional
+        List of fields to return for each feature, when None return all fields
+
+    Returns
+    -------
+    list
+        List of features (each entry is a dict with keys that vary based on available data)
+    """
+
+    return list(iter_genome_features(genome_id, annotation=annotation, fields=fields))
@@ -0,0 +1,234 @@
+""" Local index of workspace object metadata stored in a SQLite database.
+
+    Pass an index to list_workspace_objects() to add the objects in the listing
+    to the index. Objects that were deleted from the folder since the last listing
+    are removed from the index. Queries on the index are answered locally without
+    a request to the workspace service.
+
+    >>> index = MetadataIndex('workspace.db')
+    >>> mackinac.list_workspace_objects('/mmundy/modelseed', index=index)
+    >>> models = index.query(object_type='model', created_after='2017-05-01T00:00:00')
+"""
+
+from __future__ import absolute_import
+from datetime import datetime
+import sqlite3
+import threading
+
+import six
+
+from .serializer import dumps, loads
+from .workspace import ObjectMetadata, MetadataList
+
+_schema = [
+    '''CREATE TABLE IF NOT EXISTS objects (
+        reference TEXT PRIMARY KEY,
+        name TEXT, type TEXT, folder TEXT, creation_time TEXT, uuid TEXT, owner TEXT, size INTEGER,
+        user_metadata TEXT, auto_metadata TEXT, user_permission TEXT, global_permission TEXT, shock_url TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS objects_type ON objects (type, creation_time)',
+    'CREATE INDEX IF NOT EXISTS objects_creation_time ON objects (creation_time)',
+    'CREATE INDEX IF NOT EXISTS objects_owner ON objects (owner)',
+    'CREATE INDEX IF NOT EXISTS objects_folder ON objects (folder)',
+    'CREATE INDEX IF NOT EXISTS objects_size ON objects (size)',
+    '''CREATE TABLE IF NOT EXISTS user_metadata (
+        reference TEXT, key TEXT, value TEXT, PRIMARY KEY (reference, key)
+    )''',
+    'CREATE INDEX IF NOT EXISTS user_metadata_key ON user_metadata (key, value)'
+]
+
+# Columns in objects table in the order of the fields in ObjectMetadata
+_columns = 'name, type, folder, creation_time, uuid, owner, size, user_metadata, auto_metadata, ' \
+           'user_permission, global_permission, shock_url'
+
+
+def _format_time(value):
+    """ Convert a time to the format used by the workspace service. """
+
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%dT%H:%M:%S')
+    return value
+
+
+class MetadataIndex(object):
+    """ Index of workspace object metadata stored in a SQLite database. """
+
+    def __init__(self, path=':memory:'):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        path : str, optional
+            Path to database file (default is a database in memory)
+        """
+
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            for statement in _schema:
+                self._connection.execute(statement)
+
+        return
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM objects').fetchone()[0]
+
+    def close(self):
+        """ Close the database. """
+
+        with self._lock:
+            self._connection.close()
+        return
+
+    def update(self, folder, object_list, recursive=True):
+        """ Update the index with a listing of a folder.
+
+            Objects in the index that are in the folder but not in the listing are removed.
+
+        Parameters
+        ----------
+        folder : str
+            Workspace reference to folder
+        object_list : list of ObjectMetadata
+            Metadata for objects in folder
+        recursive : bool, optional
+            True when the listing includes all subobjects in folder
+        """
+
+        folder = folder.rstrip('/')
+        rows = list()
+        user_rows = list()
+        for metadata in object_list:
+            reference = metadata.reference
+            rows.append((reference, metadata.name, metadata.type, metadata.folder, metadata.creation_time,
+                         metadata.uuid, metadata.owner, metadata.size, dumps(metadata.user_metadata).decode('utf-8'),
+                         dumps(metadata.auto_metadata).decode('utf-8'), metadata.user_permission,
+                         metadata.global_permission, metadata.shock_url))
+            for key, value in metadata.user_metadata.items():
+                user_rows.append((reference, key, str(value)))
+
+        with self._lock, self._connection:
+            # Remember the objects in the listing and remove the other objects in the folder.
+            self._connection.execute('CREATE TEMP TABLE IF NOT EXISTS listing (reference TEXT PRIMARY KEY)')
+            self._connection.execute('DELETE FROM listing')
+            self._connection.executemany('INSERT OR IGNORE INTO listing VALUES (?)', [(row[0],) for row in rows])
+            if recursive:
+                where = "(reference LIKE ? ESCAPE '\\')"
+                pattern = (_escape_like(folder + '/') + '%',)
+            else:
+                where = 'folder IN (?, ?)'
+                pattern = (folder, folder + '/')
+            removed = 'SELECT reference FROM objects WHERE {0} AND reference NOT IN (SELECT reference FROM listing)' \
+                .format(where)
+            self._connection.execute('DELETE FROM user_metadata WHERE reference IN ({0})'.format(removed), pattern)
+            self._connection.execute('DELETE FROM objects WHERE reference IN ({0})'.format(removed), pattern)
+
+            # Add new objects and replace changed objects.
+            self._connection.executemany('INSERT OR REPLACE INTO objects (reference, {0}) VALUES ({1})'
+                                         .format(_columns, ', '.join(['?'] * 13)), rows)
+            self._connection.execute('DELETE FROM user_metadata WHERE reference IN (SELECT reference FROM listing)')
+            self._connection.executemany('INSERT OR REPLACE INTO user_metadata VALUES (?, ?, ?)', user_rows)
+        return
+
+    def remove(self, reference):
+        """ Remove an object and all of the objects it contains from the index.
+
+        Parameters
+        ----------
+        reference : str
+            Workspace reference to object
+        """
+
+        reference = reference.rstrip('/')
+        where = "reference = ? OR reference LIKE ? ESCAPE '\\'"
+        params = (reference, _escape_like(reference + '/') + '%')
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM user_metadata WHERE {0}'.format(where), params)
+            self._connection.execute('DELETE FROM objects WHERE {0}'.format(where), params)
+        return
+
+    def query(self, object_type=None, owner=None, folder=None, created_after=None, created_before=None,
+              min_size=None, max_size=None, user_metadata=None, sort_key='name'):
+        """ Find the objects in the index that match all of the conditions.
+
+        Parameters
+        ----------
+        object_type : str or list of str, optional
+            Type of object or list of types
+        owner : str, optional
+            Name of object owner
+        folder : str, optional
+            Workspace reference to folder containing objects at any level
+        created_after : str or datetime, optional
+            Include objects created at or after this time (UTC)
+        created_before : str or datetime, optional
+            Include objects created before this time (UTC)
+        min_size : int, optional
+            Minimum size of object in bytes
+        max_size : int, optional
+            Maximum size of object in bytes
+        user_metadata : dict, optional
+            Dictionary of user metadata keys and values, when a value is None
+            include objects that have the key with any value
+        sort_key : {'name', 'folder', 'date', 'type', 'size'}, optional
+            Name of field to use as sort key for output
+
+        Returns
+        -------
+        MetadataList
+            List of object metadata for matching objects
+        """
+
+        conditions = list()
+        params = list()
+        if object_type is not None:
+            types = [object_type] if isinstance(object_type, six.string_types) else list(object_type)
+            conditions.append('type IN ({0})'.format(', '.join(['?'] * len(types))))
+            params.extend(types)
+        if owner is not None:
+            conditions.append('owner = ?')
+            params.append(owner)
+        if folder is not None:
+            conditions.append("reference LIKE ? ESCAPE '\\'")
+            params.append(_escape_like(folder.rstrip('/') + '/') + '%')
+        if created_after is not None:
+            conditions.append('creation_time >= ?')
+            params.append(_format_time(created_after))
+        if created_before is not None:
+            conditions.append('creation_time < ?')
+            params.append(_format_time(created_before))
+        if min_size is not None:
+            conditions.append('size >= ?')
+            params.append(min_size)
+        if max_size is not None:
+            conditions.append('size <= ?')
+            params.append(max_size)
+        if user_metadata is not None:
+            for key, value in user_metadata.items():
+                if value is None:
+                    conditions.append('reference IN (SELECT reference FROM user_metadata WHERE key = ?)')
+                    params.append(key)
+                else:
+                    conditions.append('reference IN (SELECT reference FROM user_metadata WHERE key = ? AND value = ?)')
+                    params.extend([key, str(value)])
+
+        order = {'name': 'name', 'folder': 'folder', 'date': 'creation_time DESC', 'type': 'type', 'size': 'size'}
+        if sort_key not in order:
+            raise ValueError('Sort key {0} is not supported'.format(sort_key))
+        statement = 'SELECT {0} FROM objects'.format(_columns)
+        if len(conditions) > 0:
+            statement += ' WHERE ' + ' AND '.join(conditions)
+        statement += ' ORDER BY {0}, reference'.format(order[sort_key])
+
+        with self._lock:
+            rows = self._connection.execute(statement, params).fetchall()
+        return MetadataList([ObjectMetadata(row[0], row[1], row[2], row[3], row[4], row[5], row[6], loads(row[7]),
+                                            loads(row[8]), row[9], row[10], row[11]) for row in rows])
+
+
+def _escape_like(value):
+    """ Escape the wildcard characters in a value for a LIKE pattern. """
+
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
@@ -0,0 +1,333 @@
+""" Decode parts of a JSON document without decoding the whole document.
+
+    A scanner finds the location of values in the JSON text without building any
+    objects. A string is matched with a regular expression and an array or object
+    is skipped by walking over the brackets that are not in strings until the
+    depth returns to zero. Only the values that are used are decoded. Values are
+    found on demand so getting a key near the start of a large document does not
+    scan the rest of the document.
+"""
+
+from __future__ import absolute_import
+import json
+import re
+
+from .serializer import loads
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+# Regular expression that matches a string. The first alternative matches a string when the first quote
+# after the opening quote is not escaped, which is true for almost all strings and only looks for a quote.
+_string_pattern = (r'"(?:[^"]*(?<!\\)"|(?![^"]*(?<!\\)")'
+                   r'(?:[^"]*(?<!\\)(?:\\\\)*\\")*[^"]*(?<!\\)(?:\\\\)*")')
+_string_re = re.compile(_string_pattern)
+
+# Regular expression that matches everything up to and including the next bracket that is not in a string
+_bracket_re = re.compile(r'[^"{}\[\]]*(?:' + _string_pattern + r'[^"{}\[\]]*)*([{}\[\]])')
+
+# Regular expression that matches the key of a member and the separator after the key
+_key_re = re.compile('(' + _string_pattern + r')\s*:\s*')
+
+# Regular expression that matches everything up to the end of a number, true, false, or null
+_scalar_re = re.compile(r'[^,}\]\s]*')
+
+# Regular expression that matches the separator after a member of an object or an element of an array
+_separator_re = re.compile(r'\s*([,}\]])\s*')
+
+# Regular expression that matches white space
+_space_re = re.compile(r'\s*')
+
+# Decoder for a selected value that starts at a position in a document and ends at an unknown position
+_decoder = json.JSONDecoder()
+
+
+def _skip_space(text, pos):
+    return _space_re.match(text, pos).end()
+
+
+def _check(text, pos, expected):
+    """ Confirm the character at a position is one of the expected characters. """
+
+    if pos >= len(text) or text[pos] not in expected:
+        raise ValueError('Expected one of "{0}" at position {1}'.format(expected, pos))
+    return text[pos]
+
+
+def _separator(text, pos, closing):
+    """ Read the separator after a value.
+
+    Parameters
+    ----------
+    text : str
+        JSON document
+    pos : int
+        Position after last character of value
+    closing : str
+        Character that closes the object or array that contains the value
+
+    Returns
+    -------
+    tuple
+        True when the value is the last one in the object or array and position of next character
+    """
+
+    match = _separator_re.match(text, pos)
+    if match is None or match.group(1) not in (',', closing):
+        raise ValueError('Expected one of ",{0}" at position {1}'.format(closing, _skip_space(text, pos)))
+    return match.group(1) == closing, match.end()
+
+
+def _bracket_end(text, pos, depth):
+    """ Walk over the brackets that are not in strings until the bracket that closes a value.
+
+    Parameters
+    ----------
+    text : str
+        JSON document
+    pos : int
+        Position to start walking
+    depth : int
+        Number of arrays and objects that are open at the position
+
+    Returns
+    -------
+    int
+        Position after the bracket that closes the outermost open array or object
+    """
+
+    start = pos
+    while True:
+        match = _bracket_re.match(text, pos)
+        if match is None:
+            raise ValueError('Unterminated value at position {0}'.format(start))
+        pos = match.end()
+        if match.group(1) in '[{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos
+
+
+def _value_end(text, pos):
+    """ Find the end of the value that starts at a position without decoding the value.
+
+    Parameters
+    ----------
+    text : str
+        JSON document
+    pos : int
+        Position of first character of value
+
+    Returns
+    -------
+    int
+        Position after last character of value
+    """
+
+    char = text[pos]
+    if char == '"':
+        match = _string_re.match(text, pos)
+        if match is None:
+            raise ValueError('Unterminated string at position {0}'.format(pos))
+        return match.end()
+    if char == '[' or char == '{':
+        return _bracket_end(text, pos, 0)
+
+    # A number, true, false, or null ends at the next separator or white space.
+    return _scalar_re.match(text, pos).end()
+
+
+def _next_key(text, pos):
+    """ Read the key of the next member of an object.
+
+    Parameters
+    ----------
+    text : str
+        JSON document
+    pos : int
+        Position of opening quote of key
+
+    Returns
+    -------
+    tuple
+        Key and position of first character of value
+    """
+
+    match = _key_re.match(text, pos)
+    if match is None:
+        raise ValueError('Expected key at position {0}'.format(pos))
+    key = match.group(1)
+    key = loads(key) if '\\' in key else key[1:-1]
+    return key, match.end()
+
+
+class LazyObject(Mapping):
+    """ Read-only view of a JSON object that decodes the value of a key the first time it is used. """
+
+    def __init__(self, text):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        text : str
+            JSON document with an object at the top level
+        """
+
+        if isinstance(text, bytes):
+            text = text.decode('utf-8')
+        self._text = text
+        start = _skip_space(text, 0)
+        if start >= len(text) or text[start] != '{':
+            raise ValueError('JSON document is not an object')
+        self._spans = dict()
+        self._values = dict()
+        self._pos = _skip_space(text, start + 1)  # Position of next key that was not scanned
+        self._done = _check(text, self._pos, '"}') == '}'
+
+    def _scan(self, key=None):
+        """ Find the location of values until the key is found or the end of the object. """
+
+        text = self._text
+        while not self._done and (key is None or key not in self._spans):
+            name, start = _next_key(text, self._pos)
+            end = _value_end(text, start)
+            self._spans[name] = (start, end)
+            self._done, self._pos = _separator(text, end, '}')
+        return
+
+    def __getitem__(self, key):
+        if key not in self._values:
+            self._scan(key)
+            start, end = self._spans[key]
+            self._values[key] = loads(self._text[start:end])
+        return self._values[key]
+
+    def __iter__(self):
+        self._scan()
+        return iter(self._spans)
+
+    def __len__(self):
+        self._scan()
+        return len(self._spans)
+
+    def __contains__(self, key):
+        self._scan(key)
+        return key in self._spans
+
+    def __repr__(self):
+        self._scan()
+        return '<LazyObject with keys {0}>'.format(sorted(self._spans))
+
+
+def _make_field_tree(fields):
+    """ Convert a list of paths to fields to a tree of dictionaries.
+
+    Parameters
+    ----------
+    fields : list of str
+        List of paths to fields with keys separated by periods (for example 'features.id')
+
+    Returns
+    -------
+    dict
+        Tree of keys where an empty dictionary selects the whole value
+    """
+
+    tree = dict()
+    for field in fields:
+        node = tree
+        parts = field.split('.')
+        for index, part in enumerate(parts):
+            if part in node and len(node[part]) == 0:
+                break  # A shorter path already selects the whole value
+            if index == len(parts) - 1:
+                node[part] = dict()
+            else:
+                node = node.setdefault(part, dict())
+    return tree
+
+
+def _select(text, pos, tree):
+    """ Decode the selected fields from the value at a position.
+
+    Parameters
+    ----------
+    text : str
+        JSON document
+    pos : int
+        Position of first character of value
+    tree : dict
+        Tree of keys to select
+
+    Returns
+    -------
+    tuple
+        Decoded value and position after last character of value
+    """
+
+    if len(tree) == 0:
+        return _decoder.raw_decode(text, pos)
+
+    if text[pos] == '{':
+        # Skip the values of keys that are not selected without decoding them.
+        value = dict()
+        pos = _skip_space(text, pos + 1)
+        if _check(text, pos, '"}') == '}':
+            return value, pos + 1
+        while True:
+            key, pos = _next_key(text, pos)
+            if key in tree:
+                value[key], pos = _select(text, pos, tree[key])
+            else:
+                pos = _value_end(text, pos)
+            last, pos = _separator(text, pos, '}')
+            if last:
+                return value, pos
+            if len(value) == len(tree):
+                # All of the selected keys were found so skip the rest of the object in one walk.
+                return value, _bracket_end(text, pos, 1)
+
+    if text[pos] == '[':
+        # Apply the tree to every element of an array.
+        value = list()
+        pos = _skip_space(text, pos + 1)
+        if text[pos:pos + 1] == ']':
+            return value, pos + 1
+        while True:
+            element, pos = _select(text, pos, tree)
+            value.append(element)
+            last, pos = _separator(text, pos, ']')
+            if last:
+                return value, pos
+
+    return _decoder.raw_decode(text, pos)
+
+
+def select_fields(text, fields):
+    """ Decode only the selected fields from a JSON document.
+
+        A path selects a key in an object. When the value on the path is an array,
+        the rest of the path is applied to every element of the array. Values of
+        keys that are not on a selected path are skipped without being decoded.
+
+    Parameters
+    ----------
+    text : str
+        JSON document
+    fields : list of str
+        List of paths to fields with keys separated by periods (for example
+        ['features.id', 'features.protein_translation'])
+
+    Returns
+    -------
+    data
+        Decoded data with only the selected fields
+    """
+
+    if isinstance(text, bytes):
+        text = text.decode('utf-8')
+    return _select(text, _skip_space(text, 0), _make_field_tree(fields))[0]
@@ -4,7 +4,7 @@ from warnings import warn
 from math import log10, isnan
 import subprocess
 
-from .workspace import get_workspace_object_data, put_workspace_object
+from .workspace import get_workspace_object_data, put_workspace_object, download_workspace_object
 from .modelseed import get_modelseed_model_stats
 
 # E values of less than 1E-200 are treated as 1E-200 to avoid log of 0 issues.
@@ -60,7 +60,7 @@ class RoleNotFoundError(Exception):
     pass
 
 
-def download_data_files(source_folder, config=default_config):
+def download_data_files(source_folder, config=default_config, context=None):
     """ Download the data files required to calculate reaction likelihoods.
 
         Calculating reaction likelihoods requires two data files: (1) a target feature
@@ -73,21 +73,19 @@ def download_data_files(source_folder, config=default_config):
         Workspace reference to folder containing data files
     config : dict, optional
         Dictionary of configuration variables
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
     """
 
     # If needed, create folder for source data.
     if not exists(config['data_folder']):
         makedirs(config['data_folder'])
 
-    # Get the target feature ID to role ID mapping file.
-    data = get_workspace_object_data(join(source_folder, config['fid_role_file_name']), json_data=False)
-    with open(join(config['data_folder'], config['fid_role_file_name']), 'w') as handle:
-        handle.write(data)
-
-    # Get the fasta file of protein sequences.
-    data = get_workspace_object_data(join(source_folder, config['protein_sequence_file_name']), json_data=False)
-    with open(join(config['data_folder'], config['protein_sequence_file_name']), 'w') as handle:
-        handle.write(data)
+    # Get the target feature ID to role ID mapping file and the fasta file of protein
+    # sequences. The files can be large so they are streamed directly to disk.
+    for file_name in [config['fid_role_file_name'], config['protein_sequence_file_name']]:
+        download_workspace_object(join(source_folder, file_name), join(config['data_folder'], file_name),
+                                  context=context)
 
     # Build the command based on the configured search program.
     if config['search_program_name'] == 'usearch':
@@ -122,7 +120,7 @@ def download_data_files(source_folder, config=default_config):
     return
 
 
-def calculate_modelseed_likelihoods(model_id, config=default_config):
+def calculate_modelseed_likelihoods(model_id, config=default_config, context=None):
     """ Calculate reaction likelihoods for a ModelSEED model.
 
     Parameters
@@ -131,16 +129,18 @@ def calculate_modelseed_likelihoods(model_id, config=default_config):
         ID of model
     config : dict, optional
         Dictionary of configuration variables
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
     """
 
     # Get the model statistics to confirm the model exists and get workspace reference.
-    stats = get_modelseed_model_stats(model_id)
+    stats = get_modelseed_model_stats(model_id, cached=True, context=context)
 
     # Get the genome object stored with the model.
-    genome = get_workspace_object_data(join(stats['ref'], 'genome'))
+    genome = get_workspace_object_data(join(stats['ref'], 'genome'), context=context)
 
     # Get the model template object used to build the model.
-    template = get_workspace_object_data(stats['template_ref'])
+    template = get_workspace_object_data(stats['template_ref'], context=context)
 
     # Calculate reactions likelihoods and store them with the model.
     likelihoods = calculate_likelihoods(model_id, genome['features'], template, config=config)
@@ -149,7 +149,7 @@ def calculate_modelseed_likelihoods(model_id, config=default_config):
         value = likelihoods['reaction'][reaction_id]
         reaction_list.append((reaction_id, value['likelihood'], value['type'], value['complex_string'], value['gpr']))
     put_workspace_object(join(stats['ref'], 'rxnprobs'), 'rxnprobs',
-                         {'reaction_probabilities': reaction_list}, overwrite=True)
+                         {'reaction_probabilities': reaction_list}, overwrite=True, context=context)
     return
 
 
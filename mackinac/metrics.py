@@ -0,0 +1,311 @@
+""" Metrics for requests to web services.
+
+    Every request to a web service records the number of calls, latency, number
+    of bytes sent and received, and number of errors for the service and method.
+    Each attempt of a request that is retried is recorded as a separate call and
+    the attempts after the first are also counted as retries.
+    Use snapshot() to get the current values or prometheus_text() to get the
+    values in the Prometheus text exposition format.
+"""
+
+from __future__ import absolute_import
+from collections import defaultdict
+from time import time
+import threading
+
+# Upper bounds in seconds of the buckets in latency histograms
+default_latency_buckets = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, float('inf'))
+
+
+class _MethodMetrics(object):
+    """ Metrics for one method of a service. """
+
+    __slots__ = ('calls', 'retries', 'errors', 'error_types', 'latency_sum', 'latency_min', 'latency_max',
+                 'latency_buckets', 'request_bytes', 'response_bytes')
+
+    def __init__(self, num_buckets):
+        self.calls = 0
+        self.retries = 0
+        self.errors = 0
+        self.error_types = defaultdict(int)
+        self.latency_sum = 0.0
+        self.latency_min = None
+        self.latency_max = None
+        self.latency_buckets = [0] * num_buckets
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+
+class MetricsRegistry(object):
+    """ Registry of metrics for requests to web services. """
+
+    def __init__(self, latency_buckets=default_latency_buckets):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        latency_buckets : tuple of float, optional
+            Upper bounds in seconds of the buckets in latency histograms
+        """
+
+        self.latency_buckets = tuple(latency_buckets)
+        self.enabled = True
+        self._metrics = dict()
+        self._lock = threading.Lock()
+
+        return
+
+    def record(self, service, method, latency, request_bytes=0, response_bytes=0, error=None, retry=False):
+        """ Record the metrics for one request.
+
+        Parameters
+        ----------
+        service : str
+            Name of service
+        method : str
+            Name of method
+        latency : float
+            Number of seconds from sending the request to getting the response
+        request_bytes : int, optional
+            Number of bytes in request body
+        response_bytes : int, optional
+            Number of bytes in response body as received from the server (compressed size
+            when the server compresses the body)
+        error : Exception, optional
+            Exception raised by the request
+        retry : bool, optional
+            When True, the request is a retry of a request that failed
+        """
+
+        if not self.enabled:
+            return
+        with self._lock:
+            key = (service, method)
+            if key not in self._metrics:
+                self._metrics[key] = _MethodMetrics(len(self.latency_buckets))
+            metrics = self._metrics[key]
+            metrics.calls += 1
+            if retry:
+                metrics.retries += 1
+            metrics.latency_sum += latency
+            if metrics.latency_min is None or latency < metrics.latency_min:
+                metrics.latency_min = latency
+            if metrics.latency_max is None or latency > metrics.latency_max:
+                metrics.latency_max = latency
+            for index, bound in enumerate(self.latency_buckets):
+                if latency <= bound:
+                    metrics.latency_buckets[index] += 1
+                    break
+            metrics.request_bytes += request_bytes
+            metrics.response_bytes += response_bytes
+            if error is not None:
+                metrics.errors += 1
+                metrics.error_types[type(error).__name__] += 1
+        return
+
+    def measure(self, service, method):
+        """ Measure a request to a service with a context manager.
+
+        Parameters
+        ----------
+        service : str
+            Name of service
+        method : str
+            Name of method
+
+        Returns
+        -------
+        _Measurement
+            Context manager that records the metrics when the request ends
+        """
+
+        return _Measurement(self, service, method)
+
+    def snapshot(self):
+        """ Get the current values of all metrics.
+
+        Returns
+        -------
+        dict
+            Dictionary keyed by service name of dictionaries keyed by method name of metric values
+        """
+
+        output = dict()
+        with self._lock:
+            for (service, method), metrics in self._metrics.items():
+                cumulative = 0
+                buckets = list()
+                for bound, count in zip(self.latency_buckets, metrics.latency_buckets):
+                    cumulative += count
+                    buckets.append((bound, cumulative))
+                output.setdefault(service, dict())[method] = {
+                    'calls': metrics.calls,
+                    'retries': metrics.retries,
+                    'errors': metrics.errors,
+                    'error_types': dict(metrics.error_types),
+                    'latency': {
+                        'sum': metrics.latency_sum,
+                        'mean': metrics.latency_sum / metrics.calls,
+                        'min': metrics.latency_min,
+                        'max': metrics.latency_max,
+                        'buckets': buckets
+                    },
+                    'request_bytes': metrics.request_bytes,
+                    'response_bytes': metrics.response_bytes
+                }
+        return output
+
+    def reset(self):
+        """ Clear all metrics. """
+
+        with self._lock:
+            self._metrics = dict()
+        return
+
+    def prometheus_text(self, prefix='mackinac'):
+        """ Get the current values of all metrics in Prometheus text exposition format.
+
+        Parameters
+        ----------
+        prefix : str, optional
+            Prefix for metric names
+
+        Returns
+        -------
+        str
+            Metrics in Prometheus text format
+        """
+
+        data = self.snapshot()
+        lines = list()
+
+        def add_counter(name, help_text, field):
+            lines.append('# HELP {0}_{1} {2}'.format(prefix, name, help_text))
+            lines.append('# TYPE {0}_{1} counter'.format(prefix, name))
+            for service in sorted(data):
+                for method in sorted(data[service]):
+                    lines.append('{0}_{1}{{service="{2}",method="{3}"}} {4}'
+                                 .format(prefix, name, service, method, data[service][method][field]))
+
+        add_counter('requests_total', 'Number of requests sent to service.', 'calls')
+        add_counter('request_retries_total', 'Number of requests that were retries of failed requests.',
+                    'retries')
+        add_counter('request_errors_total', 'Number of requests that ended in error.', 'errors')
+        add_counter('request_bytes_total', 'Number of bytes in request bodies.', 'request_bytes')
+        add_counter('response_bytes_total', 'Number of bytes in response bodies received from service.',
+                    'response_bytes')
+
+        lines.append('# HELP {0}_request_duration_seconds Latency of requests to service.'.format(prefix))
+        lines.append('# TYPE {0}_request_duration_seconds histogram'.format(prefix))
+        for service in sorted(data):
+            for method in sorted(data[service]):
+                labels = 'service="{0}",method="{1}"'.format(service, method)
+                latency = data[service][method]['latency']
+                for bound, count in latency['buckets']:
+                    bound_text = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('{0}_request_duration_seconds_bucket{{{1},le="{2}"}} {3}'
+                                 .format(prefix, labels, bound_text, count))
+                lines.append('{0}_request_duration_seconds_sum{{{1}}} {2}'.format(prefix, labels, latency['sum']))
+                lines.append('{0}_request_duration_seconds_count{{{1}}} {2}'
+                             .format(prefix, labels, data[service][method]['calls']))
+        return '\n'.join(lines) + '\n'
+
+
+class _Measurement(object):
+    """ Context manager that measures one request and records it in a registry. """
+
+    def __init__(self, registry, service, method):
+        self.registry = registry
+        self.service = service
+        self.method = method
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.error = None
+        self.retry = False
+        self.start = None
+
+    def __enter__(self):
+        self.start = time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.registry.record(self.service, self.method, time() - self.start, self.request_bytes,
+                             self.response_bytes, exc_value if exc_value is not None else self.error, self.retry)
+        return False
+
+
+# Registry for all requests made by mackinac.
+registry = MetricsRegistry()
+
+
+def snapshot():
+    """ Get the current values of all metrics.
+
+    Returns
+    -------
+    dict
+        Dictionary keyed by service name of dictionaries keyed by method name of metric values
+    """
+
+    return registry.snapshot()
+
+
+def reset():
+    """ Clear all metrics. """
+
+    registry.reset()
+    return
+
+
+def prometheus_text(prefix='mackinac'):
+    """ Get the current values of all metrics in Prometheus text exposition format.
+
+    Parameters
+    ----------
+    prefix : str, optional
+        Prefix for metric names
+
+    Returns
+    -------
+    str
+        Metrics in Prometheus text format
+    """
+
+    return registry.prometheus_text(prefix)
+
+
+def start_prometheus_server(port, address=''):
+    """ Start a server in a background thread that returns metrics for Prometheus to scrape.
+
+    Parameters
+    ----------
+    port : int
+        Port number for server
+    address : str, optional
+        Address for server (default is all interfaces)
+
+    Returns
+    -------
+    HTTPServer
+        Server object, call shutdown() to stop the server
+    """
+
+    from six.moves.BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            return
+
+    server = HTTPServer((address, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
@@ -0,0 +1,186 @@
+""" Keep a local copy of a workspace folder up to date.
+
+    A manifest file in the local directory records the UUID and creation time of
+    every object that was downloaded. When the folder is synchronized again, only
+    the objects that are new or changed since the last time are downloaded and
+    the local copies of objects that were deleted from the workspace are removed.
+"""
+
+from __future__ import absolute_import
+from concurrent.futures import ThreadPoolExecutor
+from os import listdir, makedirs, remove, rename, rmdir
+from os.path import dirname, exists, join
+import io
+
+from .serializer import dumps, loads
+from .workspace import list_workspace_objects, get_workspace_objects_data, shock_download_file, \
+    _workspace_client, _make_chunks
+
+# Name of manifest file in local directory
+manifest_file_name = '.mackinac_manifest.json'
+
+
+def _read_manifest(directory, folder):
+    """ Read the manifest from a local directory.
+
+    Parameters
+    ----------
+    directory : str
+        Path to local directory
+    folder : str
+        Workspace reference to folder
+
+    Returns
+    -------
+    dict
+        Dictionary keyed by relative path of dictionaries with UUID, creation time, and size of object
+    """
+
+    path = join(directory, manifest_file_name)
+    if not exists(path):
+        return dict()
+    with io.open(path, 'rb') as handle:
+        manifest = loads(handle.read())
+    if manifest['folder'] != folder:
+        raise ValueError('Directory {0} is a copy of workspace folder {1} not {2}'
+                         .format(directory, manifest['folder'], folder))
+    return manifest['objects']
+
+
+def _write_manifest(directory, folder, manifest):
+    """ Write the manifest to a local directory.
+
+    Parameters
+    ----------
+    directory : str
+        Path to local directory
+    folder : str
+        Workspace reference to folder
+    manifest : dict
+        Dictionary keyed by relative path of dictionaries with UUID, creation time, and size of object
+    """
+
+    path = join(directory, manifest_file_name)
+    with io.open(path + '.tmp', 'wb') as handle:
+        handle.write(dumps({'folder': folder, 'objects': manifest}))
+    if exists(path):
+        remove(path)
+    rename(path + '.tmp', path)
+    return
+
+
+def _local_path(directory, relative_path):
+    return join(directory, *relative_path.split('/'))
+
+
+def _remove_empty_folders(directory, path):
+    """ Remove empty folders from the folder containing a file up to the local directory. """
+
+    folder = dirname(path)
+    while len(folder) > len(directory) and exists(folder) and len(listdir(folder)) == 0:
+        rmdir(folder)
+        folder = dirname(folder)
+    return
+
+
+def sync_workspace_folder(folder, directory, max_workers=8, context=None):
+    """ Synchronize a local directory with the contents of a workspace folder.
+
+        Every object in the folder and its subfolders is stored in a file with the
+        same relative path in the local directory. Objects that are not changed
+        since the last synchronization are not downloaded again.
+
+    Parameters
+    ----------
+    folder : str
+        Workspace reference to folder
+    directory : str
+        Path to local directory
+    max_workers : int, optional
+        Maximum number of downloads to run at the same time
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    dict
+        Dictionary with lists of relative paths of 'downloaded', 'deleted', and 'unchanged' objects
+    """
+
+    folder = folder.rstrip('/')
+    if not exists(directory):
+        makedirs(directory)
+    manifest = _read_manifest(directory, folder)
+
+    # Compare the objects in the workspace folder with the manifest.
+    object_list = list_workspace_objects(folder, recursive=True, context=context)
+    if object_list is None:
+        raise ValueError('Workspace folder {0} was not found'.format(folder))
+    current = dict()
+    changed = list()
+    unchanged = list()
+    for metadata in object_list:
+        relative_path = (metadata[2] + metadata[0])[len(folder) + 1:]
+        if metadata.is_folder:
+            if not exists(_local_path(directory, relative_path)):
+                makedirs(_local_path(directory, relative_path))
+            continue
+        current[relative_path] = {'uuid': metadata[4], 'creation_time': metadata[3], 'size': metadata[6]}
+        entry = manifest.get(relative_path, None)
+        if entry is not None and entry['uuid'] == metadata[4] and entry['creation_time'] == metadata[3] \
+                and exists(_local_path(directory, relative_path)):
+            unchanged.append(relative_path)
+        else:
+            changed.append((relative_path, metadata))
+
+    # Remove the local copies of deleted objects.
+    deleted = sorted([relative_path for relative_path in manifest if relative_path not in current])
+    for relative_path in deleted:
+        path = _local_path(directory, relative_path)
+        if exists(path):
+            remove(path)
+            _remove_empty_folders(directory, path)
+        del manifest[relative_path]
+
+    # Download new and changed objects. Objects stored in Shock are streamed to disk
+    # and the other objects are retrieved in bulk.
+    for relative_path, metadata in changed:
+        parent = dirname(_local_path(directory, relative_path))
+        if not exists(parent):
+            makedirs(parent)
+    token = _workspace_client(context).set_authentication_token()['AUTHORIZATION']
+    shock_list = [item for item in changed if len(item[1][11]) > 0]
+    inline_list = [item for item in changed if len(item[1][11]) == 0]
+
+    def download_shock(item):
+        shock_download_file(item[1][11], token, _local_path(directory, item[0]))
+        return [item[0]]
+
+    def download_inline(chunk):
+        data_list = get_workspace_objects_data([folder + '/' + item[0] for item in chunk], json_data=False,
+                                               context=context)
+        for item, data in zip(chunk, data_list):
+            with io.open(_local_path(directory, item[0]), 'wb') as handle:
+                handle.write(data.encode('utf-8'))
+        return [item[0] for item in chunk]
+
+    downloaded = list()
+    errors = list()
+    if len(changed) > 0:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(download_shock, item) for item in shock_list]
+            futures.extend([executor.submit(download_inline, chunk)
+                            for chunk in _make_chunks(inline_list, [item[1][6] for item in inline_list])])
+            for future in futures:
+                try:
+                    downloaded.extend(future.result())
+                except Exception as e:
+                    errors.append(e)
+    for relative_path in downloaded:
+        manifest[relative_path] = current[relative_path]
+
+    # Save the manifest before reporting an error so completed downloads are not repeated.
+    _write_manifest(directory, folder, manifest)
+    if len(errors) > 0:
+        raise errors[0]
+    return {'downloaded': sorted(downloaded), 'deleted': deleted, 'unchanged': sorted(unchanged)}
@@ -0,0 +1,825 @@
+""" Local stand-in server for the Workspace, ProbModelSEED, Shock, and PATRIC data API web services.
+
+    The server implements the subset of the web services that mackinac uses and
+    keeps all of the data in memory. It can add latency to every request and
+    inject failures so concurrency and throughput features can be tested and
+    benchmarked without credentials or a network connection.
+
+    Use the server from Python like this:
+
+    >>> from mackinac.mockserver import MockServer
+    >>> with MockServer(latency=0.05) as server:
+    ...     server.install()
+    ...     stats = mackinac.reconstruct_modelseed_model('226186.12')
+
+    Or run it from the command line with "python -m mackinac.mockserver --port 8080".
+"""
+
+from __future__ import absolute_import, print_function
+from datetime import datetime
+import hashlib
+from time import sleep, time
+from uuid import uuid4
+import random
+import re
+import threading
+
+import six
+from six.moves import socketserver
+from six.moves.BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from six.moves.urllib.parse import urlparse, parse_qs
+
+from .serializer import dumps, loads
+
+# Names of services provided by the server
+service_names = ['Workspace', 'ProbModelSEED', 'Shock', 'PATRIC']
+
+
+class RPCError(Exception):
+    """ Exception raised by a server method to return a JSON-RPC error response. """
+    pass
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def _now():
+    """ Get the current time in the format used by the Workspace service. """
+
+    return datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def _split_path(reference):
+    """ Split a workspace reference into the folder and name of an object.
+
+    Parameters
+    ----------
+    reference : str
+        Workspace reference to object
+
+    Returns
+    -------
+    tuple
+        Normalized reference, reference to parent folder, and name of object
+    """
+
+    if not reference.startswith('/'):
+        raise RPCError('_ERROR_{0} is not a valid object path!_ERROR_'.format(reference))
+    path = '/' + '/'.join([part for part in reference.split('/') if len(part) > 0])
+    if path == '/':
+        raise RPCError('_ERROR_{0} does not include at least a top level directory!_ERROR_'.format(reference))
+    parent, name = path.rsplit('/', 1)
+    return path, parent, name
+
+
+class MockServer(object):
+    """ Local stand-in server for SEED web services """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, failure_status=503,
+                 job_duration=0.0, num_reactions=1000, seed=None):
+        """ Initialize object.
+
+        Parameters
+        ----------
+        host : str, optional
+            Address for server
+        port : int, optional
+            Port number for server (0 to pick a free port)
+        latency : float or dict, optional
+            Number of seconds to wait before returning every response, or dictionary
+            keyed by service name of number of seconds
+        failure_rate : float or dict, optional
+            Fraction of requests that fail with failure_status, or dictionary keyed
+            by service name of fraction
+        failure_status : int, optional
+            HTTP status code returned for an injected failure
+        job_duration : float, optional
+            Number of seconds before a submitted job is completed
+        num_reactions : int, optional
+            Number of reactions in a reconstructed model
+        seed : int, optional
+            Seed for random number generator used for failure injection and synthetic data
+        """
+
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.job_duration = job_duration
+        self.num_reactions = num_reactions
+        self.random = random.Random(seed)
+        self.objects = dict()
+        self.jobs = dict()
+        self.genomes = dict()
+        self.nodes = dict()
+        # When set, the next Shock download closes the connection after this number of bytes
+        self.shock_drop_after = None
+        self.request_counts = dict([(name, 0) for name in service_names])
+        self._fail_next = list()
+        self._lock = threading.RLock()
+        self._server = None
+        self._thread = None
+        self._installed = None
+
+        return
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+        return False
+
+    @property
+    def url(self):
+        """ str: Base URL of server """
+        return 'http://{0}:{1}'.format(self.host, self.port)
+
+    @property
+    def workspace_url(self):
+        """ str: URL of Workspace service endpoint """
+        return self.url + '/services/Workspace'
+
+    @property
+    def modelseed_url(self):
+        """ str: URL of ProbModelSEED service endpoint """
+        return self.url + '/services/ProbModelSEED'
+
+    @property
+    def shock_url(self):
+        """ str: URL of Shock service """
+        return self.url + '/node'
+
+    @property
+    def patric_url(self):
+        """ str: URL of PATRIC data API """
+        return self.url + '/api/'
+
+    def start(self):
+        """ Start the server in a background thread. """
+
+        handler = type('MockHandler', (_MockHandler,), {'mock': self})
+        self._server = _ThreadingHTTPServer((self.host, self.port), handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return
+
+    def stop(self):
+        """ Stop the server and restore the service URLs if they were changed by install(). """
+
+        self.uninstall()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+        return
+
+    def install(self, token='un=mackinac@patricbrc.org|tokenid=mock|sig=mock'):
+        """ Point the mackinac clients at this server.
+
+        Parameters
+        ----------
+        token : str, optional
+            Authentication token used by the clients
+        """
+
+        from . import workspace, modelseed, genome
+        from .SeedClient import default_token_provider
+        self._installed = (workspace.ws_client.url, modelseed.ms_client.url, genome.patric_url,
+                           default_token_provider.token, default_token_provider.user_id)
+        workspace.ws_client.url = self.workspace_url
+        modelseed.ms_client.url = self.modelseed_url
+        genome.patric_url = self.patric_url
+        default_token_provider.set_token(token, token.split('|')[0].replace('un=', ''))
+        return
+
+    def uninstall(self):
+        """ Restore the service URLs and authentication token changed by install(). """
+
+        if self._installed is None:
+            return
+        from . import workspace, modelseed, genome
+        from .SeedClient import default_token_provider
+        workspace.ws_client.url, modelseed.ms_client.url, genome.patric_url, token, user_id = self._installed
+        if token is None:
+            default_token_provider.invalidate()
+        else:
+            default_token_provider.set_token(token, user_id)
+        self._installed = None
+        return
+
+    def fail_next(self, count=1, status=None):
+        """ Make the next requests fail.
+
+        Parameters
+        ----------
+        count : int, optional
+            Number of requests to fail
+        status : int, optional
+            HTTP status code to return (default is failure_status)
+        """
+
+        with self._lock:
+            self._fail_next.extend([status or self.failure_status] * count)
+        return
+
+    def add_genome(self, genome_id, name='Mock organism', num_features=1000, annotations=('PATRIC', 'RefSeq')):
+        """ Add a genome with synthetic features to the PATRIC data API.
+
+        Each feature is annotated by each of the annotations and the genome
+        has one feature with type 'source' for each annotation.
+
+        Parameters
+        ----------
+        genome_id : str
+            Genome ID
+        name : str, optional
+            Name of organism
+        num_features : int, optional
+            Number of features in each annotation
+        annotations : tuple of str, optional
+            Types of annotation with features
+        """
+
+        features = list()
+        for annotation in annotations:
+            features.append({'genome_id': genome_id, 'annotation': annotation, 'feature_type': 'source',
+                             'feature_id': '{0}.{1}.source'.format(annotation, genome_id)})
+            for index in range(num_features):
+                sequence = ''.join([self.random.choice('ACGT') for _ in range(30)])
+                feature = {
+                    'genome_id': genome_id,
+                    'annotation': annotation,
+                    'feature_type': 'CDS',
+                    'feature_id': '{0}.{1}.CDS.{2}'.format(annotation, genome_id, index + 1),
+                    'product': 'Hypothetical protein {0}'.format(index + 1),
+                    'na_length': len(sequence),
+                    'na_sequence': sequence,
+                    'aa_sequence': 'M' + ''.join([self.random.choice('ACDEFGHIKLMNPQRSTVWY') for _ in range(9)])
+                }
+                if annotation == 'PATRIC':
+                    feature['patric_id'] = 'fig|{0}.peg.{1}'.format(genome_id, index + 1)
+                features.append(feature)
+        with self._lock:
+            self.genomes[genome_id] = {
+                'summary': {'genome_id': genome_id, 'genome_name': name, 'organism_name': name},
+                'features': features
+            }
+        return
+
+    def add_shock_object(self, reference, object_type, data, owner='mackinac@patricbrc.org'):
+        """ Add a workspace object with data stored in a Shock node.
+
+        Parameters
+        ----------
+        reference : str
+            Workspace reference to object
+        object_type : str
+            Type of object
+        data : bytes
+            Data stored in Shock node
+        owner : str, optional
+            Name of object owner
+
+        Returns
+        -------
+        str
+            URL to Shock node
+        """
+
+        path, parent, name = _split_path(reference)
+        node_url = '{0}/{1}'.format(self.shock_url, self._create_node(data))
+        with self._lock:
+            self._ensure_folder(parent, owner)
+            meta = self._make_meta(path, object_type, owner, dict(), len(data), False)
+            meta[11] = node_url
+            self.objects[path] = {'meta': meta, 'data': None}
+        return node_url
+
+    def _create_node(self, data=None):
+        node_id = str(uuid4())
+        with self._lock:
+            self.nodes[node_id] = data
+        return node_id
+
+    def shock_node(self, node_id):
+        with self._lock:
+            if node_id not in self.nodes:
+                return None
+            data = self.nodes[node_id]
+        node_file = {'name': '', 'size': 0, 'checksum': dict()}
+        if data is not None:
+            node_file = {'name': node_id, 'size': len(data), 'checksum': {'md5': hashlib.md5(data).hexdigest()}}
+        return {'id': node_id, 'file': node_file}
+
+    def shock_upload(self, node_id, data):
+        with self._lock:
+            if node_id not in self.nodes:
+                return None
+            self.nodes[node_id] = data
+            node_url = '{0}/{1}'.format(self.shock_url, node_id)
+            for obj in self.objects.values():
+                if obj['meta'][11] == node_url:
+                    obj['meta'][6] = len(data)
+        return self.shock_node(node_id)
+
+    def _before_request(self, service):
+        """ Apply latency and failure injection for a request.
+
+        Parameters
+        ----------
+        service : str
+            Name of service
+
+        Returns
+        -------
+        int or None
+            HTTP status code for an injected failure or None when request should run
+        """
+
+        with self._lock:
+            self.request_counts[service] += 1
+            if len(self._fail_next) > 0:
+                return self._fail_next.pop(0)
+            failure_rate = self.failure_rate.get(service, 0.0) if isinstance(self.failure_rate, dict) \
+                else self.failure_rate
+            failed = failure_rate > 0 and self.random.random() < failure_rate
+        latency = self.latency.get(service, 0.0) if isinstance(self.latency, dict) else self.latency
+        if latency > 0:
+            sleep(latency)
+        return self.failure_status if failed else None
+
+    # Workspace service methods
+
+    def _make_meta(self, path, object_type, owner, user_meta, size, is_folder):
+        folder, name = path.rsplit('/', 1)
+        return [name, object_type, folder + '/', _now(), str(uuid4()).upper(), owner, size, user_meta,
+                {'is_folder': 1 if is_folder else 0}, 'o', 'n', '']
+
+    def _ensure_folder(self, path, owner):
+        """ Create a folder and its parent folders when they do not exist. """
+
+        if path in self.objects:
+            return
+        parent = path.rsplit('/', 1)[0]
+        if len(parent) > 0:
+            self._ensure_folder(parent, owner)
+        self.objects[path] = {'meta': self._make_meta(path, 'folder', owner, dict(), 0, True), 'data': None}
+        return
+
+    def _get_object(self, reference):
+        path = _split_path(reference)[0]
+        if path not in self.objects:
+            raise RPCError('_ERROR_Object not found!_ERROR_')
+        return self.objects[path]
+
+    def workspace_get(self, params, owner):
+        output = list()
+        with self._lock:
+            for reference in params['objects']:
+                obj = self._get_object(reference)
+                if params.get('metadata_only', 0):
+                    output.append([obj['meta']])
+                else:
+                    output.append([obj['meta'], obj['data'] if obj['data'] is not None else ''])
+        return output
+
+    def workspace_ls(self, params, owner):
+        output = dict()
+        with self._lock:
+            for reference in params['paths']:
+                try:
+                    path = _split_path(reference)[0]
+                except RPCError:
+                    raise RPCError('_ERROR_Path does not point to folder or object: {0}_ERROR_'.format(reference))
+                if path not in self.objects or self.objects[path]['meta'][8]['is_folder'] == 0:
+                    continue
+                prefix = path + '/'
+                entries = list()
+                for key in sorted(self.objects):
+                    if not key.startswith(prefix):
+                        continue
+                    if not params.get('recursive', False) and '/' in key[len(prefix):]:
+                        continue
+                    entries.append(self.objects[key]['meta'])
+                output[reference] = entries
+        return output
+
+    def workspace_create(self, params, owner):
+        output = list()
+        with self._lock:
+            for spec in params['objects']:
+                path, parent, name = _split_path(spec[0])
+                object_type = spec[1]
+                user_meta = spec[2] if len(spec) > 2 else dict()
+                data = spec[3] if len(spec) > 3 else None
+                if path in self.objects and not params.get('overwrite', 0):
+                    if object_type in ['folder', 'modelfolder'] and self.objects[path]['meta'][8]['is_folder']:
+                        output.append(self.objects[path]['meta'])
+                        continue
+                    raise RPCError('_ERROR_Overwriting object {0} is not allowed!_ERROR_'.format(path))
+                if data is not None and not isinstance(data, six.string_types):
+                    data = dumps(data).decode('utf-8')
+                is_folder = object_type in ['folder', 'modelfolder']
+                size = len(data.encode('utf-8')) if data is not None else 0
+                self._ensure_folder(parent, owner)
+                meta = self._make_meta(path, object_type, owner, user_meta, size, is_folder)
+                if params.get('createUploadNodes', 0) and not is_folder:
+                    meta[11] = '{0}/{1}'.format(self.shock_url, self._create_node())
+                    data = None
+                self.objects[path] = {'meta': meta, 'data': data}
+                output.append(meta)
+        return output
+
+    def workspace_delete(self, params, owner):
+        output = list()
+        with self._lock:
+            for reference in params['objects']:
+                obj = self._get_object(reference)
+                path = _split_path(reference)[0]
+                if obj['meta'][8]['is_folder']:
+                    if not params.get('deleteDirectories', 0):
+                        raise RPCError('_ERROR_Cannot delete directories without deleteDirectories flag!_ERROR_')
+                    for key in [key for key in self.objects if key.startswith(path + '/')]:
+                        del self.objects[key]
+                del self.objects[path]
+                output.append(obj['meta'])
+        return output
+
+    def workspace_copy(self, params, owner):
+        output = list()
+        with self._lock:
+            for source, destination in params['objects']:
+                obj = self._get_object(source)
+                source_path = _split_path(source)[0]
+                path, parent, name = _split_path(destination)
+                if path == source_path or path.startswith(source_path + '/'):
+                    raise RPCError('_ERROR_Cannot copy an object into itself!_ERROR_')
+                is_folder = obj['meta'][8]['is_folder']
+                if is_folder and not params.get('recursive', 0):
+                    raise RPCError('_ERROR_Cannot copy folders without recursive flag!_ERROR_')
+                if path in self.objects and not params.get('overwrite', 0):
+                    raise RPCError('_ERROR_Overwriting object {0} is not allowed!_ERROR_'.format(path))
+                self._ensure_folder(parent, owner)
+                sources = [(source_path, path)]
+                if is_folder:
+                    sources.extend([(key, path + key[len(source_path):]) for key in sorted(self.objects)
+                                    if key.startswith(source_path + '/')])
+                for old_path, new_path in sources:
+                    old = self.objects[old_path]
+                    meta = self._make_meta(new_path, old['meta'][1], owner, dict(old['meta'][7]), old['meta'][6],
+                                           old['meta'][8]['is_folder'])
+                    meta[11] = old['meta'][11]
+                    self.objects[new_path] = {'meta': meta, 'data': old['data']}
+                if params.get('move', 0):
+                    for old_path, new_path in sources:
+                        del self.objects[old_path]
+                output.append(self.objects[path]['meta'])
+        return output
+
+    # ProbModelSEED service methods
+
+    def _make_model(self, model_id, genome_id):
+        """ Make a synthetic model in the format returned by get_model(). """
+
+        rng = random.Random(model_id)
+        num_compounds = max(2, int(self.num_reactions * 0.8))
+        compounds = [{'id': 'cpd{0:05d}_c0'.format(index), 'name': 'Compound {0}'.format(index),
+                      'formula': 'C{0}H{1}'.format(rng.randint(1, 20), rng.randint(1, 40)),
+                      'charge': rng.randint(-2, 2), 'modelcompartment_ref': '~/modelcompartments/id/c0'}
+                     for index in range(num_compounds)]
+        reactions = list()
+        for index in range(self.num_reactions):
+            reagents = [{'coefficient': coefficient,
+                         'modelcompound_ref': '~/modelcompounds/id/cpd{0:05d}_c0'.format(rng.randrange(num_compounds))}
+                        for coefficient in [-1.0, 1.0]]
+            proteins = list()
+            if index % 4 != 0:  # Three of every four reactions are associated with a gene
+                feature_id = 'fig|{0}.peg.{1}'.format(genome_id, rng.randint(1, max(1, self.num_reactions // 2)))
+                proteins.append({'modelReactionProteinSubunits': [{'feature_refs': ['~/genome/features/id/' +
+                                                                                    feature_id]}]})
+            reactions.append({'id': 'rxn{0:05d}_c0'.format(index), 'name': 'Reaction {0}'.format(index),
+                              'direction': rng.choice(['>', '<', '=']),
+                              'modelcompartment_ref': '~/modelcompartments/id/c0',
+                              'modelReactionReagents': reagents, 'modelReactionProteins': proteins})
+        return {'id': model_id, 'name': self.genomes.get(genome_id, {}).get('summary', {}).get('genome_name', model_id),
+                'genome_ref': '~/genome', 'modelcompartments': [{'id': 'c0', 'label': 'Cytosol_0'}],
+                'modelcompounds': compounds, 'modelreactions': reactions, 'gapfillings': []}
+
+    def _finish_reconstruction(self, job):
+        """ Store the model created by a reconstruction job. """
+
+        params = job['parameters']
+        genome = params['genome']
+        genome_id = genome.split(':', 1)[1] if ':' in genome else genome.rsplit('/', 1)[-1]
+        folder = params.get('output_path', '/{0}/modelseed'.format(job['owner'])).rstrip('/')
+        reference = '{0}/{1}'.format(folder, params['output_file'])
+        model = self._make_model(params['output_file'], genome_id)
+        genes = set()
+        gene_reactions = 0
+        for reaction in model['modelreactions']:
+            for protein in reaction['modelReactionProteins']:
+                for subunit in protein['modelReactionProteinSubunits']:
+                    genes.update(subunit['feature_refs'])
+            if len(reaction['modelReactionProteins']) > 0:
+                gene_reactions += 1
+        stats = {
+            'fba_count': '0', 'gapfilled_reactions': '0', 'gene_associated_reactions': str(gene_reactions),
+            'genome_ref': reference + '/genome', 'integrated_gapfills': '0', 'name': model['name'],
+            'num_biomass_compounds': '0', 'num_biomasses': '0', 'num_compartments': '1',
+            'num_compounds': str(len(model['modelcompounds'])), 'num_genes': str(len(genes)),
+            'num_reactions': str(len(model['modelreactions'])), 'ref': reference, 'source': 'PATRIC',
+            'source_id': genome_id, 'template_ref': params.get('template_model', '/chenry/public/modelsupport/'
+                                                                                 'templates/GramNegModelTemplate'),
+            'type': 'GenomeScale', 'unintegrated_gapfills': '0'
+        }
+        self.workspace_create({'objects': [[reference, 'modelfolder', stats]], 'overwrite': 1}, job['owner'])
+        self.workspace_create({'objects': [[reference + '/model', 'model', dict(), model],
+                                           [reference + '/genome', 'genome', dict(), {'id': genome_id}]],
+                               'overwrite': 1}, job['owner'])
+        return
+
+    def _update_jobs(self):
+        """ Complete jobs that have been running for job_duration seconds. """
+
+        for job in self.jobs.values():
+            if job['status'] == 'completed' or job['status'] == 'failed':
+                continue
+            if time() - job['submit_time'] >= self.job_duration:
+                try:
+                    if job['app'] == 'ModelReconstruction':
+                        self._finish_reconstruction(job)
+                    job['status'] = 'completed'
+                except RPCError as e:
+                    job['status'] = 'failed'
+                    job['error'] = str(e)
+            else:
+                job['status'] = 'in-progress'
+        return
+
+    def modelseed_ModelReconstruction(self, params, owner):
+        with self._lock:
+            job_id = str(uuid4())
+            self.jobs[job_id] = {'id': job_id, 'app': 'ModelReconstruction', 'parameters': params,
+                                 'status': 'queued', 'submit_time': time(), 'owner': owner}
+            self._update_jobs()
+        return job_id
+
+    def modelseed_CheckJobs(self, params, owner):
+        with self._lock:
+            self._update_jobs()
+            output = dict()
+            for job_id, job in self.jobs.items():
+                if job['owner'] != owner:
+                    continue
+                output[job_id] = dict([(key, value) for key, value in job.items() if key != 'owner'])
+        return output
+
+    def modelseed_get_model(self, params, owner):
+        with self._lock:
+            obj = self._get_object(params['model'] + '/model')
+            return loads(obj['data'])
+
+    def modelseed_list_models(self, params, owner):
+        output = list()
+        with self._lock:
+            folder = _split_path(params.get('path', '/{0}/modelseed'.format(owner)))[0]
+            for key in sorted(self.objects):
+                meta = self.objects[key]['meta']
+                if key.startswith(folder + '/') and meta[1] == 'modelfolder':
+                    stats = dict(meta[7])
+                    stats['id'] = meta[0]
+                    stats['rundate'] = meta[3]
+                    output.append(stats)
+        return output
+
+    def modelseed_delete_model(self, params, owner):
+        return self.workspace_delete({'objects': [params['model']], 'deleteDirectories': 1, 'force': 1}, owner)[0]
+
+    # PATRIC data API
+
+    def patric_genome(self, genome_id):
+        with self._lock:
+            if genome_id not in self.genomes:
+                return None
+            return self.genomes[genome_id]['summary']
+
+    def patric_genome_feature(self, query):
+        match = re.match(r'genome_id:(\S+)', query.get('q', [''])[0])
+        genome_id = match.group(1) if match else None
+        with self._lock:
+            features = list(self.genomes[genome_id]['features']) if genome_id in self.genomes else list()
+        # Each filter query is a field and value that must match (or must not match with a leading "-").
+        for clause in query.get('fq', []):
+            field, value = clause.lstrip('-').split(':', 1)
+            exclude = clause.startswith('-')
+            features = [feature for feature in features if (str(feature.get(field, '')) == value) != exclude]
+
+        rows = int(query.get('rows', ['25'])[0])
+        response = {'responseHeader': {'status': 0}}
+        if 'cursorMark' not in query:
+            start = int(query.get('start', ['0'])[0])
+            docs = features[start:start + rows]
+        else:
+            # The cursor is the unique key of the last feature in the previous page.
+            cursor = query['cursorMark'][0]
+            start = 0
+            features.sort(key=lambda feature: feature['feature_id'])
+            docs = [feature for feature in features if cursor == '*' or feature['feature_id'] > cursor][:rows]
+            response['nextCursorMark'] = docs[-1]['feature_id'] if docs else cursor
+        if 'fl' in query:
+            names = query['fl'][0].split(',')
+            docs = [dict([(name, doc[name]) for name in names if name in doc]) for doc in docs]
+        response['response'] = {'numFound': len(features), 'start': start, 'docs': docs}
+        return response
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    """ Handler for requests to the mock server. """
+
+    mock = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        return
+
+    def _send(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        request = loads(self.rfile.read(length))
+        service = self.path.rstrip('/').rsplit('/', 1)[-1]
+        if service not in ['Workspace', 'ProbModelSEED']:
+            self._send(404, b'Not found', 'text/plain')
+            return
+        status = self.mock._before_request(service)
+        if status is not None:
+            self._send(status, b'Injected failure', 'text/plain')
+            return
+
+        token = self.headers.get('Authorization')
+        if token is None or token == 'None':
+            self._send_error(request, '_ERROR_Authentication required!_ERROR_')
+            return
+        owner = token.split('|')[0].replace('un=', '')
+        method_name = request['method'].split('.', 1)[-1]
+        prefix = 'workspace_' if service == 'Workspace' else 'modelseed_'
+        method = getattr(self.mock, prefix + method_name, None)
+        if method is None:
+            self._send_error(request, 'JSONRPC error:\nMethod {0} is not supported by mock server'
+                             .format(request['method']))
+            return
+        try:
+            result = method(request['params'], owner)
+        except RPCError as e:
+            self._send_error(request, str(e))
+            return
+        except (KeyError, IndexError, TypeError) as e:
+            self._send_error(request, 'JSONRPC error:\nInvalid parameters: {0}'.format(e))
+            return
+        self._send(200, dumps({'version': '1.1', 'id': request.get('id'), 'result': [result]}))
+
+    def _send_error(self, request, message):
+        error = {'name': 'JSONRPCError', 'code': -32603, 'message': message}
+        self._send(500, dumps({'version': '1.1', 'id': request.get('id'), 'error': error}))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith('/node/'):
+            self._shock_get(url)
+            return
+        if not url.path.startswith('/api/'):
+            self._send(404, b'Not found', 'text/plain')
+            return
+        status = self.mock._before_request('PATRIC')
+        if status is not None:
+            self._send(status, b'Injected failure', 'text/plain')
+            return
+        parts = [part for part in url.path[5:].split('/') if len(part) > 0]
+        if len(parts) == 1 and parts[0] == 'genome_feature':
+            self._send(200, dumps(self.mock.patric_genome_feature(parse_qs(url.query))))
+        elif len(parts) == 2 and parts[0] == 'genome':
+            summary = self.mock.patric_genome(parts[1])
+            if summary is None:
+                self._send(404, b'Not found', 'text/plain')
+            else:
+                self._send(200, dumps(summary))
+        else:
+            self._send(404, b'Not found', 'text/plain')
+
+    def do_PUT(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        url = urlparse(self.path)
+        if not url.path.startswith('/node/'):
+            self._send(404, b'Not found', 'text/plain')
+            return
+        status = self.mock._before_request('Shock')
+        if status is not None:
+            self._send(status, b'Injected failure', 'text/plain')
+            return
+        if not self.headers.get('Authorization', '').startswith('OAuth '):
+            self._send(401, dumps({'status': 401, 'data': None, 'error': ['Unauthorized']}))
+            return
+
+        # Get the file from the "upload" field of the multipart form.
+        match = re.search(r'boundary=([^;]+)', self.headers.get('Content-Type', ''))
+        data = None
+        if match:
+            for part in body.split(b'--' + match.group(1).encode('utf-8')):
+                header, _, content = part.partition(b'\r\n\r\n')
+                if b'name="upload"' in header:
+                    data = content[:-2] if content.endswith(b'\r\n') else content
+        if data is None:
+            self._send(400, dumps({'status': 400, 'data': None, 'error': ['No file uploaded']}))
+            return
+        node = self.mock.shock_upload(url.path[6:].strip('/'), data)
+        if node is None:
+            self._send(404, dumps({'status': 404, 'data': None, 'error': ['Node not found']}))
+            return
+        self._send(200, dumps({'status': 200, 'data': node, 'error': None}))
+
+    def _shock_get(self, url):
+        status = self.mock._before_request('Shock')
+        if status is not None:
+            self._send(status, b'Injected failure', 'text/plain')
+            return
+        if not self.headers.get('Authorization', '').startswith('OAuth '):
+            self._send(401, dumps({'status': 401, 'data': None, 'error': ['Unauthorized']}))
+            return
+        node_id = url.path[6:].strip('/')
+        node = self.mock.shock_node(node_id)
+        if node is None:
+            self._send(404, dumps({'status': 404, 'data': None, 'error': ['Node not found']}))
+            return
+        if url.query != 'download':
+            self._send(200, dumps({'status': 200, 'data': node, 'error': None}))
+            return
+
+        # Send all of the data or the range of data requested in the Range header.
+        data = self.mock.nodes[node_id] or b''
+        start = 0
+        match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+        body = data[start:]
+        self.send_response(206 if match else 200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        if match:
+            self.send_header('Content-Range', 'bytes {0}-{1}/{2}'.format(start, len(data) - 1, len(data)))
+        self.end_headers()
+
+        # Simulate a dropped connection by closing it after sending part of the data.
+        with self.mock._lock:
+            drop_after = self.mock.shock_drop_after
+            self.mock.shock_drop_after = None
+        if drop_after is not None and drop_after < len(body):
+            self.wfile.write(body[:drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a local stand-in server for SEED web services')
+    parser.add_argument('--host', default='127.0.0.1', help='address for server')
+    parser.add_argument('--port', type=int, default=8080, help='port number for server')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds to wait before every response')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of requests that fail')
+    parser.add_argument('--failure-status', type=int, default=503, help='HTTP status code for failed requests')
+    parser.add_argument('--job-duration', type=float, default=0.0, help='seconds before a job is completed')
+    parser.add_argument('--genome', action='append', default=[], help='genome ID to add to PATRIC data API')
+    args = parser.parse_args()
+
+    server = MockServer(host=args.host, port=args.port, latency=args.latency, failure_rate=args.failure_rate,
+                        failure_status=args.failure_status, job_duration=args.job_duration)
+    for genome_id in args.genome:
+        server.add_genome(genome_id)
+    server.start()
+    print('Workspace service at {0}'.format(server.workspace_url))
+    print('ProbModelSEED service at {0}'.format(server.modelseed_url))
+    print('Shock service at {0}'.format(server.shock_url))
+    print('PATRIC data API at {0}'.format(server.patric_url))
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
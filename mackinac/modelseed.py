@@ -8,7 +8,8 @@ import re
 from cobra import Model, Reaction, Metabolite, Gene
 
 from .SeedClient import SeedClient, ServerError, ObjectNotFoundError, JobError, handle_server_error
-from .workspace import get_workspace_object_meta, get_workspace_object_data, put_workspace_object
+from .workspace import get_workspace_object_meta, get_workspace_object_data, put_workspace_object, _metadata_cache, \
+    _forget_reads
 
 # ModelSEED service endpoint
 modelseed_url = 'http://p3c.theseed.org/dev1/services/ProbModelSEED'
@@ -29,13 +30,34 @@ patric_gene_prefix_re = re.compile(r'^fig\|')
 model_folder = 'modelseed'
 
 
-def _make_modelseed_reference(name):
+def _modelseed_client(context):
+    """ Get the client for the ModelSEED web service.
+
+    Parameters
+    ----------
+    context : ClientContext
+        Clients for web services or None to use the clients shared by the process
+
+    Returns
+    -------
+    SeedClient
+        Client for ModelSEED web service
+    """
+
+    if context is None:
+        return ms_client
+    return context.modelseed
+
+
+def _make_modelseed_reference(name, context=None):
     """ Make a workspace reference to an object.
 
     Parameters
     ----------
     name : str
         Name of object
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -43,30 +65,37 @@ def _make_modelseed_reference(name):
         Reference to object in user's model folder
     """
 
-    if ms_client.username is None:
-        ms_client.set_authentication_token()
-    return '/{0}/{1}/{2}'.format(ms_client.username, model_folder, name)
+    client = _modelseed_client(context)
+    if client.username is None:
+        client.set_authentication_token()
+    return '/{0}/{1}/{2}'.format(client.username, model_folder, name)
 
 
-def delete_modelseed_model(model_id):
+def delete_modelseed_model(model_id, context=None):
     """ Delete a ModelSEED model from the workspace.
 
     Parameters
     ----------
     model_id : str
         ID of model
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
     """
 
-    reference = _make_modelseed_reference(model_id)
+    reference = _make_modelseed_reference(model_id, context)
+    _forget_reads([reference])
     try:
-        ms_client.call('delete_model', {'model': reference})
+        _modelseed_client(context).call('delete_model', {'model': reference})
     except ServerError as e:
         handle_server_error(e, [reference])
+    finally:
+        _metadata_cache(context).invalidate(reference)
 
     return
 
 
-def gapfill_modelseed_model(model_id, media_reference=None, likelihood=False, comprehensive=False, solver=None):
+def gapfill_modelseed_model(model_id, media_reference=None, likelihood=False, comprehensive=False, solver=None,
+                            context=None):
     """ Run gap fill on a ModelSEED model.
 
     Parameters
@@ -81,6 +110,8 @@ def gapfill_modelseed_model(model_id, media_reference=None, likelihood=False, co
         True to run a comprehensive gap fill
     solver : str, optional
         Name of LP solver (None to use default solver as configured in web service)
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -88,7 +119,43 @@ def gapfill_modelseed_model(model_id, media_reference=None, likelihood=False, co
         Dictionary of current model statistics
     """
 
-    reference = _make_modelseed_reference(model_id)
+    reference = _make_modelseed_reference(model_id, context)
+    params = _make_gapfill_params(reference, media_reference, likelihood, comprehensive, solver)
+
+    try:
+        job_id = _modelseed_client(context).call('GapfillModel', params)
+        _wait_for_job(job_id, context)
+    except ServerError as e:
+        references = [reference]
+        if media_reference is not None:
+            references.append(media_reference)
+        handle_server_error(e, references)
+
+    return _finish_model_job(model_id, context)
+
+
+def _make_gapfill_params(reference, media_reference, likelihood, comprehensive, solver):
+    """ Make the input parameters for the GapfillModel server method.
+
+    Parameters
+    ----------
+    reference : str
+        Workspace reference to model
+    media_reference : str
+        Workspace reference to media to gap fill on or None for complete media
+    likelihood : bool
+        True to use likelihood-based gap fill
+    comprehensive : bool
+        True to run a comprehensive gap fill
+    solver : str
+        Name of LP solver or None to use default solver
+
+    Returns
+    -------
+    dict
+        Dictionary of input parameters for method
+    """
+
     params = dict()
     params['model'] = reference
     params['integrate_solution'] = 1
@@ -102,26 +169,18 @@ def gapfill_modelseed_model(model_id, media_reference=None, likelihood=False, co
         params['comprehensive_gapfill'] = 1
     if solver is not None:
         params['solver'] = solver
-
-    try:
-        job_id = ms_client.call('GapfillModel', params)
-        _wait_for_job(job_id)
-    except ServerError as e:
-        references = [reference]
-        if media_reference is not None:
-            references.append(media_reference)
-        handle_server_error(e, references)
-
-    return get_modelseed_model_stats(model_id)
+    return params
 
 
-def get_modelseed_fba_solutions(model_id):
+def get_modelseed_fba_solutions(model_id, context=None):
     """ Get the list of fba solutions available for a ModelSEED model.
 
     Parameters
     ----------
     model_id : str
         ID of model
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -129,10 +188,10 @@ def get_modelseed_fba_solutions(model_id):
         List of fba solution data structures
     """
 
-    reference = _make_modelseed_reference(model_id)
+    reference = _make_modelseed_reference(model_id, context)
     try:
-        get_modelseed_model_stats(model_id)  # Confirm model exists
-        solutions = ms_client.call('list_fba_studies', {'model': reference})
+        get_modelseed_model_stats(model_id, cached=True, context=context)  # Confirm model exists
+        solutions = _modelseed_client(context).call('list_fba_studies', {'model': reference})
     except ServerError as e:
         handle_server_error(e, [reference])
         return
@@ -142,7 +201,7 @@ def get_modelseed_fba_solutions(model_id):
     # results of each flux balance analysis separately.
     for sol in solutions:
         try:
-            solution_data = get_workspace_object_data(sol['ref'])
+            solution_data = get_workspace_object_data(sol['ref'], context=context)
         except ServerError as e:
             handle_server_error(e, sol['ref'])
 
@@ -174,13 +233,15 @@ def get_modelseed_fba_solutions(model_id):
     return solutions
 
 
-def get_modelseed_gapfill_solutions(model_id):
+def get_modelseed_gapfill_solutions(model_id, context=None):
     """ Get the list of gap fill solutions for a ModelSEED model.
 
     Parameters
     ----------
     model_id : str
         ID of model
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -188,10 +249,10 @@ def get_modelseed_gapfill_solutions(model_id):
         List of gap fill solution data structures
     """
 
-    reference = _make_modelseed_reference(model_id)
+    reference = _make_modelseed_reference(model_id, context)
     try:
-        get_modelseed_model_stats(model_id)  # Confirm model exists
-        solutions = ms_client.call('list_gapfill_solutions', {'model': reference})
+        get_modelseed_model_stats(model_id, cached=True, context=context)  # Confirm model exists
+        solutions = _modelseed_client(context).call('list_gapfill_solutions', {'model': reference})
     except ServerError as e:
         handle_server_error(e, [reference])
 
@@ -214,13 +275,15 @@ def get_modelseed_gapfill_solutions(model_id):
     return solutions
 
 
-def get_modelseed_model_data(model_id):
+def get_modelseed_model_data(model_id, context=None):
     """ Get the model data for a ModelSEED model.
 
     Parameters
     ----------
     model_id : str
         Name of model
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -228,20 +291,24 @@ def get_modelseed_model_data(model_id):
         Dictionary of all model data
     """
 
-    reference = _make_modelseed_reference(model_id)
+    reference = _make_modelseed_reference(model_id, context)
     try:
-        return ms_client.call('get_model', {'model': reference, 'to': 1})
+        return _modelseed_client(context).call('get_model', {'model': reference, 'to': 1})
     except ServerError as e:
         handle_server_error(e, [reference])
 
 
-def get_modelseed_model_stats(model_id):
+def get_modelseed_model_stats(model_id, cached=False, context=None):
     """ Get the model statistics for a ModelSEED model.
 
     Parameters
     ----------
     model_id : str
         ID of model
+    cached : bool, optional
+        When True, use the model metadata from the metadata cache if it was retrieved recently
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -250,7 +317,8 @@ def get_modelseed_model_stats(model_id):
     """
 
     # The metadata for the model object has the data needed for the dictionary.
-    metadata = get_workspace_object_meta(_make_modelseed_reference(model_id))
+    metadata = get_workspace_object_meta(_make_modelseed_reference(model_id, context), cached=cached,
+                                         context=context)
 
     # Build the model statistics dictionary.
     stats = dict()
@@ -278,7 +346,7 @@ def get_modelseed_model_stats(model_id):
     return stats
 
 
-def list_modelseed_models(base_folder=None, sort_key='rundate', print_output=False):
+def list_modelseed_models(base_folder=None, sort_key='rundate', print_output=False, context=None):
     """ List the ModelSEED models for the user.
 
     Parameters
@@ -289,6 +357,8 @@ def list_modelseed_models(base_folder=None, sort_key='rundate', print_output=Fal
         Name of field to use as sort key for output
     print_output : bool, optional
         When True, print a summary of the list instead of returning the list
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -301,7 +371,7 @@ def list_modelseed_models(base_folder=None, sort_key='rundate', print_output=Fal
         params['path'] = base_folder
 
     try:
-        output = ms_client.call('list_models', params)
+        output = _modelseed_client(context).call('list_models', params)
     except ServerError as e:
         handle_server_error(e)
     reverse = False
@@ -546,7 +616,7 @@ def _add_reaction(modelseed_reaction, model, id_type, likelihoods):
     return
 
 
-def create_cobra_model_from_modelseed_model(model_id, id_type='modelseed', validate=False):
+def create_cobra_model_from_modelseed_model(model_id, id_type='modelseed', validate=False, context=None):
     """ Create a COBRA model from a ModelSEED model.
 
     Parameters
@@ -557,6 +627,8 @@ def create_cobra_model_from_modelseed_model(model_id, id_type='modelseed', valid
         Type of IDs ('modelseed' for _c or 'bigg' for '[c])
     validate : bool
         When True, check for common problems
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -573,13 +645,13 @@ def create_cobra_model_from_modelseed_model(model_id, id_type='modelseed', valid
         raise ValueError('id_type {0} is not supported'.format(id_type))
 
     # Get the ModelSEED model data.
-    data = get_modelseed_model_data(model_id)
-    reference = _make_modelseed_reference(model_id)
+    data = get_modelseed_model_data(model_id, context=context)
+    reference = _make_modelseed_reference(model_id, context)
 
     # Get the workspace object with the likelihoods and put the likelihood values in a dictionary
     # keyed by reaction ID. Calculating likelihoods is optional so the object may not exist.
     try:
-        likelihood_data = get_workspace_object_data(join(reference, 'rxnprobs'))
+        likelihood_data = get_workspace_object_data(join(reference, 'rxnprobs'), context=context)
         likelihoods = {r[0]: r[1] for r in likelihood_data['reaction_probabilities']}
     except ObjectNotFoundError:
         likelihoods = dict()
@@ -689,7 +761,7 @@ def create_cobra_model_from_modelseed_model(model_id, id_type='modelseed', valid
     return model
 
 
-def create_universal_model(template_reference, id_type='modelseed'):
+def create_universal_model(template_reference, id_type='modelseed', context=None):
     """ Create a universal model from a ModelSEED template model.
 
         A template model has all of the reactions and metabolites that are available for
@@ -703,6 +775,8 @@ def create_universal_model(template_reference, id_type='modelseed'):
         Workspace reference to template model
     id_type : {'modelseed', 'bigg'}, optional
         Type of IDs ('modelseed' for _c or 'bigg' for '[c])
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -711,7 +785,7 @@ def create_universal_model(template_reference, id_type='modelseed'):
     """
 
     # Get the template model data from the workspace object.
-    data = get_workspace_object_data(template_reference)
+    data = get_workspace_object_data(template_reference, context=context)
 
     # Create a dict to look up compounds.
     compound_index = dict()
@@ -784,7 +858,7 @@ def create_universal_model(template_reference, id_type='modelseed'):
     return model
 
 
-def optimize_modelseed_model(model_id, media_reference=None):
+def optimize_modelseed_model(model_id, media_reference=None, context=None):
     """ Run flux balance analysis on a ModelSEED model.
 
     Parameters
@@ -793,6 +867,8 @@ def optimize_modelseed_model(model_id, media_reference=None):
         ID of model
     media_reference : str
         Workspace reference to media to optimize on (default is complete media)
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -802,10 +878,10 @@ def optimize_modelseed_model(model_id, media_reference=None):
 
     # Get the current list of fba solutions which is the only way to tell if this
     # optimization is successful because fba_count is not updated in the metadata.
-    fba_count = len(get_modelseed_fba_solutions(model_id))
+    fba_count = len(get_modelseed_fba_solutions(model_id, context=context))
 
     # Set input parameters for method.
-    reference = _make_modelseed_reference(model_id)
+    reference = _make_modelseed_reference(model_id, context)
     params = dict()
     params['model'] = reference
     params['predict_essentiality'] = 1
@@ -814,8 +890,9 @@ def optimize_modelseed_model(model_id, media_reference=None):
 
     # Run the server method.
     try:
-        job_id = ms_client.call('FluxBalanceAnalysis', params)
-        _wait_for_job(job_id)
+        job_id = _modelseed_client(context).call('FluxBalanceAnalysis', params)
+        _wait_for_job(job_id, context)
+        _metadata_cache(context).invalidate(reference)
     except ServerError as e:
         references = [reference]
         if media_reference is not None:
@@ -825,14 +902,15 @@ def optimize_modelseed_model(model_id, media_reference=None):
     # The completed job does not have the reference to the fba object that
     # was just created so get the list of solutions. Last completed
     # solution is first in the list.
-    solutions = get_modelseed_fba_solutions(model_id)
+    solutions = get_modelseed_fba_solutions(model_id, context=context)
     if fba_count == len(solutions):
         warn('Optimization for {0} did not return a solution'.format(model_id))
         return 0.0
     return float(solutions[0]['objective'])
 
 
-def reconstruct_modelseed_model(genome_id, source='patric', template_reference=None, likelihood=False, model_id=None):
+def reconstruct_modelseed_model(genome_id, source='patric', template_reference=None, likelihood=False, model_id=None,
+                                context=None):
     """ Reconstruct a draft ModelSEED model for an organism.
 
     Parameters
@@ -847,6 +925,8 @@ def reconstruct_modelseed_model(genome_id, source='patric', template_reference=N
         True to generate reaction likelihoods
     model_id : str, optional
         ID of output model (default is genome ID)
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -855,6 +935,101 @@ def reconstruct_modelseed_model(genome_id, source='patric', template_reference=N
     """
 
     # Set input parameters for method.
+    model_id, params = _make_reconstruction_params(genome_id, source, template_reference, likelihood, model_id)
+
+    # Workaround for ModelSEED workspace bug. The user's modelseed folder must exist before saving
+    # the model. Otherwise the type of the folder created for the model is not "modelfolder" and
+    # subsequent operations on the model will fail.
+    client = _modelseed_client(context)
+    if client.username is None:
+        client.set_authentication_token()
+    folder_reference = '/{0}/{1}'.format(client.username, model_folder)
+    try:
+        get_workspace_object_meta(folder_reference, cached=True, context=context)
+    except ObjectNotFoundError:
+        put_workspace_object(folder_reference, 'folder', context=context)
+
+    # Run the server method.
+    try:
+        job_id = client.call('ModelReconstruction', params)
+    except ServerError as e:
+        references = None
+        if template_reference is not None:
+            references = [template_reference]
+        handle_server_error(e, references)
+
+    # The task structure has the workspace where the model is stored but not the name of the model.
+    _wait_for_job(job_id, context)
+    return _finish_reconstruction(genome_id, model_id, context)
+
+
+def _finish_model_job(model_id, context):
+    """ Get the model statistics for a model after a job that changed the model ended.
+
+    Parameters
+    ----------
+    model_id : str
+        ID of model
+    context : ClientContext
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    dict
+        Dictionary of current model statistics
+    """
+
+    # The job changed the model on the server so the cached metadata is out of date.
+    _metadata_cache(context).invalidate(_make_modelseed_reference(model_id, context))
+    return get_modelseed_model_stats(model_id, context=context)
+
+
+def _finish_reconstruction(genome_id, model_id, context):
+    """ Get the model statistics for a model after a reconstruction job ended.
+
+    Parameters
+    ----------
+    genome_id : str
+        Genome ID or workspace reference to genome
+    model_id : str
+        ID of model
+    context : ClientContext
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    dict
+        Dictionary of current model statistics
+    """
+
+    stats = _finish_model_job(model_id, context)
+    if stats['num_genes'] == 0:  # ModelSEED does not return an error if the genome ID is invalid
+        warn('Model for genome ID {0} has no genes, verify genome ID is valid'.format(genome_id))
+    return stats
+
+
+def _make_reconstruction_params(genome_id, source, template_reference, likelihood, model_id):
+    """ Make the input parameters for the ModelReconstruction server method.
+
+    Parameters
+    ----------
+    genome_id : str
+        Genome ID or workspace reference to genome
+    source : {'patric', 'rast', 'workspace'}
+        Source of genome
+    template_reference : str
+        Workspace reference to template model or None for default template
+    likelihood : bool
+        True to generate reaction likelihoods
+    model_id : str
+        ID of output model or None to use genome ID
+
+    Returns
+    -------
+    tuple
+        ID of output model and dictionary of input parameters for method
+    """
+
     params = dict()
     if source == 'patric':
         params['genome'] = 'PATRIC:' + genome_id
@@ -875,44 +1050,53 @@ def reconstruct_modelseed_model(genome_id, source='patric', template_reference=N
         params['probanno'] = 0
     params['gapfill'] = 0
     params['predict_essentiality'] = 0
+    return model_id, params
 
-    # Workaround for ModelSEED workspace bug. The user's modelseed folder must exist before saving
-    # the model. Otherwise the type of the folder created for the model is not "modelfolder" and
-    # subsequent operations on the model will fail.
-    if ms_client.username is None:
-        ms_client.set_authentication_token()
-    folder_reference = '/{0}/{1}'.format(ms_client.username, model_folder)
-    try:
-        get_workspace_object_meta(folder_reference)
-    except ObjectNotFoundError:
-        put_workspace_object(folder_reference, 'folder')
 
-    # Run the server method.
-    try:
-        job_id = ms_client.call('ModelReconstruction', params)
-    except ServerError as e:
-        references = None
-        if template_reference is not None:
-            references = [template_reference]
-        handle_server_error(e, references)
+def _check_job(jobs, jobid):
+    """ Check the status of a job submitted to the ModelSEED app service.
 
-    # The task structure has the workspace where the model is stored but not the name of the model.
-    _wait_for_job(job_id)
+    Parameters
+    ----------
+    jobs : dict
+        Dictionary of task structures returned by CheckJobs server method
+    jobid : str
+        ID of submitted job
 
-    # Get the model statistics for the model.
-    stats = get_modelseed_model_stats(model_id)
-    if stats['num_genes'] == 0:  # ModelSEED does not return an error if the genome ID is invalid
-        warn('Model for genome ID {0} has no genes, verify genome ID is valid'.format(genome_id))
-    return stats
+    Returns
+    -------
+    dict or None
+        Task structure when job is completed or None when job is still running
+
+    Raises
+    ------
+    JobError
+        When a job with the specified ID was not found
+    ServerError
+        When the job ended in error
+    """
+
+    if jobid not in jobs:
+        raise JobError('Job {0} was not found'.format(jobid))
+    task = jobs[jobid]
+    if task['status'] == 'failed':
+        if 'error' in task:
+            raise ServerError(task['error'])
+        raise ServerError('Job submitted to ModelSEED app service failed, no details provided in response')
+    elif task['status'] == 'completed':
+        return task
+    return None
 
 
-def _wait_for_job(jobid):
+def _wait_for_job(jobid, context=None):
     """ Wait for a job submitted to the ModelSEED app service to end.
 
     Parameters
     ----------
     jobid : str
         ID of submitted job
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -926,19 +1110,8 @@ def _wait_for_job(jobid):
     """
 
     task = None
-    done = False
-    while not done:
-        jobs = ms_client.call('CheckJobs', {})
-        if jobid in jobs:
-            task = jobs[jobid]
-            if task['status'] == 'failed':
-                if 'error' in task:
-                    raise ServerError(task['error'])
-                raise ServerError('Job submitted to ModelSEED app service failed, no details provided in response')
-            elif task['status'] == 'completed':
-                done = True
-            else:
-                sleep(3)
-        else:
-            raise JobError('Job {0} was not found'.format(jobid))
+    while task is None:
+        task = _check_job(_modelseed_client(context).call('CheckJobs', {}), jobid)
+        if task is None:
+            sleep(3)
     return task
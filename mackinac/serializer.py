@@ -0,0 +1,143 @@
+""" Encode and decode JSON data with the fastest available backend.
+
+    All of the requests to and responses from web services go through the dumps()
+    and loads() functions in this module. By default, the json module from the
+    standard library is used. Call set_json_backend() to use orjson or ujson which
+    are faster (see benchmarks/json_backends.py) but encode some values differently,
+    for example orjson writes NaN and Infinity as null. Values that orjson or ujson
+    cannot encode, such as integers larger than 64 bits, are encoded with the json
+    module instead.
+"""
+
+from __future__ import absolute_import
+import json
+
+# Names of supported backends in order of preference
+backend_names = ['orjson', 'ujson', 'json']
+
+# Name of backend currently in use and functions for encoding and decoding
+_backend_name = None
+_dumps = None
+_loads = None
+
+
+def _stdlib_dumps(data):
+    return json.dumps(data).encode('utf-8')
+
+
+def _stdlib_loads(data):
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def _orjson_dumps(data):
+    import orjson
+    try:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return _stdlib_dumps(data)
+
+
+def _ujson_dumps(data):
+    import ujson
+    try:
+        return ujson.dumps(data, ensure_ascii=False).encode('utf-8')
+    except (TypeError, OverflowError):
+        return _stdlib_dumps(data)
+
+
+def set_json_backend(name=None):
+    """ Set the backend used to encode and decode JSON data.
+
+    Parameters
+    ----------
+    name : {'orjson', 'ujson', 'json'}, optional
+        Name of backend, when None use the first available backend in order of preference
+
+    Returns
+    -------
+    str
+        Name of backend in use
+
+    Raises
+    ------
+    ValueError
+        When the backend is not supported
+    ImportError
+        When the package for the backend is not installed
+    """
+
+    global _backend_name, _dumps, _loads
+
+    if name is None:
+        for candidate in backend_names:
+            try:
+                return set_json_backend(candidate)
+            except ImportError:
+                pass
+
+    if name == 'orjson':
+        import orjson
+        _dumps = _orjson_dumps
+        _loads = orjson.loads
+    elif name == 'ujson':
+        import ujson
+        _dumps = _ujson_dumps
+        _loads = ujson.loads
+    elif name == 'json':
+        _dumps = _stdlib_dumps
+        _loads = _stdlib_loads
+    else:
+        raise ValueError('JSON backend {0} is not supported'.format(name))
+    _backend_name = name
+    return _backend_name
+
+
+def get_json_backend():
+    """ Get the name of the backend used to encode and decode JSON data.
+
+    Returns
+    -------
+    str
+        Name of backend in use
+    """
+
+    return _backend_name
+
+
+def dumps(data):
+    """ Encode data to JSON.
+
+    Parameters
+    ----------
+    data : anything
+        Data to encode (can be dict, list, or string)
+
+    Returns
+    -------
+    bytes
+        UTF-8 encoded JSON document
+    """
+
+    return _dumps(data)
+
+
+def loads(data):
+    """ Decode data from JSON.
+
+    Parameters
+    ----------
+    data : str or bytes
+        JSON document
+
+    Returns
+    -------
+    data
+        Decoded data (can be dict, list, or string)
+    """
+
+    return _loads(data)
+
+
+set_json_backend('json')
@@ -32,3 +32,19 @@ def b_theta_id():
 @pytest.fixture(scope='session')
 def b_theta_name():
     return 'Bacteroides thetaiotaomicron VPI-5482'
+
+
+@pytest.fixture(scope='module')
+def mock_server(b_theta_genome_id, b_theta_name):
+    # Run a local stand-in server for the web services and point the clients at it.
+    from mackinac.mockserver import MockServer
+    with MockServer(num_reactions=200, seed=1) as server:
+        server.add_genome(b_theta_genome_id, name=b_theta_name, num_features=50)
+        server.install()
+        yield server
+
+
+@pytest.fixture(scope='module')
+def mock_model(mock_server, b_theta_genome_id, b_theta_id):
+    # Reconstruct a model on the local stand-in server.
+    return mackinac.reconstruct_modelseed_model(b_theta_genome_id, model_id=b_theta_id)
@@ -0,0 +1,73 @@
+import pytest
+import asyncio
+from time import time
+
+import mackinac
+from mackinac import aio
+
+
+@pytest.fixture(scope='module')
+def event_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+class TestAsyncMockServer:
+
+    def test_call(self, mock_server, mock_model, event_loop, b_theta_id):
+        count = mock_server.request_counts['Workspace']
+        params = {'objects': [mock_model['ref']], 'metadata_only': 1}
+
+        async def get_all():
+            return await asyncio.gather(*[aio.ws_client.call('get', params) for index in range(4)])
+
+        output = event_loop.run_until_complete(get_all())
+        assert len(output) == 4
+        assert all(item[0][0][0] == b_theta_id for item in output)
+        assert mock_server.request_counts['Workspace'] >= count + 1
+
+    def test_put_get_delete(self, mock_server, event_loop):
+        reference = '/mackinac@patricbrc.org/aio/object'
+        run = event_loop.run_until_complete
+        metadata = run(aio.put_workspace_object(reference, 'string', data={'message': 'test'}))
+        assert metadata[0] == 'object'
+        assert metadata[11] == ''
+        assert run(aio.get_workspace_object_data(reference)) == {'message': 'test'}
+        assert run(aio.get_workspace_object_meta(reference))[1] == 'string'
+        assert [item[0] for item in run(aio.list_workspace_objects('/mackinac@patricbrc.org/aio'))] == ['object']
+        assert run(aio.delete_workspace_object(reference))[0] == 'object'
+        with pytest.raises(mackinac.SeedClient.ObjectNotFoundError):
+            run(aio.get_workspace_object_meta(reference))
+
+    def test_put_shock(self, mock_server, event_loop):
+        reference = '/mackinac@patricbrc.org/aio/shock'
+        run = event_loop.run_until_complete
+        metadata = run(aio.put_workspace_object(reference, 'string', data={'message': 'test'}, shock=True))
+        assert len(metadata[11]) > 0
+        assert run(aio.get_workspace_object_data(reference)) == {'message': 'test'}
+
+    def test_wait_for_job(self, mock_server, event_loop, monkeypatch, b_theta_genome_id):
+        monkeypatch.setattr(mock_server, 'job_duration', 0.3)
+        monkeypatch.setattr(aio, 'job_poll_interval', 0.05)
+        model_id, params = mackinac.modelseed._make_reconstruction_params(b_theta_genome_id, 'patric', None,
+                                                                          False, 'aio-wait')
+        start = time()
+        job_id = event_loop.run_until_complete(aio._call_modelseed('ModelReconstruction', params, None))
+        task = event_loop.run_until_complete(aio.wait_for_job(job_id))
+        assert task['status'] == 'completed'
+        assert time() - start >= 0.3
+        with pytest.raises(mackinac.SeedClient.JobError):
+            event_loop.run_until_complete(aio.wait_for_job('bad-job-id'))
+
+    def test_reconstruct(self, mock_server, event_loop, b_theta_genome_id, b_theta_name):
+        model_reference = '/mackinac@patricbrc.org/modelseed/aio-model'
+        cache = mackinac.workspace._metadata_cache(None)
+        cache.put(model_reference, ('aio-model', 'folder'))
+        stats = event_loop.run_until_complete(aio.reconstruct_modelseed_model(b_theta_genome_id,
+                                                                              model_id='aio-model'))
+        assert stats['id'] == 'aio-model'
+        assert stats['name'] == b_theta_name
+        assert stats['num_reactions'] == 200
+        assert cache.get(model_reference)[1] == 'modelfolder'  # Cached metadata was replaced after the job
+        assert event_loop.run_until_complete(aio.get_modelseed_model_stats('aio-model'))['id'] == 'aio-model'
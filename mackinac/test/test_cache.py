@@ -0,0 +1,98 @@
+from os import listdir, urandom
+from time import sleep
+
+from mackinac.cache import ObjectCache, MetadataCache
+
+
+class TestObjectCache:
+
+    def test_get_put(self, tmpdir):
+        cache = ObjectCache(str(tmpdir))
+        assert cache.get('ABCD-1234', '2017-05-01T10:00:00') is None
+        cache.put('ABCD-1234', '2017-05-01T10:00:00', b'{"id": "model"}')
+        assert cache.get('ABCD-1234', '2017-05-01T10:00:00') == b'{"id": "model"}'
+        assert cache.get('ABCD-1234', '2017-05-02T10:00:00') is None
+
+    def test_new_version_replaces_old(self, tmpdir):
+        cache = ObjectCache(str(tmpdir))
+        cache.put('ABCD-1234', '2017-05-01T10:00:00', b'old')
+        cache.put('ABCD-1234', '2017-05-02T10:00:00', b'new')
+        assert cache.get('ABCD-1234', '2017-05-01T10:00:00') is None
+        assert cache.get('ABCD-1234', '2017-05-02T10:00:00') == b'new'
+        assert len(listdir(str(tmpdir))) == 1
+
+    def test_evict_least_recently_used(self, tmpdir):
+        cache = ObjectCache(str(tmpdir), max_size=2000, compress_level=9)
+        data = [urandom(900) for index in range(3)]
+        cache.put('UUID-1', 'T', data[0])
+        cache.put('UUID-2', 'T', data[1])
+        cache.put('UUID-3', 'T', data[2])
+        assert cache.size <= 2000
+        assert cache.get('UUID-1', 'T') is None
+        assert cache.get('UUID-3', 'T') == data[2]
+
+    def test_reopen_keeps_size_and_order(self, tmpdir):
+        cache = ObjectCache(str(tmpdir), max_size=2000, compress_level=9)
+        data = [urandom(900) for index in range(3)]
+        cache.put('UUID-1', 'T', data[0])
+        sleep(0.01)
+        cache.put('UUID-2', 'T', data[1])
+        size = cache.size
+        cache = ObjectCache(str(tmpdir), max_size=2000, compress_level=9)
+        assert cache.size == size
+        cache.put('UUID-3', 'T', data[2])
+        assert cache.get('UUID-1', 'T') is None
+        assert cache.get('UUID-2', 'T') == data[1]
+
+    def test_clear(self, tmpdir):
+        cache = ObjectCache(str(tmpdir))
+        cache.put('ABCD-1234', '2017-05-01T10:00:00', b'data')
+        cache.clear()
+        assert cache.size == 0
+
+
+class TestMetadataCache:
+
+    def test_expire(self):
+        cache = MetadataCache(ttl=0.05)
+        cache.put('/mackinac/modelseed/model', ['model', 'modelfolder'])
+        assert cache.get('/mackinac/modelseed/model/') == ['model', 'modelfolder']
+        sleep(0.1)
+        assert cache.get('/mackinac/modelseed/model') is None
+
+    def test_invalidate_folder(self):
+        cache = MetadataCache()
+        cache.put('/mackinac/modelseed', ['modelseed', 'folder'])
+        cache.put('/mackinac/modelseed/model', ['model', 'modelfolder'])
+        cache.put('/mackinac/modelseed2', ['modelseed2', 'folder'])
+        cache.invalidate('/mackinac/modelseed')
+        assert cache.get('/mackinac/modelseed') is None
+        assert cache.get('/mackinac/modelseed/model') is None
+        assert cache.get('/mackinac/modelseed2') is not None
+
+    def test_max_entries(self):
+        cache = MetadataCache(max_entries=2)
+        for index in range(3):
+            cache.put('/mackinac/object{0}'.format(index), ['object{0}'.format(index)])
+        assert cache.get('/mackinac/object0') is None
+        assert cache.get('/mackinac/object2') is not None
+
+    def test_put_after_invalidate(self):
+        cache = MetadataCache()
+        generation = cache.generation()
+        cache.invalidate('/mackinac/modelseed/model')
+        assert not cache.put('/mackinac/modelseed/model', ['model', 'modelfolder'], generation)
+        assert cache.get('/mackinac/modelseed/model') is None
+        assert cache.put('/mackinac/modelseed2', ['modelseed2', 'folder'], generation)
+        assert cache.put('/mackinac/modelseed/model', ['model', 'modelfolder'], cache.generation())
+
+    def test_put_after_invalidate_folder(self):
+        cache = MetadataCache(max_entries=2)
+        generation = cache.generation()
+        cache.invalidate('/mackinac/modelseed/')
+        assert not cache.put('/mackinac/modelseed/model', ['model', 'modelfolder'], generation)
+        for index in range(3):  # Forget the oldest invalidation
+            cache.invalidate('/mackinac/object{0}'.format(index))
+        assert not cache.put('/mackinac/other', ['other', 'folder'], generation)
+        cache.clear()
+        assert not cache.put('/mackinac/other', ['other', 'folder'], generation)
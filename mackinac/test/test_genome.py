@@ -41,3 +41,38 @@ class TestGenomeBacteroidesThetaiotaomicron:
     def test_get_features_bad_annotation(self, b_theta_genome_id):
         with pytest.raises(ValueError):
             mackinac.get_genome_features(b_theta_genome_id, annotation='foobar')
+
+
+class TestGenomeMockServer:
+
+    def test_iter_features(self, mock_server, b_theta_genome_id):
+        count = mock_server.request_counts['PATRIC']
+        features = mackinac.iter_genome_features(b_theta_genome_id, page_size=20)
+        first = next(features)
+        assert first['annotation'] == 'PATRIC'
+        assert mock_server.request_counts['PATRIC'] <= count + 2  # First page and next page
+        ids = [first['feature_id']] + [feature['feature_id'] for feature in features]
+        assert len(ids) == 50
+        assert len(set(ids)) == 50
+        features = mackinac.get_genome_features(b_theta_genome_id)
+        assert sorted(ids) == sorted([feature['feature_id'] for feature in features])
+        with pytest.raises(ValueError):
+            next(mackinac.iter_genome_features('900.900'))
+
+    def test_iter_features_no_annotation(self, mock_server):
+        mock_server.add_genome('900.901', num_features=5, annotations=('PATRIC',))
+        assert len(mackinac.get_genome_features('900.901')) == 5
+        assert mackinac.get_genome_features('900.901', annotation='RefSeq') == []
+        with pytest.raises(ValueError):
+            mackinac.get_genome_features('900.900', annotation='RefSeq')
+
+    def test_iter_features_bad_annotation(self, mock_server, b_theta_genome_id):
+        with pytest.raises(ValueError):
+            mackinac.iter_genome_features(b_theta_genome_id, annotation='GenBank')
+
+    def test_get_features_fields(self, mock_server, b_theta_genome_id):
+        features = mackinac.get_genome_features(b_theta_genome_id, annotation='RefSeq',
+                                                fields=['feature_id', 'aa_sequence'])
+        assert len(features) == 50
+        assert sorted(features[0]) == ['aa_sequence', 'feature_id']
+        assert features[0]['feature_id'].startswith('RefSeq.')
@@ -0,0 +1,85 @@
+import json
+import pytest
+from time import time
+
+from mackinac.lazy import LazyObject, select_fields
+
+genome = {
+    'id': '226186.12',
+    'scientific_name': 'Bacteroides thetaiotaomicron VPI-5482',
+    'features': [
+        {'id': 'fig|226186.12.peg.1', 'protein_translation': 'MAC', 'location': [['NC_004663', 1, '+', 30]],
+         'function': 'Role with "quotes" and \\ backslash {}[],:'},
+        {'id': 'fig|226186.12.peg.2', 'protein_translation': 'MDE', 'location': [], 'quality': None}
+    ],
+    'num_contigs': 2,
+    'gc_content': 0.43,
+    'complete': True,
+    'empty': {}
+}
+
+
+class TestLazyObject:
+
+    def test_get(self):
+        text = json.dumps(genome, indent=2)
+        obj = LazyObject(text)
+        assert sorted(obj) == sorted(genome)
+        assert len(obj) == len(genome)
+        assert obj['num_contigs'] == 2
+        assert obj['gc_content'] == 0.43
+        assert obj['complete'] is True
+        assert obj['features'] == genome['features']
+        assert obj['empty'] == {}
+        assert 'missing' not in obj
+        with pytest.raises(KeyError):
+            obj['missing']
+
+    def test_not_object(self):
+        with pytest.raises(ValueError):
+            LazyObject('[1, 2]')
+
+    def test_unterminated(self):
+        start = time()
+        obj = LazyObject('{"a": [' + '1 ' * 30)
+        with pytest.raises(ValueError):
+            len(obj)
+        assert time() - start < 1.0
+
+
+class TestSelectFields:
+
+    def test_select(self):
+        output = select_fields(json.dumps(genome), ['features.id', 'features.protein_translation', 'id'])
+        assert output == {
+            'id': '226186.12',
+            'features': [{'id': feature['id'], 'protein_translation': feature['protein_translation']}
+                         for feature in genome['features']]
+        }
+
+    def test_select_whole_value(self):
+        output = select_fields(json.dumps(genome).encode('utf-8'), ['features', 'features.id', 'num_contigs'])
+        assert output == {'features': genome['features'], 'num_contigs': 2}
+
+    def test_select_escaped_strings(self):
+        data = {'a': ['\\', '\\"]', {'b': '"}\\'}], 'b': {'c': '\\\\', 'd': 1}, 'c': 'x'}
+        assert select_fields(json.dumps(data), ['b.d', 'c']) == {'b': {'d': 1}, 'c': 'x'}
+        assert LazyObject(json.dumps(data))['c'] == 'x'
+
+    def test_select_peak_memory(self):
+        tracemalloc = pytest.importorskip('tracemalloc')
+        features = [{'id': 'fig|226186.12.peg.{0}'.format(index), 'protein_translation': 'M' * 300,
+                     'location': [['NC_004663', index, '+', 900]], 'ontology_terms': {'SSO': {'SSO:1': {}}}}
+                    for index in range(1000)]
+        text = json.dumps({'id': '226186.12', 'features': features})
+        peaks = list()
+        for func in [lambda: json.loads(text), lambda: select_fields(text, ['features.id'])]:
+            tracemalloc.start()
+            func()
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        assert peaks[1] * 4 < peaks[0]  # Only the selected values are decoded
+
+    def test_select_skip_unterminated(self):
+        with pytest.raises(ValueError):
+            select_fields('{"a": [' + '"x", ' * 30 + '{"b": [1, ', ['id'])
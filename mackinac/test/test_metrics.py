@@ -0,0 +1,46 @@
+import pytest
+
+from mackinac.metrics import MetricsRegistry
+
+
+@pytest.fixture(scope='function')
+def registry():
+    return MetricsRegistry(latency_buckets=(0.1, 1.0, float('inf')))
+
+
+class TestMetrics:
+
+    def test_record(self, registry):
+        registry.record('Workspace', 'get', 0.05, request_bytes=100, response_bytes=2000)
+        registry.record('Workspace', 'get', 0.5, request_bytes=100, response_bytes=3000, error=ValueError('bad'),
+                        retry=True)
+        data = registry.snapshot()
+        assert data['Workspace']['get']['calls'] == 2
+        assert data['Workspace']['get']['retries'] == 1
+        assert data['Workspace']['get']['errors'] == 1
+        assert data['Workspace']['get']['error_types'] == {'ValueError': 1}
+        assert data['Workspace']['get']['request_bytes'] == 200
+        assert data['Workspace']['get']['response_bytes'] == 5000
+        assert data['Workspace']['get']['latency']['max'] == 0.5
+        assert data['Workspace']['get']['latency']['buckets'] == [(0.1, 1), (1.0, 2), (float('inf'), 2)]
+
+    def test_measure_error(self, registry):
+        with pytest.raises(KeyError):
+            with registry.measure('ProbModelSEED', 'get_model') as measurement:
+                measurement.request_bytes = 10
+                raise KeyError('model')
+        data = registry.snapshot()
+        assert data['ProbModelSEED']['get_model']['errors'] == 1
+        assert data['ProbModelSEED']['get_model']['request_bytes'] == 10
+
+    def test_prometheus_text(self, registry):
+        registry.record('Workspace', 'ls', 0.2, request_bytes=50, response_bytes=500)
+        text = registry.prometheus_text()
+        assert 'mackinac_requests_total{service="Workspace",method="ls"} 1' in text
+        assert 'mackinac_request_duration_seconds_bucket{service="Workspace",method="ls",le="1.0"} 1' in text
+        assert 'mackinac_request_duration_seconds_bucket{service="Workspace",method="ls",le="+Inf"} 1' in text
+
+    def test_reset(self, registry):
+        registry.record('Workspace', 'ls', 0.2)
+        registry.reset()
+        assert registry.snapshot() == dict()
@@ -0,0 +1,97 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import mackinac
+
+
+class TestMockServer:
+
+    def test_reconstruct(self, mock_model, b_theta_id, b_theta_name):
+        assert mock_model['id'] == b_theta_id
+        assert mock_model['name'] == b_theta_name
+        assert mock_model['num_reactions'] == 200
+        assert mock_model['num_genes'] > 0
+
+    def test_get_model_data(self, mock_model, b_theta_id):
+        data = mackinac.get_modelseed_model_data(b_theta_id)
+        assert data['id'] == b_theta_id
+        assert len(data['modelreactions']) == 200
+
+    def test_list_models(self, mock_model, b_theta_id):
+        output = mackinac.list_modelseed_models()
+        assert b_theta_id in [model['id'] for model in output]
+
+    def test_list_objects(self, mock_model):
+        output = mackinac.list_workspace_objects(mock_model['ref'], sort_key='name')
+        assert len(output) == 2
+        assert output[0][0] == 'genome'
+        assert len(output[0]) == 12
+        assert output[0].name == 'genome'
+        assert output[0].reference == '{0}/genome'.format(mock_model['ref'])
+        assert output[0].created.year >= 2017
+        assert not output[0].is_folder
+        assert [item.name for item in output.sorted_by('name', reverse=True)] == ['model', 'genome']
+        assert [item.name for item in output.with_type('model')] == ['model']
+
+    def test_list_objects_no_exist_folder(self, mock_server):
+        assert mackinac.list_workspace_objects('/mackinac@patricbrc.org/modelseed/badref') is None
+
+    def test_put_get_delete(self, mock_server):
+        reference = '/mackinac@patricbrc.org/test/emergency'
+        output = mackinac.put_workspace_object(reference, 'string', data={'message': 'test'})
+        assert output[0] == 'emergency'
+        assert mackinac.get_workspace_object_data(reference) == {'message': 'test'}
+        assert mackinac.get_workspace_object_meta(reference)[1] == 'string'
+        assert mackinac.delete_workspace_object(reference)[0] == 'emergency'
+        with pytest.raises(mackinac.SeedClient.ObjectNotFoundError):
+            mackinac.get_workspace_object_meta(reference)
+
+    def test_get_features(self, mock_server, b_theta_genome_id):
+        features = mackinac.get_genome_features(b_theta_genome_id)
+        assert len(features) == 50
+        assert features[0]['patric_id'].startswith('fig|{0}'.format(b_theta_genome_id))
+        features = mackinac.get_genome_features(b_theta_genome_id, annotation='RefSeq')
+        assert len(features) == 50
+
+    def test_get_summary_bad_id(self, mock_server):
+        with pytest.raises(ValueError):
+            mackinac.get_genome_summary('900.900')
+
+    def test_injected_failure_is_retried(self, mock_server, mock_model):
+        mackinac.list_workspace_objects('/mackinac@patricbrc.org/modelseed')
+        before = mackinac.metrics.snapshot()['Workspace']['ls']
+        mock_server.fail_next(1, status=503)
+        count = mock_server.request_counts['Workspace']
+        assert mackinac.list_workspace_objects('/mackinac@patricbrc.org/modelseed') is not None
+        assert mock_server.request_counts['Workspace'] == count + 2
+        after = mackinac.metrics.snapshot()['Workspace']['ls']
+        assert after['calls'] == before['calls'] + 2  # Each attempt is measured
+        assert after['retries'] == before['retries'] + 1
+        assert after['errors'] == before['errors'] + 1
+
+    def test_partial_read_keeps_connection(self, mock_server):
+        session = requests.Session()
+        ports = set()
+        for index in range(3):
+            response = session.get(mock_server.patric_url + 'genome_feature/?q=genome_id:226186.12&rows=100',
+                                   stream=True)
+            ports.add(response.raw.connection.sock.getsockname()[1])
+            response.raw.read(1)
+            mackinac.SeedClient.release_response(response)
+            response.close()
+        assert len(ports) == 1
+
+    def test_coalesce_identical_reads(self, mock_server, mock_model):
+        reference = '{0}/model'.format(mock_model['ref'])
+        mock_server.latency = 0.2
+        try:
+            count = mock_server.request_counts['Workspace']
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                output = list(executor.map(mackinac.get_workspace_object_data, [reference] * 4))
+        finally:
+            mock_server.latency = 0.0
+        assert mock_server.request_counts['Workspace'] == count + 1
+        assert all(data == output[0] for data in output)
+        assert len(set([id(data) for data in output])) == 4  # Each caller gets its own copy
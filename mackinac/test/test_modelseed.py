@@ -1,4 +1,5 @@
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 
 import mackinac
 
@@ -89,3 +90,23 @@ class TestModelseedBacteroidesThetaiotaomicron:
 
     def test_delete_model(self, b_theta_id):
         mackinac.delete_modelseed_model(b_theta_id)
+
+
+class TestModelseedMockServer:
+
+    def test_client_context(self, mock_server, mock_model, b_theta_id):
+        context = mackinac.SeedClient.ClientContext(token='un=other@patricbrc.org|tokenid=mock|sig=mock',
+                                                    workspace_url=mock_server.workspace_url,
+                                                    modelseed_url=mock_server.modelseed_url)
+        references = ['/other@patricbrc.org/test/object{0}'.format(index) for index in range(4)]
+
+        def put_get(reference):
+            mackinac.put_workspace_object(reference, 'string', data={'name': reference}, context=context)
+            return mackinac.get_workspace_object_data(reference, context=context)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            output = list(executor.map(put_get, references))
+        assert [data['name'] for data in output] == references
+        with pytest.raises(mackinac.SeedClient.ObjectNotFoundError):
+            mackinac.get_modelseed_model_stats(b_theta_id, context=context)
+        assert mackinac.get_modelseed_model_stats(b_theta_id)['id'] == b_theta_id
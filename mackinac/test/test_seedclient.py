@@ -0,0 +1,210 @@
+import pytest
+import threading
+from time import time, sleep
+
+import requests
+
+from mackinac.SeedClient import RetryPolicy, CircuitBreaker, CircuitOpenError, TokenProvider, AuthenticationError, \
+    parse_token_expiry, RateLimiter, set_rate_limit, get_rate_limiter, SeedClient, SingleFlight
+
+
+class TestRetryPolicy:
+
+    def test_can_retry(self):
+        policy = RetryPolicy(max_attempts=3)
+        assert policy.can_retry('get', 1)
+        assert policy.can_retry('get', 2)
+        assert not policy.can_retry('get', 3)
+        assert not policy.can_retry('create', 1)
+
+    def test_can_retry_all_methods(self):
+        policy = RetryPolicy(methods=None)
+        assert policy.can_retry('create', 1)
+
+    def test_backoff(self):
+        policy = RetryPolicy(backoff_factor=2.0, max_backoff=5.0, jitter=False)
+        assert policy.backoff(1) == 2.0
+        assert policy.backoff(2) == 4.0
+        assert policy.backoff(3) == 5.0
+        assert policy.backoff(1, retry_after='3') == 3.0
+
+    def test_bad_max_attempts(self):
+        with pytest.raises(ValueError):
+            RetryPolicy(max_attempts=0)
+
+
+class TestCircuitBreaker:
+
+    def test_open_after_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60.0)
+        breaker.record_failure()
+        breaker.before_call('Workspace')
+        breaker.record_failure()
+        assert breaker.state == 'open'
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call('Workspace')
+
+    def test_trial_call(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+        breaker.record_failure()
+        assert breaker.state == 'half-open'
+        breaker.before_call('Workspace')
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call('Workspace')
+        breaker.record_success()
+        assert breaker.state == 'closed'
+
+    def test_trial_call_unexpected_error(self):
+        class RedirectSession(object):
+            def post(self, *args, **kwargs):
+                raise requests.exceptions.TooManyRedirects('Exceeded 30 redirects.')
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+        breaker.record_failure()
+        client = SeedClient('http://localhost/', 'Workspace', token='un=mackinac|sig=abcd', session=RedirectSession(),
+                            circuit_breaker=breaker)
+        with pytest.raises(requests.exceptions.TooManyRedirects):
+            client._post('get', b'{}', 10, client.headers)
+        breaker.before_call('Workspace')  # Trial call is allowed again
+
+
+class TestTokenProvider:
+
+    def write_config(self, config_file, token):
+        with open(config_file, 'w') as handle:
+            handle.write('[authentication]\ntoken = {0}\nuser_id = mackinac\n'.format(token))
+
+    def test_parse_expiry(self):
+        assert parse_token_expiry('un=mackinac@patricbrc.org|tokenid=1234|expiry=1500000000|sig=abcd') == 1500000000
+        assert parse_token_expiry('un=mackinac|sig=abcd') is None
+
+    def test_cached_token(self, tmpdir):
+        config_file = str(tmpdir.join('patric_config'))
+        token = 'un=mackinac|expiry={0}|sig=abcd'.format(int(time()) + 86400)
+        self.write_config(config_file, token)
+        provider = TokenProvider(config_file=config_file)
+        assert provider.get() == (token, 'mackinac')
+        self.write_config(config_file, 'un=mackinac|sig=other')
+        assert provider.get() == (token, 'mackinac')
+
+    def test_refresh_ahead_of_expiry(self, tmpdir):
+        config_file = str(tmpdir.join('patric_config'))
+        old_token = 'un=mackinac|expiry={0}|sig=abcd'.format(int(time()) + 60)
+        new_token = 'un=mackinac|expiry={0}|sig=abcd'.format(int(time()) + 86400)
+        self.write_config(config_file, old_token)
+        provider = TokenProvider(config_file=config_file, refresh_margin=3600,
+                                 refresh=lambda: self.write_config(config_file, new_token))
+        assert provider.get() == (new_token, 'mackinac')
+
+    def test_reload_interval(self, tmpdir):
+        config_file = str(tmpdir.join('patric_config'))
+        old_token = 'un=mackinac|expiry={0}|sig=abcd'.format(int(time()) + 600)
+        new_token = 'un=mackinac|expiry={0}|sig=abcd'.format(int(time()) + 86400)
+        self.write_config(config_file, old_token)
+        provider = TokenProvider(config_file=config_file, refresh_margin=3600, reload_interval=3600)
+        assert provider.get() == (old_token, 'mackinac')
+        self.write_config(config_file, new_token)
+        assert provider.get() == (old_token, 'mackinac')
+        provider.reload_interval = 0
+        assert provider.get() == (new_token, 'mackinac')
+
+    def test_expired_token(self, tmpdir):
+        config_file = str(tmpdir.join('patric_config'))
+        self.write_config(config_file, 'un=mackinac|expiry={0}|sig=abcd'.format(int(time()) - 60))
+        provider = TokenProvider(config_file=config_file)
+        with pytest.raises(AuthenticationError):
+            provider.get()
+
+    def test_no_token(self, tmpdir):
+        provider = TokenProvider(config_file=str(tmpdir.join('patric_config')))
+        with pytest.raises(AuthenticationError):
+            provider.get()
+
+
+class TestRateLimiter:
+
+    def test_throttle(self):
+        limiter = RateLimiter(rate=50.0, burst=1)
+        start = time()
+        for index in range(6):
+            limiter.throttle()
+        assert time() - start >= 0.09
+
+    def test_max_in_flight(self):
+        limiter = RateLimiter(max_in_flight=2)
+        in_flight = [0]
+        peak = [0]
+        lock = threading.Lock()
+
+        def run():
+            with limiter:
+                with lock:
+                    in_flight[0] += 1
+                    peak[0] = max(peak[0], in_flight[0])
+                sleep(0.02)
+                with lock:
+                    in_flight[0] -= 1
+
+        threads = [threading.Thread(target=run) for index in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak[0] == 2
+
+    def test_set_rate_limit(self):
+        set_rate_limit('Workspace', max_in_flight=4)
+        assert get_rate_limiter('Workspace').max_in_flight == 4
+        set_rate_limit('Workspace')
+        assert get_rate_limiter('Workspace').max_in_flight is None
+
+
+class TestSingleFlight:
+
+    def test_shared_result(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        calls = list()
+
+        def slow_call():
+            calls.append(1)
+            started.set()
+            sleep(0.2)
+            return b'{"result": [1]}'
+
+        output = list()
+
+        def read():
+            output.append(flight.do('key', slow_call))
+
+        leader = threading.Thread(target=read)
+        leader.start()
+        started.wait()
+        waiters = [threading.Thread(target=read) for index in range(3)]
+        for thread in waiters:
+            thread.start()
+        for thread in [leader] + waiters:
+            thread.join()
+        assert len(calls) == 1
+        assert output == [b'{"result": [1]}'] * 4
+
+    def test_forget(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = list()
+
+        def slow_call():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return len(calls)
+
+        leader = threading.Thread(target=flight.do, args=(('get', b'"/mackinac/test/object"'), slow_call))
+        leader.start()
+        started.wait()
+        flight.forget(lambda key: b'/mackinac/test' in key[1])
+        release.set()
+        assert flight.do(('get', b'"/mackinac/test/object"'), slow_call) == 2  # Did not join the first call
+        leader.join()
+        assert len(calls) == 2
@@ -0,0 +1,48 @@
+import pytest
+
+import mackinac
+from mackinac import serializer
+
+
+@pytest.fixture
+def orjson_backend():
+    pytest.importorskip('orjson')
+    original = serializer.get_json_backend()
+    serializer.set_json_backend('orjson')
+    yield
+    serializer.set_json_backend(original)
+
+
+class TestSerializer:
+
+    def test_default_backend(self):
+        assert serializer.get_json_backend() == 'json'
+
+    def test_round_trip(self):
+        data = {'id': 'rxn00001_c0', 'probability': 0.5, 'reagents': [1, -1], 'name': u'\u03b1-D-glucose'}
+        assert serializer.loads(serializer.dumps(data)) == data
+
+    def test_bad_backend(self):
+        with pytest.raises(ValueError):
+            serializer.set_json_backend('simplejson')
+
+    def test_orjson_non_str_keys(self, orjson_backend):
+        assert serializer.loads(serializer.dumps({1: 'a'})) == {'1': 'a'}
+
+    def test_orjson_big_integer(self, orjson_backend):
+        assert serializer.loads(serializer.dumps({'size': 2 ** 70})) == {'size': 2 ** 70}
+
+    def test_client_uses_backend(self, orjson_backend, mock_server, monkeypatch):
+        calls = list()
+        orjson_loads = serializer._loads
+
+        def counting_loads(data):
+            calls.append(len(data))
+            return orjson_loads(data)
+
+        monkeypatch.setattr(serializer, '_loads', counting_loads)
+        mackinac.put_workspace_object('/mackinac@patricbrc.org/test/backend', 'string', data={'a': 1}, overwrite=True)
+        assert len(calls) > 0
+        del calls[:]
+        assert mackinac.workspace.ws_client.call('get', {'objects': ['/mackinac@patricbrc.org/test/backend']})
+        assert len(calls) == 2  # Request decoded by the stand-in server and response decoded by the client
@@ -1,4 +1,6 @@
 import pytest
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
 
 import mackinac
 
@@ -121,3 +123,244 @@ class TestWorkspace:
     def test_delete_object_bad_ref(self, bad_reference):
         with pytest.raises(mackinac.SeedClient.ObjectNotFoundError):
             mackinac.delete_workspace_object(bad_reference)
+
+
+class TestWorkspaceMockServer:
+
+    def test_call_many_meta(self, mock_server, mock_model):
+        references = [mock_model['ref'], '{0}/model'.format(mock_model['ref']),
+                      '/mackinac@patricbrc.org/modelseed/badref']
+        params_list = [{'objects': [ref], 'metadata_only': 1} for ref in references]
+        output = mackinac.workspace.ws_client.call_many('get', params_list, references=[[ref] for ref in references],
+                                                        return_exceptions=True)
+        assert len(output) == 3
+        assert output[0][0][0][1] == 'modelfolder'
+        assert output[1][0][0][1] == 'model'
+        assert isinstance(output[2], mackinac.SeedClient.ObjectNotFoundError)
+
+    def test_download_shock_object(self, mock_server, tmpdir):
+        reference = '/mackinac@patricbrc.org/test/proteins.fasta'
+        data = ''.join(['>protein{0}\nMACDEFGHIKLMNPQRSTVWY\n'.format(index) for index in range(5000)]).encode('ascii')
+        mock_server.add_shock_object(reference, 'contigs', data)
+        path = str(tmpdir.join('proteins.fasta'))
+        mock_server.shock_drop_after = 10000
+        count = mock_server.request_counts['Shock']
+        assert mackinac.download_workspace_object(reference, path) == len(data)
+        assert mock_server.request_counts['Shock'] == count + 3  # Node metadata, dropped download, resume
+        with open(path, 'rb') as handle:
+            assert handle.read() == data
+
+    def test_download_inline_object(self, mock_server, tmpdir):
+        reference = '/mackinac@patricbrc.org/test/roles.tsv'
+        mackinac.put_workspace_object(reference, 'string', data='fig|1.peg.1\trole1\n')
+        path = str(tmpdir.join('roles.tsv'))
+        mackinac.download_workspace_object(reference, path)
+        with open(path) as handle:
+            assert handle.read() == 'fig|1.peg.1\trole1\n'
+
+    def test_put_shock_object(self, mock_server):
+        reference = '/mackinac@patricbrc.org/test/large'
+        data = {'reactions': ['rxn{0:05d}'.format(index) for index in range(1000)]}
+        metadata = mackinac.put_workspace_object(reference, 'string', data=data, shock=True)
+        assert len(metadata[11]) > 0
+        assert mackinac.get_workspace_object_data(reference) == data
+
+    def test_change_stops_sharing_read(self, mock_server, mock_model):
+        reference = '{0}/model'.format(mock_model['ref'])
+        count = mock_server.request_counts['Workspace']
+        mock_server.latency = 0.3
+        try:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                future = executor.submit(mackinac.get_workspace_object_data, reference)
+                sleep(0.1)
+                mackinac.workspace._forget_reads([mock_model['ref']])  # A change to the model folder starts
+                data = mackinac.get_workspace_object_data(reference)
+                assert future.result() == data
+        finally:
+            mock_server.latency = 0.0
+        assert mock_server.request_counts['Workspace'] == count + 2
+
+    def test_get_shock_object_incremental(self, mock_server, monkeypatch):
+        reference = '/mackinac@patricbrc.org/test/incremental'
+        data = {'reactions': [{'id': 'rxn{0:05d}'.format(index), 'probability': 0.5} for index in range(1000)]}
+        mackinac.put_workspace_object(reference, 'string', data=data, shock=True)
+        monkeypatch.setattr(mackinac.workspace, 'incremental_json', True)
+        assert mackinac.get_workspace_object_data(reference) == data
+
+    def test_put_shock_object_threshold(self, mock_server, monkeypatch):
+        monkeypatch.setattr(mackinac.workspace, 'shock_threshold', 100)
+        metadata = mackinac.put_workspace_object('/mackinac@patricbrc.org/test/small', 'string', data='x' * 100)
+        assert metadata[11] == ''
+        metadata = mackinac.put_workspace_object('/mackinac@patricbrc.org/test/big', 'string', data='x' * 101)
+        assert len(metadata[11]) > 0
+        assert mackinac.get_workspace_object_data('/mackinac@patricbrc.org/test/big', json_data=False) == 'x' * 101
+
+    def test_put_inline_encodes_once(self, mock_server, monkeypatch):
+        calls = list()
+
+        def counting_dumps(data):
+            calls.append(data)
+            return mackinac.serializer.dumps(data)
+
+        monkeypatch.setattr(mackinac.workspace, 'dumps', counting_dumps)
+        reference = '/mackinac@patricbrc.org/test/encoded'
+        mackinac.put_workspace_object(reference, 'string', data={'message': 'test'}, overwrite=True)
+        mackinac.put_workspace_objects([(reference, 'string', {'message': 'again'})], overwrite=True)
+        assert len([data for data in calls if isinstance(data, dict)]) == 2  # Object data is encoded once per put
+        assert mackinac.get_workspace_object_data(reference) == {'message': 'again'}
+
+    def test_put_inline_bytes(self, mock_server):
+        reference = '/mackinac@patricbrc.org/test/inline_bytes'
+        metadata = mackinac.put_workspace_object(reference, 'string', data=b'{"message": "bytes"}', shock=False)
+        assert metadata[11] == ''
+        assert mackinac.get_workspace_object_data(reference) == {'message': 'bytes'}
+        mackinac.put_workspace_object(reference, 'string', data={'message': 'dict'}, shock=False, overwrite=True)
+        assert mackinac.get_workspace_object_data(reference) == {'message': 'dict'}
+
+    def test_upload_file(self, mock_server, tmpdir):
+        reference = '/mackinac@patricbrc.org/test/upload.fasta'
+        source = tmpdir.join('upload.fasta')
+        source.write('>protein1\nMACDEFGHIK\n' * 1000)
+        mackinac.upload_workspace_object(reference, 'contigs', str(source))
+        assert mackinac.get_workspace_object_meta(reference)[6] == len(source.read())
+        path = str(tmpdir.join('download.fasta'))
+        mackinac.download_workspace_object(reference, path)
+        assert open(path).read() == source.read()
+
+    def test_object_cache(self, mock_server, mock_model, tmpdir):
+        reference = '{0}/model'.format(mock_model['ref'])
+        mackinac.set_object_cache(str(tmpdir))
+        try:
+            data = mackinac.get_workspace_object_data(reference)
+            count = mock_server.request_counts['Workspace']
+            assert mackinac.get_workspace_object_data(reference) == data
+            assert mock_server.request_counts['Workspace'] == count + 1  # Only the metadata
+        finally:
+            mackinac.set_object_cache(None)
+
+    def test_metadata_cache(self, mock_server):
+        reference = '/mackinac@patricbrc.org/test/cached'
+        mackinac.put_workspace_object(reference, 'string', data='first')
+        metadata = mackinac.get_workspace_object_meta(reference)
+        count = mock_server.request_counts['Workspace']
+        assert mackinac.get_workspace_object_meta(reference, cached=True) == metadata
+        assert mock_server.request_counts['Workspace'] == count
+        mackinac.put_workspace_object(reference, 'string', data='second', overwrite=True)
+        assert mackinac.get_workspace_object_meta(reference, cached=True)[6] == len('second')
+        mackinac.delete_workspace_object(reference)
+        with pytest.raises(mackinac.SeedClient.ObjectNotFoundError):
+            mackinac.get_workspace_object_meta(reference, cached=True)
+
+    def test_metadata_cache_change_during_lookup(self, mock_server, monkeypatch):
+        reference = '/mackinac@patricbrc.org/test/race'
+        mackinac.put_workspace_object(reference, 'string', data='first', overwrite=True)
+        client = mackinac.workspace.ws_client
+        call = client.call
+        changed = list()
+
+        def change_during_call(method, params, **kwargs):
+            output = call(method, params, **kwargs)
+            if method == 'get' and len(changed) == 0:
+                # The object changes after the server returned the old metadata.
+                changed.append(mackinac.put_workspace_object(reference, 'string', data='second data',
+                                                             overwrite=True))
+            return output
+
+        monkeypatch.setattr(client, 'call', change_during_call)
+        assert mackinac.get_workspace_object_meta(reference)[6] == len('first')
+        monkeypatch.undo()
+        assert mackinac.get_workspace_object_meta(reference, cached=True)[6] == len('second data')
+
+    def test_bulk_objects(self, mock_server, monkeypatch):
+        monkeypatch.setattr(mackinac.workspace, 'bulk_max_objects', 3)
+        monkeypatch.setattr(mackinac.workspace, 'shock_threshold', 1000)
+        references = ['/mackinac@patricbrc.org/bulk/object{0}'.format(index) for index in range(8)]
+        objects = [(reference, 'string', {'index': index, 'padding': 'x' * (2000 if index % 3 == 0 else 10)})
+                   for index, reference in enumerate(references)]
+        count = mock_server.request_counts['Workspace']
+        output = mackinac.put_workspace_objects(objects)
+        assert [metadata[0] for metadata in output] == ['object{0}'.format(index) for index in range(8)]
+        assert [len(metadata[11]) > 0 for metadata in output] == [index % 3 == 0 for index in range(8)]
+        assert mock_server.request_counts['Workspace'] == count + 3  # Two inline chunks and one Shock chunk
+        assert [data['index'] for data in mackinac.get_workspace_objects_data(references)] == list(range(8))
+        assert [metadata[0] for metadata in mackinac.get_workspace_objects_meta(references)] == \
+            [metadata[0] for metadata in output]
+        assert len(mackinac.delete_workspace_objects(references)) == 8
+        with pytest.raises(mackinac.SeedClient.ObjectNotFoundError):
+            mackinac.get_workspace_objects_meta(references[:2])
+
+    def test_sync_workspace_folder(self, mock_server, tmpdir):
+        folder = '/mackinac@patricbrc.org/mirror'
+        mackinac.put_workspace_object(folder + '/one', 'string', data='one')
+        mackinac.put_workspace_object(folder + '/sub/two', 'string', data='two')
+        mock_server.add_shock_object(folder + '/sub/three', 'contigs', b'three')
+        directory = str(tmpdir.join('mirror'))
+        output = mackinac.sync_workspace_folder(folder, directory)
+        assert output['downloaded'] == ['one', 'sub/three', 'sub/two']
+        assert tmpdir.join('mirror', 'sub', 'three').read() == 'three'
+
+        mackinac.put_workspace_object(folder + '/one', 'string', data='changed', overwrite=True)
+        mackinac.delete_workspace_object(folder + '/sub/two')
+        output = mackinac.sync_workspace_folder(folder, directory)
+        assert output == {'downloaded': ['one'], 'deleted': ['sub/two'], 'unchanged': ['sub/three']}
+        assert tmpdir.join('mirror', 'one').read() == 'changed'
+        assert not tmpdir.join('mirror', 'sub', 'two').exists()
+
+    def test_metadata_index(self, mock_server):
+        folder = '/mackinac@patricbrc.org/indexed'
+        mackinac.put_workspace_object(folder + '/model1', 'model', data='1', metadata={'genome': '226186.12'})
+        mackinac.put_workspace_object(folder + '/sub/model2', 'model', data='22')
+        mackinac.put_workspace_object(folder + '/sub/notes', 'string', data='333')
+        index = mackinac.MetadataIndex()
+        mackinac.list_workspace_objects(folder, index=index)
+        assert len(index) == 4
+        assert [item.name for item in index.query(object_type='model')] == ['model1', 'model2']
+        assert [item.name for item in index.query(user_metadata={'genome': '226186.12'})] == ['model1']
+        assert [item.name for item in index.query(min_size=2, folder=folder + '/sub')] == ['model2', 'notes']
+        assert len(index.query(created_after='2000-01-01T00:00:00', created_before='2000-01-02T00:00:00')) == 0
+
+        mackinac.delete_workspace_object(folder + '/sub/notes')
+        mackinac.list_workspace_objects(folder + '/sub', recursive=False, index=index)
+        assert [item.name for item in index.query(folder=folder)] == ['model1', 'model2', 'sub']
+        index.close()
+
+    def test_walk_workspace_folder(self, mock_server):
+        folder = '/mackinac@patricbrc.org/walk'
+        for reference in ['a/one', 'a/b/two', 'c/three', 'four']:
+            mackinac.put_workspace_object('{0}/{1}'.format(folder, reference), 'string', data=reference)
+        output = dict(mackinac.walk_workspace_folder(folder, max_workers=4))
+        assert sorted(output) == [folder, folder + '/a', folder + '/a/b', folder + '/c']
+        assert sorted([item.name for item in output[folder + '/a']]) == ['b', 'one']
+        assert sorted(dict(mackinac.walk_workspace_folder(folder, max_depth=1))) == \
+            [folder, folder + '/a', folder + '/c']
+        with pytest.raises(mackinac.SeedClient.ObjectNotFoundError):
+            list(mackinac.walk_workspace_folder(folder + '/missing'))
+
+    def test_copy_move_objects(self, mock_server):
+        folder = '/mackinac@patricbrc.org/copy'
+        mackinac.put_workspace_object(folder + '/source/one', 'string', data='one')
+        mackinac.put_workspace_object(folder + '/two', 'string', data='two')
+        output = mackinac.copy_workspace_objects([(folder + '/source', folder + '/clone'),
+                                                  (folder + '/two', folder + '/three')], recursive=True)
+        assert [item.name for item in output] == ['clone', 'three']
+        assert mackinac.get_workspace_object_data(folder + '/clone/one', json_data=False) == 'one'
+        with pytest.raises(mackinac.SeedClient.ServerError):
+            mackinac.copy_workspace_objects([(folder + '/two', folder + '/three')])
+        mackinac.copy_workspace_objects([(folder + '/two', folder + '/three')], overwrite=True)
+
+        mackinac.move_workspace_objects([(folder + '/clone', folder + '/moved')])
+        assert mackinac.get_workspace_object_data(folder + '/moved/one', json_data=False) == 'one'
+        with pytest.raises(mackinac.SeedClient.ObjectNotFoundError):
+            mackinac.get_workspace_object_meta(folder + '/clone')
+
+    def test_get_object_fields(self, mock_server, mock_model):
+        reference = '{0}/model'.format(mock_model['ref'])
+        data = mackinac.get_workspace_object_data(reference)
+        output = mackinac.get_workspace_object_data(reference, fields=['modelreactions.id', 'id'])
+        assert output['id'] == data['id']
+        assert [reaction['id'] for reaction in output['modelreactions']] == \
+            [reaction['id'] for reaction in data['modelreactions']]
+        assert list(output['modelreactions'][0]) == ['id']
+        lazy = mackinac.get_workspace_object_data(reference, lazy=True)
+        assert sorted(lazy) == sorted(data)
+        assert lazy['modelcompounds'] == data['modelcompounds']
@@ -1,8 +1,23 @@
-from operator import itemgetter
-import json
+from collections import namedtuple
+from datetime import datetime
+from operator import attrgetter
+from os.path import exists
+from os import remove, rename
+from os.path import getsize
+from uuid import uuid4
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import io
 import requests
+import six
+from six.moves import queue
 
-from .SeedClient import SeedClient, ServerError, handle_server_error
+from .serializer import loads, dumps
+from . import metrics
+from .cache import ObjectCache, MetadataCache
+from .lazy import LazyObject, select_fields
+from .SeedClient import SeedClient, ServerError, ShockError, ObjectNotFoundError, handle_server_error, get_session, \
+    load_json_response, get_rate_limiter, single_flight, release_response
 
 # Workspace service endpoint
 workspace_url = 'https://p3.theseed.org/services/Workspace'
@@ -10,7 +25,23 @@ workspace_url = 'https://p3.theseed.org/services/Workspace'
 # Client for running functions on Workspace web service.
 ws_client = SeedClient(workspace_url, 'Workspace')
 
-""" Several functions return object metadata which is a tuple with the following fields:
+# Object data larger than this number of bytes is stored in Shock instead of sent inline.
+shock_threshold = 16 * 1024 * 1024
+
+# When True, decode JSON object data from Shock incrementally to lower peak memory (needs ijson).
+incremental_json = False
+
+# Cache of object data on local disk or None when object data is not cached.
+object_cache = None
+
+# Cache of object metadata used with ws_client.
+metadata_cache = MetadataCache()
+
+# Maximum number of objects and number of bytes of object data in one request from a bulk function.
+bulk_max_objects = 100
+bulk_max_bytes = 32 * 1024 * 1024
+
+""" Several functions return object metadata which is an ObjectMetadata tuple with the following fields:
 
      0 : str
         Name of object
@@ -38,8 +69,198 @@ ws_client = SeedClient(workspace_url, 'Workspace')
         When object is stored in Shock, URL to Shock node, otherwise empty string
 """
 
+_ObjectMetadataBase = namedtuple('ObjectMetadata', ['name', 'type', 'folder', 'creation_time', 'uuid', 'owner', 'size',
+                                                    'user_metadata', 'auto_metadata', 'user_permission',
+                                                    'global_permission', 'shock_url'])
+
+
+class ObjectMetadata(_ObjectMetadataBase):
+    """ Metadata for a workspace object.
+
+        The fields can be accessed by name or by position in the same order as
+        the metadata returned by the workspace service.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_list(cls, item):
+        """ Make an ObjectMetadata tuple from the metadata returned by the workspace service.
+
+        Parameters
+        ----------
+        item : list
+            Object metadata returned by workspace service
+
+        Returns
+        -------
+        ObjectMetadata
+            Object metadata
+        """
+
+        return cls(item[0], item[1], item[2], item[3], item[4], item[5], int(item[6]), item[7], item[8],
+                   item[9], item[10], item[11])
+
+    @property
+    def reference(self):
+        """ str: Workspace reference to object """
+        return self.folder.rstrip('/') + '/' + self.name
+
+    @property
+    def is_folder(self):
+        """ bool: True when object is a folder """
+        return self.type == 'folder' or bool(self.auto_metadata.get('is_folder', 0))
+
+    @property
+    def created(self):
+        """ datetime: Time when object was created (UTC) """
+        return parse_timestamp(self.creation_time)
+
+
+def parse_timestamp(timestamp):
+    """ Parse a timestamp returned by the workspace service.
+
+    Parameters
+    ----------
+    timestamp : str
+        Timestamp in ISO 8601 format (for example '2017-05-01T10:00:00Z')
+
+    Returns
+    -------
+    datetime
+        Parsed timestamp
+    """
+
+    timestamp = timestamp.rstrip('Z')
+    if '.' in timestamp:
+        return datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S.%f')
+    return datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%S')
+
+
+class MetadataList(list):
+    """ List of object metadata with indexes for sorting and filtering.
+
+        The indexes are built the first time they are needed and are not updated
+        when the list is changed, so do not change the list after it is sorted or
+        filtered.
+    """
+
+    # Functions for getting the value of a sort key from an ObjectMetadata tuple
+    sort_keys = {
+        'name': attrgetter('name'),
+        'folder': attrgetter('folder'),
+        'date': attrgetter('creation_time'),
+        'type': attrgetter('type'),
+        'size': attrgetter('size')
+    }
+
+    def __init__(self, items=()):
+        super(MetadataList, self).__init__(items)
+        self._orders = dict()
+        self._types = None
+
+    def order(self, key):
+        """ Get the positions of the objects in the list sorted by a key.
+
+        Parameters
+        ----------
+        key : {'name', 'folder', 'date', 'type', 'size'}
+            Name of field to use as sort key
+
+        Returns
+        -------
+        list of int
+            Positions of objects in ascending order of key
+        """
+
+        if key not in self._orders:
+            if key not in self.sort_keys:
+                raise ValueError('Sort key {0} is not supported'.format(key))
+            getter = self.sort_keys[key]
+            self._orders[key] = sorted(range(len(self)), key=lambda index: getter(self[index]))
+        return self._orders[key]
+
+    def sorted_by(self, key, reverse=False):
+        """ Get a new list sorted by a key.
+
+        Parameters
+        ----------
+        key : {'name', 'folder', 'date', 'type', 'size'}
+            Name of field to use as sort key
+        reverse : bool, optional
+            When True, sort in descending order
+
+        Returns
+        -------
+        MetadataList
+            Sorted list of object metadata
+        """
+
+        order = self.order(key)
+        if reverse:
+            order = reversed(order)
+        return MetadataList([self[index] for index in order])
+
+    def with_type(self, object_type):
+        """ Get a new list with the objects of a type.
+
+        Parameters
+        ----------
+        object_type : str
+            Type of object
+
+        Returns
+        -------
+        MetadataList
+            List of object metadata for objects of the type
+        """
+
+        if self._types is None:
+            self._types = dict()
+            for index, metadata in enumerate(self):
+                self._types.setdefault(metadata.type, list()).append(index)
+        return MetadataList([self[index] for index in self._types.get(object_type, list())])
+
 
-def shock_download(url, token):
+def _workspace_client(context):
+    """ Get the client for the Workspace web service.
+
+    Parameters
+    ----------
+    context : ClientContext
+        Clients for web services or None to use the clients shared by the process
+
+    Returns
+    -------
+    SeedClient
+        Client for Workspace web service
+    """
+
+    if context is None:
+        return ws_client
+    return context.workspace
+
+
+def _metadata_cache(context):
+    """ Get the cache of object metadata used with the client for the Workspace web service.
+
+    Parameters
+    ----------
+    context : ClientContext
+        Clients for web services or None to use the clients shared by the process
+
+    Returns
+    -------
+    MetadataCache
+        Cache of object metadata
+    """
+
+    if context is None:
+        return metadata_cache
+    return context.metadata_cache
+
+
+def shock_download(url, token, json_data=False, binary=False):
     """ Download data from a Shock node.
 
     Parameters
@@ -48,26 +269,262 @@ def shock_download(url, token):
         URL to Shock node
     token : str
         Authentication token for Patric web services
+    json_data : bool, optional
+        When True, decode JSON data directly from the response stream
+    binary : bool, optional
+        When True and json_data is False, return the data as bytes instead of a UTF-8 decoded string
 
     Returns
     -------
-    str
+    str, bytes, or data
         Data from Shock node
     """
 
-    response = requests.get(url + '?download', headers={'Authorization': 'OAuth ' + token})
-    if response.status_code != requests.codes.OK:
-        response.raise_for_status()
-    return response.text
+    limiter = get_rate_limiter('Shock')
+    with limiter:
+        limiter.throttle()
+        with metrics.registry.measure('Shock', 'download') as measurement:
+            response = get_session().get(url + '?download', headers={'Authorization': 'OAuth ' + token},
+                                         stream=json_data)
+            try:
+                if response.status_code != requests.codes.OK:
+                    response.raise_for_status()
+                if json_data:
+                    return load_json_response(response, incremental=incremental_json)
+                if binary:
+                    return response.content
+                return response.content.decode('utf-8')
+            finally:
+                release_response(response)
+                measurement.response_bytes = response.raw.tell()
+                response.close()
+
+
+def get_shock_node(url, token):
+    """ Get the metadata for a Shock node.
+
+    Parameters
+    ----------
+    url : str
+        URL to Shock node
+    token : str
+        Authentication token for Patric web services
+
+    Returns
+    -------
+    dict
+        Dictionary of node metadata, the 'file' key has the size and checksum of the data
+    """
+
+    limiter = get_rate_limiter('Shock')
+    with limiter:
+        limiter.throttle()
+        with metrics.registry.measure('Shock', 'get_node') as measurement:
+            response = get_session().get(url, headers={'Authorization': 'OAuth ' + token})
+            measurement.response_bytes = response.raw.tell()
+            if response.status_code != requests.codes.OK:
+                response.raise_for_status()
+            return loads(response.content)['data']
+
+
+def shock_download_file(url, token, path, chunk_size=1048576, max_resumes=5):
+    """ Download data from a Shock node to a file.
+
+        The data is streamed to a temporary file next to the destination file in
+        chunks so it is never all in memory. When the connection is dropped, the
+        download resumes from the end of the temporary file with an HTTP Range
+        request. A temporary file left by an earlier call is also resumed. The
+        size and MD5 checksum of the data are verified against the node metadata
+        before the temporary file is renamed to the destination file.
+
+    Parameters
+    ----------
+    url : str
+        URL to Shock node
+    token : str
+        Authentication token for Patric web services
+    path : str
+        Path to destination file
+    chunk_size : int, optional
+        Number of bytes to read from the response stream at a time
+    max_resumes : int, optional
+        Maximum number of times to resume after a dropped connection
+
+    Returns
+    -------
+    int
+        Number of bytes in file
+
+    Raises
+    ------
+    ShockError
+        When the downloaded data does not match the size or checksum of the node
+    """
+
+    node_file = get_shock_node(url, token)['file']
+    size = int(node_file['size'])
+    md5 = node_file.get('checksum', dict()).get('md5', None)
+
+    # Start from the data already in the temporary file.
+    part_path = path + '.part'
+    checksum = hashlib.md5()
+    offset = 0
+    if exists(part_path):
+        with io.open(part_path, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(chunk_size), b''):
+                checksum.update(chunk)
+                offset += len(chunk)
+    if offset > size:
+        checksum = hashlib.md5()
+        offset = 0
+    io.open(part_path, 'ab' if offset > 0 else 'wb').close()
+
+    limiter = get_rate_limiter('Shock')
+    num_resumes = 0
+    while offset < size:
+        headers = {'Authorization': 'OAuth ' + token}
+        if offset > 0:
+            headers['Range'] = 'bytes={0}-'.format(offset)
+        try:
+            with limiter:
+                limiter.throttle()
+                with metrics.registry.measure('Shock', 'download') as measurement:
+                    response = get_session().get(url + '?download', headers=headers, stream=True)
+                    try:
+                        if response.status_code == requests.codes.OK and offset > 0:
+                            # Server ignored the range so start over from the beginning.
+                            checksum = hashlib.md5()
+                            offset = 0
+                        elif response.status_code not in [requests.codes.OK, requests.codes.PARTIAL_CONTENT]:
+                            response.raise_for_status()
+                        with io.open(part_path, 'ab' if offset > 0 else 'wb') as handle:
+                            for chunk in response.iter_content(chunk_size):
+                                handle.write(chunk)
+                                checksum.update(chunk)
+                                offset += len(chunk)
+                    finally:
+                        measurement.response_bytes = response.raw.tell()
+                        response.close()
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError):
+            pass
+        if offset < size:
+            num_resumes += 1
+            if num_resumes > max_resumes:
+                raise ShockError('Download from {0} stopped at {1} of {2} bytes after {3} resumes'
+                                 .format(url, offset, size, max_resumes))
+
+    # Confirm the data matches the node before replacing the destination file.
+    if offset != size:
+        remove(part_path)
+        raise ShockError('Downloaded {0} bytes from {1} but node has {2} bytes'.format(offset, url, size))
+    if md5 is not None and checksum.hexdigest() != md5:
+        remove(part_path)
+        raise ShockError('Checksum {0} of data downloaded from {1} does not match node checksum {2}'
+                         .format(checksum.hexdigest(), url, md5))
+    if exists(path):
+        remove(path)
+    rename(part_path, path)
+    return size
+
+
+class _MultipartStream(object):
+    """ Body of a multipart/form-data request that reads a file in chunks as it is sent.
+
+        The length of the body is known in advance so the request is sent with a
+        Content-Length header instead of chunked transfer encoding.
+    """
+
+    def __init__(self, handle, size, field_name, chunk_size):
+        self.handle = handle
+        self.chunk_size = chunk_size
+        self.boundary = uuid4().hex
+        self.checksum = hashlib.md5()
+        self.head = '--{0}\r\nContent-Disposition: form-data; name="{1}"; filename="{1}"\r\n' \
+                    'Content-Type: application/octet-stream\r\n\r\n'.format(self.boundary, field_name).encode('utf-8')
+        self.tail = '\r\n--{0}--\r\n'.format(self.boundary).encode('utf-8')
+        self.size = size
+
+    @property
+    def content_type(self):
+        return 'multipart/form-data; boundary={0}'.format(self.boundary)
+
+    def __len__(self):
+        return len(self.head) + self.size + len(self.tail)
+
+    def __iter__(self):
+        yield self.head
+        for chunk in iter(lambda: self.handle.read(self.chunk_size), b''):
+            self.checksum.update(chunk)
+            yield chunk
+        yield self.tail
+
+
+def shock_upload(url, token, handle, size, chunk_size=1048576):
+    """ Upload data to a Shock node.
+
+        The data is read from the file object in chunks as it is sent so it is
+        never all in memory. The size and MD5 checksum of the data stored in
+        the node are verified after the upload.
+
+    Parameters
+    ----------
+    url : str
+        URL to Shock node
+    token : str
+        Authentication token for Patric web services
+    handle : file
+        File object opened in binary mode positioned at the start of the data
+    size : int
+        Number of bytes of data
+    chunk_size : int, optional
+        Number of bytes to read from the file object at a time
+
+    Returns
+    -------
+    dict
+        Dictionary of node metadata
+
+    Raises
+    ------
+    ShockError
+        When the data stored in the node does not match the size or checksum of the uploaded data
+    """
+
+    body = _MultipartStream(handle, size, 'upload', chunk_size)
+    headers = {'Authorization': 'OAuth ' + token, 'Content-Type': body.content_type}
+    limiter = get_rate_limiter('Shock')
+    with limiter:
+        limiter.throttle()
+        with metrics.registry.measure('Shock', 'upload') as measurement:
+            measurement.request_bytes = len(body)
+            response = get_session().put(url, data=body, headers=headers)
+            measurement.response_bytes = response.raw.tell()
+            if response.status_code != requests.codes.OK:
+                response.raise_for_status()
+            node = loads(response.content)['data']
 
+    node_file = node['file']
+    if int(node_file['size']) != size:
+        raise ShockError('Uploaded {0} bytes to {1} but node has {2} bytes'.format(size, url, node_file['size']))
+    md5 = node_file.get('checksum', dict()).get('md5', None)
+    if md5 is not None and md5 != body.checksum.hexdigest():
+        raise ShockError('Checksum {0} of data uploaded to {1} does not match node checksum {2}'
+                         .format(body.checksum.hexdigest(), url, md5))
+    return node
 
-def get_workspace_object_meta(reference):
+
+def get_workspace_object_meta(reference, cached=False, context=None):
     """ Get the metadata for an object.
 
     Parameters
     ----------
     reference : str
         Workspace reference to object
+    cached : bool, optional
+        When True, return the metadata from the metadata cache if it was retrieved
+        recently, use when only checking that an object exists
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -75,16 +532,25 @@ def get_workspace_object_meta(reference):
         Object metadata
     """
 
+    cache = _metadata_cache(context)
+    if cached:
+        metadata = cache.get(reference)
+        if metadata is not None:
+            return metadata
     try:
         # The output from get() is a list of tuples.  When asking for metadata only,
-        # the list entry is a tuple with only one element.
-        metadata_list = ws_client.call('get', {'objects': [reference], 'metadata_only': 1})
-        return metadata_list[0][0]
+        # the list entry is a tuple with only one element. The metadata is not cached
+        # when the object changed while the request was in progress.
+        generation = cache.generation()
+        metadata_list = _workspace_client(context).call('get', {'objects': [reference], 'metadata_only': 1})
+        metadata = ObjectMetadata.from_list(metadata_list[0][0])
+        cache.put(reference, metadata, generation)
+        return metadata
     except ServerError as e:
         handle_server_error(e, [reference])
 
 
-def get_workspace_object_data(reference, json_data=True):
+def get_workspace_object_data(reference, json_data=True, fields=None, lazy=False, context=None):
     """ Get the data for an object.
 
     Parameters
@@ -93,6 +559,13 @@ def get_workspace_object_data(reference, json_data=True):
         Workspace reference to object
     json_data : bool, optional
         When True, convert data from returned JSON format
+    fields : list of str, optional
+        List of paths to fields to decode with keys separated by periods (for example
+        ['features.id', 'features.protein_translation']), other fields are not decoded
+    lazy : bool, optional
+        When True, return a LazyObject that decodes a top-level key the first time it is used
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -100,26 +573,184 @@ def get_workspace_object_data(reference, json_data=True):
         Object data (can be dict, list, or string)
     """
 
+    if fields is not None or lazy:
+        text = get_workspace_object_data(reference, json_data=False, context=context)
+        if fields is not None:
+            return select_fields(text, fields)
+        return LazyObject(text)
+
+    client = _workspace_client(context)
+    if json_data and incremental_json:
+        # Each caller decodes its own download stream so the data is never all in memory.
+        return _get_workspace_object_data(reference, client, json_data=True)
+
+    # Concurrent requests for the same object share one download of the encoded data and each
+    # caller decodes its own copy so a caller can modify the data.
+    headers = client.set_authentication_token()
+    key = (client.url, 'object_data', dumps(reference), headers['AUTHORIZATION'])
+    data = single_flight.do(key, _get_workspace_object_data, reference, client)
+    if json_data:
+        return loads(data)
+    if isinstance(data, bytes):
+        return data.decode('utf-8')
+    return data
+
+
+def _get_workspace_object_data(reference, client, json_data=False):
+    """ Get the data for an object from the workspace service.
+
+    Parameters
+    ----------
+    reference : str
+        Workspace reference to object
+    client : SeedClient
+        Client for Workspace web service
+    json_data : bool, optional
+        When True, convert data from returned JSON format, data stored in Shock is
+        decoded directly from the download stream
+
+    Returns
+    -------
+    str, bytes, or data
+        Encoded object data or object data when json_data is True
+    """
+
+    if object_cache is not None:
+        data = _get_cached_workspace_object_data(reference, client)
+        return loads(data) if json_data else data
+
     data = None
     try:
         # The output from get() is a list of tuples. The first element in the
         # tuple is the metadata which has the url to the Shock node when the
         # data is stored in Shock. Otherwise the data is available in the second
         # element of the tuple.
-        object_list = ws_client.call('get', {'objects': [reference]})
+        object_list = client.call('get', {'objects': [reference]})
         if len(object_list[0][0][11]) > 0:
-            data = shock_download(object_list[0][0][11], ws_client.headers['AUTHORIZATION'])
-        else:
-            data = object_list[0][1]
+            token = client.set_authentication_token()['AUTHORIZATION']
+            if json_data:
+                return shock_download(object_list[0][0][11], token, json_data=True)
+            return shock_download(object_list[0][0][11], token, binary=True)
+        data = object_list[0][1]
     except Exception as e:
         handle_server_error(e, [reference])
 
+    # Release the response so only the data string is in memory while it is decoded.
+    del object_list
     if json_data:
-        return json.loads(data)
+        return loads(data)
+    return data
+
+
+def _get_cached_workspace_object_data(reference, client):
+    """ Get the data for an object from the object cache or from the workspace service.
+
+        The metadata for the object is always retrieved from the workspace service to
+        confirm the cached data is for the current version of the object.
+
+    Parameters
+    ----------
+    reference : str
+        Workspace reference to object
+    client : SeedClient
+        Client for Workspace web service
+
+    Returns
+    -------
+    bytes
+        UTF-8 encoded object data
+    """
+
+    cache = object_cache
+    try:
+        metadata = client.call('get', {'objects': [reference], 'metadata_only': 1})[0][0]
+    except ServerError as e:
+        handle_server_error(e, [reference])
+    data = cache.get(metadata[4], metadata[3])
+    if data is None:
+        try:
+            if len(metadata[11]) > 0:
+                token = client.set_authentication_token()['AUTHORIZATION']
+                data = shock_download(metadata[11], token, binary=True)
+            else:
+                # Use the metadata returned with the data in case the object changed.
+                metadata, data = client.call('get', {'objects': [reference]})[0]
+                data = data.encode('utf-8')
+        except Exception as e:
+            handle_server_error(e, [reference])
+        cache.put(metadata[4], metadata[3], data)
     return data
 
 
-def list_workspace_objects(folder, sort_key='folder', recursive=True, print_output=False):
+def set_object_cache(directory, max_size=1073741824, compress_level=1):
+    """ Set the directory for caching object data on local disk.
+
+        When a cache is set, get_workspace_object_data() gets the metadata for the
+        object and returns the cached data when the object has not changed.
+
+    Parameters
+    ----------
+    directory : str
+        Path to directory for storing cached data or None to stop caching object data
+    max_size : int, optional
+        Maximum number of bytes of compressed data in the cache, least recently used
+        objects are removed when the cache is bigger
+    compress_level : int, optional
+        Level of zlib compression from 1 (fastest) to 9 (smallest)
+
+    Returns
+    -------
+    ObjectCache or None
+        Object cache
+    """
+
+    global object_cache
+    if directory is None:
+        object_cache = None
+    else:
+        object_cache = ObjectCache(directory, max_size=max_size, compress_level=compress_level)
+    return object_cache
+
+
+def download_workspace_object(reference, path, context=None):
+    """ Download the data for an object to a file.
+
+        When the data is stored in Shock, it is streamed to the file without
+        keeping it in memory and the download resumes after a dropped connection.
+
+    Parameters
+    ----------
+    reference : str
+        Workspace reference to object
+    path : str
+        Path to destination file
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    int
+        Number of bytes in file
+    """
+
+    client = _workspace_client(context)
+    try:
+        metadata = client.call('get', {'objects': [reference], 'metadata_only': 1})[0][0]
+    except ServerError as e:
+        handle_server_error(e, [reference])
+
+    if len(metadata[11]) > 0:
+        token = client.set_authentication_token()['AUTHORIZATION']
+        return shock_download_file(metadata[11], token, path)
+
+    data = get_workspace_object_data(reference, json_data=False, context=context).encode('utf-8')
+    with io.open(path, 'wb') as handle:
+        handle.write(data)
+    return len(data)
+
+
+def list_workspace_objects(folder, sort_key='folder', recursive=True, print_output=False, index=None,
+                           context=None):
     """ List the objects in the specified workspace folder.
 
     Parameters
@@ -132,16 +763,20 @@ def list_workspace_objects(folder, sort_key='folder', recursive=True, print_outp
         When True, include all subobjects in folder
     print_output : bool, optional
         When True, print formatted output instead of returning the list
+    index : MetadataIndex, optional
+        Index of object metadata to update with the objects in folder
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
-    list or None
-        List of object data for objects in folder or None if printed output
+    MetadataList or None
+        List of object metadata for objects in folder or None if printed output
     """
 
     # Get the list of objects in the specified folder.
     try:
-        output = ws_client.call('ls', {'paths': [folder], 'recursive': recursive})
+        output = _workspace_client(context).call('ls', {'paths': [folder], 'recursive': recursive})
     except ServerError as e:
         handle_server_error(e, [folder])
 
@@ -152,40 +787,101 @@ def list_workspace_objects(folder, sort_key='folder', recursive=True, print_outp
         return None
 
     # Sort the objects by the specified key.
-    reverse = False
-    if sort_key == 'name':
-        key = 0
-    elif sort_key == 'folder':
-        key = 2
-    elif sort_key == 'date':
-        key = 3
-        reverse = True
-    elif sort_key == 'type':
-        key = 1
-    else:
+    if sort_key not in ['name', 'folder', 'date', 'type']:
         raise ValueError('Sort key {0} is not supported'.format(sort_key))
-    output[folder].sort(key=itemgetter(key), reverse=reverse)
+    object_list = MetadataList([ObjectMetadata.from_list(item) for item in output[folder]])
+    del output
+    if index is not None:
+        index.update(folder, object_list, recursive=recursive)
+    object_list = object_list.sorted_by(sort_key, reverse=sort_key == 'date')
 
     # Print details on the objects.
     if print_output:
         print('Contents of {0}:'.format(folder))
-        for object_data in output[folder]:
-            otype = '-'
-            if object_data[1] == 'folder' or object_data[8]['is_folder']:
-                otype = 'd'
+        for object_data in object_list:
+            otype = 'd' if object_data.is_folder else '-'
             print('{0}{1}{2} {3:10}\t{4:>10}\t{5}\t{6:12}\t{7}{8}'
                   .format(otype, object_data[9], object_data[10], object_data[5], object_data[6],
                           object_data[3], object_data[1], object_data[2], object_data[0]))
         return None
 
-    return output[folder]
+    return object_list
+
+
+def walk_workspace_folder(folder, max_workers=8, max_depth=None, context=None):
+    """ Walk the tree of objects in a workspace folder one level at a time.
+
+        Every folder in the tree is listed with a separate request and the requests
+        for subfolders are run in parallel. The contents of each folder are returned
+        as soon as they are available so processing can start before the whole tree
+        is listed. Folders are not returned in any particular order.
+
+    Parameters
+    ----------
+    folder : str
+        Workspace reference to folder
+    max_workers : int, optional
+        Maximum number of requests to run at the same time
+    max_depth : int, optional
+        Maximum number of levels of subfolders to list (default is all levels)
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Yields
+    ------
+    tuple
+        Workspace reference to folder and MetadataList of objects in folder
+    """
+
+    client = _workspace_client(context)
+    root = folder.rstrip('/')
+
+    def list_folder(reference):
+        try:
+            output = client.call('ls', {'paths': [reference], 'recursive': 0})
+        except ServerError as e:
+            handle_server_error(e, [reference])
+        if reference not in output:
+            if reference == root:
+                raise ObjectNotFoundError('An object was not found in workspace: "{0}"'.format(root), None)
+            return MetadataList([])  # Subfolder was deleted during the walk
+        return MetadataList([ObjectMetadata.from_list(item) for item in output[reference]])
+
+    # Each request puts its future in a queue when it ends so the next folder that is
+    # done is available without checking all of the requests in progress.
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    finished = queue.Queue()
+    pending = dict()
+
+    def submit(reference, depth):
+        future = executor.submit(list_folder, reference)
+        pending[future] = (reference, depth)
+        future.add_done_callback(finished.put)
+
+    try:
+        submit(root, 0)
+        while len(pending) > 0:
+            future = finished.get()
+            reference, depth = pending.pop(future)
+            object_list = future.result()
+            if max_depth is None or depth < max_depth:
+                for metadata in object_list:
+                    if metadata.is_folder:
+                        submit(metadata.reference, depth + 1)
+            yield reference, object_list
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
 
 
-def put_workspace_object(reference, object_type, data=None, metadata=None, shock=False, overwrite=False):
+def put_workspace_object(reference, object_type, data=None, metadata=None, shock=None, overwrite=False,
+                         context=None):
     """ Put an object and its metadata in the workspace.
 
         If the object does not exist the object is created. By default, an existing object
-        is not overwritten and the object data is not stored in Shock.
+        is not overwritten and the object data is stored in Shock when it is larger than
+        shock_threshold bytes.
 
     Parameters
     ----------
@@ -198,9 +894,12 @@ def put_workspace_object(reference, object_type, data=None, metadata=None, shock
     metadata : dict, optional
         User metadata for object
     shock : bool, optional
-        When True, store data for object in Shock (not supported yet)
+        When True, store data for object in Shock, when False send data inline, when
+        None choose based on the size of the data
     overwrite : bool, optional
         When True, overwrite the contents of an existing object
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -208,28 +907,123 @@ def put_workspace_object(reference, object_type, data=None, metadata=None, shock
         Object metadata
     """
 
-    if shock:
-        raise ValueError('Storing data in Shock is not supported yet')
+    # Encode the data once and then choose where to send it.
+    upload_data = None
+    if data is not None:
+        upload_data = _encode_object_data(data)
+        if shock is None:
+            shock = len(upload_data) > shock_threshold
+
     params = dict()
     params['objects'] = [[reference, object_type]]
     if metadata is not None:
         params['objects'][0].append(metadata)
-    if data is not None and shock is False:
+    if data is not None and not shock:
         if metadata is None:
             params['objects'][0].append(dict())
-        params['objects'][0].append(data)
+        params['objects'][0].append(upload_data.decode('utf-8'))
+    if overwrite:
+        params['overwrite'] = 1
+    if not shock:
+        return _create_workspace_object(params, reference, context)
+
+    params['createUploadNodes'] = 1
+    output = _create_workspace_object(params, reference, context)
+    if upload_data is not None:
+        token = _workspace_client(context).set_authentication_token()['AUTHORIZATION']
+        shock_upload(output[11], token, io.BytesIO(upload_data), len(upload_data))
+    return output
+
+
+def _encode_object_data(data):
+    """ Encode object data in the format it is stored in the workspace.
+
+    Parameters
+    ----------
+    data : anything
+        Data to store in object (can be dict, list, string, or bytes)
+
+    Returns
+    -------
+    bytes
+        Encoded data
+    """
+
+    if isinstance(data, six.binary_type):
+        return data
+    if isinstance(data, six.string_types):
+        return data.encode('utf-8')
+    return dumps(data)
+
+
+def upload_workspace_object(reference, object_type, path, metadata=None, overwrite=False, context=None):
+    """ Put an object in the workspace with data from a file stored in Shock.
+
+        The file is streamed to the Shock node in chunks so it is never all in memory.
+
+    Parameters
+    ----------
+    reference : str
+        Workspace reference to object
+    object_type : str
+        Type of object
+    path : str
+        Path to file with data for object
+    metadata : dict, optional
+        User metadata for object
+    overwrite : bool, optional
+        When True, overwrite the contents of an existing object
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    tuple
+        Object metadata
+    """
+
+    params = dict()
+    params['objects'] = [[reference, object_type, metadata if metadata is not None else dict()]]
     if overwrite:
         params['overwrite'] = 1
-    if shock:
-        params['createUploadNodes'] = 1
+    params['createUploadNodes'] = 1
+    output = _create_workspace_object(params, reference, context)
+    token = _workspace_client(context).set_authentication_token()['AUTHORIZATION']
+    with io.open(path, 'rb') as handle:
+        shock_upload(output[11], token, handle, getsize(path))
+    return output
+
+
+def _create_workspace_object(params, reference, context):
+    """ Run the create method on the workspace service for one object.
+
+    Parameters
+    ----------
+    params : dict
+        Dictionary of input parameters for method
+    reference : str
+        Workspace reference to object
+    context : ClientContext
+        Clients for web services or None to use the clients shared by the process
+
+    Returns
+    -------
+    tuple
+        Object metadata
+    """
+
+    _forget_reads([reference])
     try:
-        output = ws_client.call('create', params)
-        return output[0]
+        output = _workspace_client(context).call('create', params)
+        return ObjectMetadata.from_list(output[0])
     except ServerError as e:
         handle_server_error(e, [reference])
+    finally:
+        # Lookups that started before this point cannot cache the metadata from before the change.
+        _metadata_cache(context).invalidate(reference)
 
 
-def delete_workspace_object(reference, force=False):
+def delete_workspace_object(reference, force=False, context=None):
     """ Delete an object.
 
     Parameters
@@ -238,6 +1032,8 @@ def delete_workspace_object(reference, force=False):
         Workspace reference to object
     force : bool, optional
         When True, delete folders and all subobjects
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
 
     Returns
     -------
@@ -250,8 +1046,355 @@ def delete_workspace_object(reference, force=False):
     if force:
         params['deleteDirectories'] = 1
         params['force'] = 1
+    _forget_reads([reference])
     try:
-        output = ws_client.call('delete', params)
-        return output[0]
+        output = _workspace_client(context).call('delete', params)
+        return ObjectMetadata.from_list(output[0])
     except ServerError as e:
         handle_server_error(e, [reference])
+    finally:
+        _metadata_cache(context).invalidate(reference)
+
+
+def _forget_reads(references):
+    """ Stop later reads of objects that are about to change from sharing reads already in progress.
+
+    Parameters
+    ----------
+    references : list of str
+        List of workspace references to objects
+    """
+
+    # The keys of coalesced reads have the reference encoded the same way as in a request body.
+    names = [dumps(reference.rstrip('/'))[1:-1] for reference in references]
+
+    def is_read(key):
+        return any(isinstance(part, bytes) and name in part for part in key for name in names)
+
+    single_flight.forget(is_read)
+    return
+
+
+def _invalidate_metadata(references, context):
+    """ Remove the cached metadata for objects after they were changed.
+
+    Parameters
+    ----------
+    references : list of str
+        List of workspace references to objects
+    context : ClientContext
+        Clients for web services or None to use the clients shared by the process
+    """
+
+    cache = _metadata_cache(context)
+    for reference in references:
+        cache.invalidate(reference)
+    return
+
+
+def _make_chunks(items, sizes=None):
+    """ Split a list into chunks that fit in one request.
+
+    Parameters
+    ----------
+    items : list
+        List of items
+    sizes : list of int, optional
+        Number of bytes in each item
+
+    Returns
+    -------
+    list of list
+        List of chunks with at most bulk_max_objects items and bulk_max_bytes bytes
+        (a single item larger than bulk_max_bytes is in a chunk by itself)
+    """
+
+    chunks = list()
+    chunk = list()
+    chunk_bytes = 0
+    for index, item in enumerate(items):
+        size = sizes[index] if sizes is not None else 0
+        if len(chunk) > 0 and (len(chunk) == bulk_max_objects or chunk_bytes + size > bulk_max_bytes):
+            chunks.append(chunk)
+            chunk = list()
+            chunk_bytes = 0
+        chunk.append(item)
+        chunk_bytes += size
+    if len(chunk) > 0:
+        chunks.append(chunk)
+    return chunks
+
+
+def get_workspace_objects_meta(references, context=None):
+    """ Get the metadata for many objects.
+
+    Parameters
+    ----------
+    references : list of str
+        List of workspace references to objects
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    list of tuple
+        Object metadata for each object in the same order as input
+    """
+
+    cache = _metadata_cache(context)
+    generation = cache.generation()
+    chunks = _make_chunks(references)
+    output = _workspace_client(context).call_many(
+        'get', [{'objects': chunk, 'metadata_only': 1} for chunk in chunks], references=chunks)
+    metadata_list = MetadataList([ObjectMetadata.from_list(item[0])
+                                  for chunk_output in output for item in chunk_output])
+    for reference, metadata in zip(references, metadata_list):
+        cache.put(reference, metadata, generation)
+    return metadata_list
+
+
+def get_workspace_objects_data(references, json_data=True, max_workers=8, context=None):
+    """ Get the data for many objects.
+
+        The objects are retrieved in as few requests as possible and the data for
+        objects stored in Shock is downloaded in parallel.
+
+    Parameters
+    ----------
+    references : list of str
+        List of workspace references to objects
+    json_data : bool, optional
+        When True, convert data from returned JSON format
+    max_workers : int, optional
+        Maximum number of requests to run at the same time
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    list
+        Object data for each object in the same order as input
+    """
+
+    client = _workspace_client(context)
+    cache = object_cache
+    data_list = [None] * len(references)
+    missing = list(range(len(references)))
+    if cache is not None:
+        # Only get the objects that are not in the object cache or changed.
+        metadata_list = get_workspace_objects_meta(references, context=context)
+        missing = list()
+        for index, metadata in enumerate(metadata_list):
+            data = cache.get(metadata[4], metadata[3])
+            if data is None:
+                missing.append(index)
+            else:
+                data_list[index] = data.decode('utf-8')
+
+    # Get the objects with inline data and the metadata for the objects stored in Shock.
+    chunks = _make_chunks(missing)
+    output = client.call_many('get', [{'objects': [references[index] for index in chunk]} for chunk in chunks],
+                              max_workers=max_workers, references=[[references[i] for i in chunk] for chunk in chunks])
+    shock_list = list()
+    for chunk, chunk_output in zip(chunks, output):
+        for index, (metadata, data) in zip(chunk, chunk_output):
+            if len(metadata[11]) > 0:
+                shock_list.append((index, metadata))
+            else:
+                data_list[index] = data
+                if cache is not None:
+                    cache.put(metadata[4], metadata[3], data.encode('utf-8'))
+
+    # Download the data for the objects stored in Shock.
+    if len(shock_list) > 0:
+        token = client.set_authentication_token()['AUTHORIZATION']
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(shock_list))) as executor:
+            downloads = list(executor.map(lambda item: shock_download(item[1][11], token), shock_list))
+        for (index, metadata), data in zip(shock_list, downloads):
+            data_list[index] = data
+            if cache is not None:
+                cache.put(metadata[4], metadata[3], data.encode('utf-8'))
+
+    if json_data:
+        return [loads(data) for data in data_list]
+    return data_list
+
+
+def put_workspace_objects(objects, shock=None, overwrite=False, max_workers=8, context=None):
+    """ Put many objects and their metadata in the workspace.
+
+    Parameters
+    ----------
+    objects : list of tuple
+        List of tuples with workspace reference, type of object, and optionally data
+        and user metadata in the same order as the arguments to put_workspace_object()
+    shock : bool, optional
+        When True, store data for objects in Shock, when False send data inline, when
+        None choose based on the size of the data
+    overwrite : bool, optional
+        When True, overwrite the contents of existing objects
+    max_workers : int, optional
+        Maximum number of requests to run at the same time
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    MetadataList
+        Object metadata for each object in the same order as input
+    """
+
+    # Sort the objects into inline objects and Shock objects.
+    inline_list = list()
+    shock_list = list()
+    for index, spec in enumerate(objects):
+        reference, object_type = spec[0], spec[1]
+        data = spec[2] if len(spec) > 2 else None
+        metadata = spec[3] if len(spec) > 3 and spec[3] is not None else dict()
+        encoded = _encode_object_data(data) if data is not None else None
+        use_shock = shock
+        if use_shock is None:
+            use_shock = encoded is not None and len(encoded) > shock_threshold
+        if use_shock:
+            shock_list.append((index, [reference, object_type, metadata], encoded))
+        else:
+            item = [reference, object_type, metadata]
+            if encoded is not None:
+                item.append(encoded.decode('utf-8'))
+            inline_list.append((index, item, len(encoded) if encoded is not None else 0))
+
+    client = _workspace_client(context)
+    output = [None] * len(objects)
+
+    def create(item_list, sizes, extra_params):
+        chunks = _make_chunks(item_list, sizes)
+        params_list = list()
+        for chunk in chunks:
+            params = {'objects': [item[1] for item in chunk]}
+            if overwrite:
+                params['overwrite'] = 1
+            params.update(extra_params)
+            params_list.append(params)
+        results = client.call_many('create', params_list, max_workers=max_workers,
+                                   references=[[item[1][0] for item in chunk] for chunk in chunks])
+        for chunk, chunk_output in zip(chunks, results):
+            for item, metadata in zip(chunk, chunk_output):
+                output[item[0]] = ObjectMetadata.from_list(metadata)
+
+    _forget_reads([spec[0] for spec in objects])
+    try:
+        if len(inline_list) > 0:
+            create(inline_list, [item[2] for item in inline_list], dict())
+        if len(shock_list) > 0:
+            create(shock_list, None, {'createUploadNodes': 1})
+            token = client.set_authentication_token()['AUTHORIZATION']
+            uploads = [(output[index], encoded) for index, spec, encoded in shock_list if encoded is not None]
+            if len(uploads) > 0:
+                with ThreadPoolExecutor(max_workers=min(max_workers, len(uploads))) as executor:
+                    list(executor.map(lambda item: shock_upload(item[0][11], token, io.BytesIO(item[1]),
+                                                                len(item[1])), uploads))
+    finally:
+        _invalidate_metadata([spec[0] for spec in objects], context)
+    return MetadataList(output)
+
+
+def delete_workspace_objects(references, force=False, context=None):
+    """ Delete many objects.
+
+    Parameters
+    ----------
+    references : list of str
+        List of workspace references to objects
+    force : bool, optional
+        When True, delete folders and all subobjects
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    list of tuple
+        Object metadata of deleted objects in the same order as input
+    """
+
+    chunks = _make_chunks(references)
+    params_list = list()
+    for chunk in chunks:
+        params = {'objects': chunk}
+        if force:
+            params['deleteDirectories'] = 1
+            params['force'] = 1
+        params_list.append(params)
+    _forget_reads(references)
+    try:
+        output = _workspace_client(context).call_many('delete', params_list, references=chunks)
+    finally:
+        _invalidate_metadata(references, context)
+    return MetadataList([ObjectMetadata.from_list(metadata) for chunk_output in output for metadata in chunk_output])
+
+
+def copy_workspace_objects(objects, recursive=False, overwrite=False, move=False, context=None):
+    """ Copy many objects to new locations in the workspace.
+
+        The objects are copied by the workspace service so the data is not
+        downloaded and uploaded again.
+
+    Parameters
+    ----------
+    objects : list of tuple
+        List of tuples with workspace reference to source object and workspace reference to destination
+    recursive : bool, optional
+        When True, copy folders and all subobjects
+    overwrite : bool, optional
+        When True, overwrite existing objects at destination
+    move : bool, optional
+        When True, remove the source objects after they are copied
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    MetadataList
+        Object metadata of new objects
+    """
+
+    chunks = _make_chunks([[source, destination] for source, destination in objects])
+    params_list = list()
+    for chunk in chunks:
+        params = {'objects': chunk}
+        if recursive:
+            params['recursive'] = 1
+        if overwrite:
+            params['overwrite'] = 1
+        if move:
+            params['move'] = 1
+        params_list.append(params)
+    _forget_reads([reference for pair in objects for reference in pair])
+    try:
+        output = _workspace_client(context).call_many('copy', params_list, references=[
+            [reference for pair in chunk for reference in pair] for chunk in chunks])
+    finally:
+        _invalidate_metadata([destination for source, destination in objects], context)
+        if move:
+            _invalidate_metadata([source for source, destination in objects], context)
+    return MetadataList([ObjectMetadata.from_list(metadata) for chunk_output in output for metadata in chunk_output])
+
+
+def move_workspace_objects(objects, overwrite=False, context=None):
+    """ Move many objects to new locations in the workspace.
+
+    Parameters
+    ----------
+    objects : list of tuple
+        List of tuples with workspace reference to source object and workspace reference to destination
+    overwrite : bool, optional
+        When True, overwrite existing objects at destination
+    context : ClientContext, optional
+        Clients for web services, when None use the clients shared by the process
+
+    Returns
+    -------
+    MetadataList
+        Object metadata of moved objects
+    """
+
+    return copy_workspace_objects(objects, recursive=True, overwrite=overwrite, move=True, context=context)
@@ -4,7 +4,8 @@ requirements = [
     'cobra>=0.5.4',
     'six',
     'requests',
-    'configparser'
+    'configparser',
+    'futures; python_version < "3"'
 ]
 
 try: